@@ -0,0 +1,135 @@
+"""Small NumPy audio helpers shared by the joiners: WAV I/O and resampling.
+
+Everything works on mono float32 arrays in [-1, 1]. Reading uses the stdlib
+``wave`` module for PCM WAVs (what the workers write) and falls back to
+``soundfile`` for anything else.
+"""
+import wave
+from math import gcd
+
+import numpy as np
+
+_PCM_DTYPES = {1: np.uint8, 2: np.int16, 4: np.int32}
+
+
+def read_wav(path):
+    """Decode an audio file to ``(mono float32 samples, sample_rate)``."""
+    try:
+        with wave.open(str(path), "rb") as w:
+            width, channels, rate = w.getsampwidth(), w.getnchannels(), w.getframerate()
+            raw = w.readframes(w.getnframes())
+    except (wave.Error, EOFError):
+        import soundfile as sf
+
+        data, rate = sf.read(str(path), dtype="float32", always_2d=True)
+        return data.mean(axis=1).astype(np.float32), rate
+    if width == 3:
+        b = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        ints = (b[:, 0].astype(np.int32) | (b[:, 1].astype(np.int32) << 8) | (b[:, 2].astype(np.int32) << 16))
+        ints = np.where(ints >= 1 << 23, ints - (1 << 24), ints)
+        data = ints.astype(np.float32) / float(1 << 23)
+    else:
+        ints = np.frombuffer(raw, dtype=_PCM_DTYPES[width])
+        if width == 1:
+            data = (ints.astype(np.float32) - 128.0) / 128.0
+        else:
+            data = ints.astype(np.float32) / float(1 << (8 * width - 1))
+    if channels > 1:
+        data = data.reshape(-1, channels).mean(axis=1)
+    return data.astype(np.float32, copy=False), rate
+
+
+def audio_frames(path):
+    """``(frames, sample_rate)`` of an audio file, read from its header only."""
+    try:
+        with wave.open(str(path), "rb") as w:
+            return w.getnframes(), w.getframerate()
+    except (wave.Error, EOFError):
+        import soundfile as sf
+
+        info = sf.info(str(path))
+        return info.frames, info.samplerate
+
+
+def to_pcm16(samples):
+    return (np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2")
+
+
+class WavWriter:
+    """Incremental 16-bit mono WAV writer; only the current block is in memory."""
+
+    def __init__(self, path, sample_rate):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self._w = wave.open(str(path), "wb")
+        self._w.setnchannels(1)
+        self._w.setsampwidth(2)
+        self._w.setframerate(sample_rate)
+
+    def write(self, samples):
+        if len(samples):
+            self._w.writeframes(to_pcm16(samples).tobytes())
+            self.frames += len(samples)
+
+    def close(self):
+        self._w.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _lowpass_bank(up, down, half_taps=16, beta=8.0):
+    """Windowed-sinc anti-alias filter split into ``up`` polyphase branches."""
+    cutoff = 0.5 / max(up, down)
+    half = half_taps * max(up, down)
+    n = np.arange(-half, half + 1)
+    h = 2.0 * cutoff * np.sinc(2.0 * cutoff * n) * np.kaiser(len(n), beta) * up
+    taps = -(-len(h) // up)
+    padded = np.zeros(taps * up)
+    padded[:len(h)] = h
+    return padded.reshape(taps, up).T.astype(np.float32), half
+
+
+_BANKS = {}
+
+
+def resample(samples, rate_in, rate_out, block=1 << 16, half_taps=16):
+    """Polyphase windowed-sinc resampling by the rational ratio rate_out/rate_in."""
+    samples = np.asarray(samples, dtype=np.float32)
+    if rate_in == rate_out or not len(samples):
+        return samples
+    g = gcd(int(rate_in), int(rate_out))
+    up, down = int(rate_out) // g, int(rate_in) // g
+    key = (up, down, half_taps)
+    if key not in _BANKS:
+        _BANKS[key] = _lowpass_bank(up, down, half_taps)
+    bank, half = _BANKS[key]
+    out_len = -(-len(samples) * up // down)
+    if down == 1:
+        # Integer upsampling: every phase is a plain convolution.
+        out = np.empty(out_len, dtype=np.float32)
+        for k0 in range(up):
+            t0 = k0 + half
+            phase, base = t0 % up, t0 // up
+            count = len(range(k0, out_len, up))
+            full = np.convolve(samples, bank[phase])
+            seg = full[base:base + count]
+            out[k0::up][:len(seg)] = seg
+            out[k0::up][len(seg):] = 0.0
+        return out
+    taps = bank.shape[1]
+    pad = taps + 1
+    xp = np.concatenate([np.zeros(pad, np.float32), samples, np.zeros(pad + half // up + 1, np.float32)])
+    out = np.empty(out_len, dtype=np.float32)
+    offsets = np.arange(taps)
+    for start in range(0, out_len, block):
+        k = np.arange(start, min(out_len, start + block), dtype=np.int64)
+        t = k * down + half
+        phase, base = t % up, t // up
+        idx = base[:, None] - offsets[None, :] + pad
+        out[start:start + len(k)] = np.einsum("kj,kj->k", bank[phase], xp[idx])
+    return out
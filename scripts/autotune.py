@@ -0,0 +1,316 @@
+"""Host autotuner for the CPU worker pool, and the host profile it writes.
+
+Runs short calibration renders with the real CPU worker over a grid of
+worker count x torch threads per worker x chunk length. It measures pool
+throughput (audio seconds per wall second), per-worker RTF, model load time
+and peak RSS, then saves the best setting that fits in memory as the host
+profile:
+
+    python scripts/autotune.py --voice artifacts/models/voice.pt
+    python scripts/autotune.py --workers 1,2,4 --chunk-sec 10,20 --calib-sec 60
+
+The profile goes to ``artifacts/profiles/<hostname>.json`` (``TTS_HOST_PROFILE``
+or ``--profile`` override the path). ``tts_cli.py`` and ``tts_cli_plus.py``
+read it by default: ``--cpu-workers``, ``--threads-per-worker`` and
+``--chunk-sec`` fall back to the profile when they are not given on the
+command line (``--chunk-sec`` also gives way to TTS_CHUNK_SECONDS).
+``--no-profile`` ignores it. The profile only applies to CPU-pool renders at
+the precision it was tuned at (``TTS_CPU_PRECISION``); GPU and heterogeneous
+renders, and runs at another ``--precision``, use the defaults.
+
+``tts_cli.py --plan`` is the dry run. It chunks the text, schedules the
+chunks over the workers as the pool would, and predicts the wall time from
+the profile without loading a model.
+
+Each trial runs in its own process, so the peak RSS it reports belongs to
+that trial's workers only. Pages shared between workers (model_snapshot.py)
+are counted once per worker, so the memory estimate errs high.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/autotune.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.tracing import write_log
+from scripts.worker_pool import available_cores, lpt_assign, plan_workers
+
+PROFILE_DIR = os.path.join("artifacts", "profiles")
+FALLBACKS = {"cpu_workers": 6, "threads_per_worker": None, "chunk_sec": 20}
+
+
+def default_profile_path():
+    return os.environ.get("TTS_HOST_PROFILE") or os.path.join(PROFILE_DIR, f"{socket.gethostname()}.json")
+
+
+def load_profile(path=None):
+    """The host profile at ``path`` (default: this host's), or None if there is none."""
+    path = path or default_profile_path()
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+def profile_for(profile, precision, cpu_pool=True):
+    """``(profile, reason)``: the profile if it fits this render, else None and why not.
+
+    Profiles are tuned on CPU-pool trials at one precision, so accelerated and
+    heterogeneous renders, and runs at another precision, use the defaults.
+    """
+    if profile is None:
+        return None, None
+    if not cpu_pool:
+        return None, "not a CPU-pool render"
+    tuned = profile.get("precision", "fp32")
+    if tuned != precision:
+        return None, f"tuned at {tuned} precision, this run uses {precision}"
+    return profile, None
+
+
+def apply_profile(args, profile):
+    """Fill the pool settings the user left unset (None) from ``profile``, then from the old defaults.
+
+    The profiled thread count only applies together with the profiled worker count.
+    Returns the names of the settings taken from the profile.
+    """
+    used = []
+    profiled_workers = args.cpu_workers is None
+    for name, fallback in FALLBACKS.items():
+        if getattr(args, name) is not None:
+            continue
+        value = (profile or {}).get(name)
+        if value is None or (name == "threads_per_worker" and not profiled_workers):
+            value = fallback
+        else:
+            used.append(name)
+        setattr(args, name, value)
+    return used
+
+
+def _mem_total_mb():
+    try:
+        with open("/proc/meminfo", "r", encoding="utf-8") as fh:
+            for line in fh:
+                if line.startswith("MemTotal:"):
+                    return int(line.split()[1]) // 1024
+    except OSError:
+        pass
+    return None
+
+
+def _children_peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024.0, 1)
+
+
+def default_workers(cores):
+    """Worker counts 1, 2, 4, ... up to the core count (at most 8)."""
+    workers, w = [], 1
+    while w <= min(len(cores), 8):
+        workers.append(w)
+        w *= 2
+    return workers
+
+
+def calibration_chunks(text, chunk_sec, audio_sec, language="en"):
+    """Chunk records covering about ``audio_sec`` of predicted audio, repeating ``text`` as needed."""
+    from scripts.tts_chunk import plan_chunks
+
+    records = plan_chunks(text, chunk_sec, language=language)
+    if not records:
+        raise ValueError("calibration text produced no chunks")
+    out, total = [], 0.0
+    while total < audio_sec:
+        rec = records[len(out) % len(records)]
+        out.append({"id": len(out), **rec})
+        total += rec["predicted"]
+    return out
+
+
+def run_trial(workdir, workers, threads, chunk_sec, text, voice=None, audio_sec=40.0, language="en"):
+    """Render the calibration set with one pool setting in this process's children."""
+    from scripts.tracing import load_records
+    from scripts.worker_pool import member_env, plan_cpu_pool, run_pool, shard_files
+
+    os.makedirs(workdir, exist_ok=True)
+    chunks_jsonl = os.path.join(workdir, "chunks.jsonl")
+    with open(chunks_jsonl, "w", encoding="utf-8") as fh:
+        for rec in calibration_chunks(text, chunk_sec, audio_sec * workers, language):
+            fh.write(json.dumps(rec, ensure_ascii=False) + "\n")
+    out_dir, log_file = os.path.join(workdir, "chunks"), os.path.join(workdir, "trial.jsonl")
+    env = dict(os.environ, TTS_CACHE="0", TTS_LOG_FILE=log_file)
+    plan = plan_cpu_pool(chunks_jsonl, workers, threads, pin_cores=True)
+    cmds = [[sys.executable, "scripts/tts_worker_cpu.py", "--chunks", p["chunks"], "--out-dir", out_dir,
+             "--language", language] + (["--voice", voice] if voice else []) for p in plan]
+    start = time.time()
+    run_pool(cmds, [member_env(env, p["threads"], p["cores"]) for p in plan], cleanup=shard_files(plan))
+    wall = time.time() - start
+
+    records = load_records([log_file])
+    loads = [r["dur"] for r in records if r.get("span") == "model-load"]
+    done = [r for r in records if r.get("message") == "Chunk rendered"]
+    # From the workers' records rather than the output files, which the chunk store (TTS_CHUNK_STORE) replaces.
+    audio = sum(r["seconds"] for r in done)
+    compute = sum(r["rtf"] * r["seconds"] for r in done)
+    load_sec = max(loads, default=0.0)
+    return {
+        "workers": len(plan),
+        "threads": plan[0]["threads"],
+        "chunk_sec": chunk_sec,
+        "chunks": len(done),
+        "audio_sec": round(audio, 2),
+        "wall_sec": round(wall, 3),
+        "load_sec": round(load_sec, 3),
+        "worker_rtf": round(compute / max(1e-6, audio), 4),
+        "throughput": round(audio / max(1e-6, wall - load_sec), 3),
+        "peak_rss_mb": _children_peak_rss_mb(),
+    }
+
+
+def pick_best(trials, mem_budget_mb=None):
+    """Highest-throughput trial whose workers fit in ``mem_budget_mb`` (all trials if none fit)."""
+    def total_mb(t):
+        return (t.get("peak_rss_mb") or 0.0) * t["workers"]
+
+    fits = [t for t in trials if mem_budget_mb is None or total_mb(t) <= mem_budget_mb] or trials
+    return max(fits, key=lambda t: t["throughput"])
+
+
+def plan_render(text, profile, cpu_workers, chunk_sec, language="en"):
+    """Predict the CPU pool's wall time for ``text`` from a host profile, without rendering."""
+    from scripts.tts_chunk import plan_chunks
+
+    durations = [c["predicted"] for c in plan_chunks(text, chunk_sec, language=language)]
+    workers = plan_workers(cpu_workers, len(durations))
+    loads = lpt_assign(durations, workers)[1]
+    # Prefer a trial at this exact setting; otherwise the profiled best's per-worker RTF.
+    match = [t for t in profile.get("trials", []) if (t["workers"], t["chunk_sec"]) == (workers, chunk_sec)]
+    basis = min(match, key=lambda t: t["worker_rtf"]) if match else profile
+    return {
+        "chunks": len(durations),
+        "audio_sec": round(sum(durations), 1),
+        "workers": workers,
+        "chunk_sec": chunk_sec,
+        "worker_rtf": basis["worker_rtf"],
+        "rtf_from": "trial" if match else "profile",
+        "load_sec": basis["load_sec"],
+        "makespan_audio_sec": round(max(loads, default=0.0), 1),
+        "predicted_wall_sec": round(basis["load_sec"] + max(loads, default=0.0) * basis["worker_rtf"], 1),
+    }
+
+
+def _parse_ints(raw):
+    return [int(v) for v in raw.split(",") if v.strip()] if raw else None
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Calibrate the CPU worker pool on this host and save a host profile.")
+    ap.add_argument("--voice", default=None)
+    ap.add_argument("--text", default=None, help="Calibration text file (default: synthetic prose)")
+    ap.add_argument("--language", default="en")
+    ap.add_argument("--workers", default=None, help="Worker counts to try, e.g. 1,2,4 (default: powers of 2)")
+    ap.add_argument("--threads", default=None, help="Threads per worker to try (default: cores / workers)")
+    ap.add_argument("--chunk-sec", default="10,20,30", help="Chunk lengths to try")
+    ap.add_argument("--calib-sec", type=float, default=40.0, help="Predicted audio seconds per worker per trial")
+    ap.add_argument("--max-mem-mb", type=float, default=None, help="Memory budget (default: 85%% of RAM)")
+    ap.add_argument("--profile", default=None, help="Where to write the profile (default: TTS_HOST_PROFILE or "
+                                                     "artifacts/profiles/<hostname>.json)")
+    ap.add_argument("--workdir", default=None)
+    ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    ap.add_argument("--trial", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.text:
+        with open(args.text, "r", encoding="utf-8") as fh:
+            text = fh.read()
+    else:
+        from scripts.bench import synthetic_text
+
+        text = synthetic_text(200, 20)
+
+    if args.trial:
+        # Child process: one trial, reported on stdout.
+        w, t, c = (int(v) for v in args.trial.split(","))
+        print(json.dumps(run_trial(args.workdir, w, t, c, text, args.voice, args.calib_sec, args.language)))
+        return
+
+    cores = available_cores()
+    threads = _parse_ints(args.threads)
+    grid = [(w, t, c) for w in _parse_ints(args.workers) or default_workers(cores)
+            for t in threads or [max(1, len(cores) // w)] for c in _parse_ints(args.chunk_sec)]
+    mem_total = _mem_total_mb()
+    budget = args.max_mem_mb or (mem_total * 0.85 if mem_total else None)
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    root = args.workdir or os.path.join(PROFILE_DIR, f"work-{stamp}")
+    write_log(args.log_file, "autotune", "start", "Autotune starting", grid=grid, cores=len(cores), mem_mb=mem_total)
+    trials = []
+    try:
+        for w, t, c in grid:
+            cmd = [sys.executable, os.path.abspath(__file__), "--trial", f"{w},{t},{c}",
+                   "--workdir", os.path.join(root, f"w{w}-t{t}-c{c}"), "--calib-sec", str(args.calib_sec),
+                   "--language", args.language]
+            cmd += (["--voice", args.voice] if args.voice else []) + (["--text", args.text] if args.text else [])
+            try:
+                out = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout.decode("utf-8")
+            except subprocess.CalledProcessError as exc:
+                write_log(args.log_file, "autotune", "error", "Trial failed", workers=w, threads=t, chunk_sec=c,
+                          code=exc.returncode)
+                continue
+            trial = json.loads(out.strip().splitlines()[-1])
+            trials.append(trial)
+            write_log(args.log_file, "autotune", "info", "Trial finished", **trial)
+            print(f"workers {trial['workers']:2d} x {trial['threads']:2d} threads, chunk {c:3d}s: "
+                  f"{trial['throughput']:6.2f}x realtime  worker RTF {trial['worker_rtf']:.3f}  "
+                  f"load {trial['load_sec']:.1f}s  peak RSS {trial['peak_rss_mb']} MB/worker")
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+    if not trials:
+        sys.exit("autotune: every trial failed (see the log)")
+
+    best = pick_best(trials, budget)
+    profile = {
+        "host": socket.gethostname(),
+        "platform": platform.platform(),
+        "cores": len(cores),
+        "mem_mb": mem_total,
+        "created": datetime.now(timezone.utc).isoformat(),
+        "precision": os.environ.get("TTS_CPU_PRECISION", "fp32"),
+        "cpu_workers": best["workers"],
+        "threads_per_worker": best["threads"],
+        "chunk_sec": best["chunk_sec"],
+        "worker_rtf": best["worker_rtf"],
+        "load_sec": best["load_sec"],
+        "throughput": best["throughput"],
+        "trials": trials,
+    }
+    path = args.profile or default_profile_path()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        json.dump(profile, fh, indent=2)
+    write_log(args.log_file, "autotune", "success", "Host profile written", path=path,
+              **{k: profile[k] for k in ("cpu_workers", "threads_per_worker", "chunk_sec", "throughput")})
+    print(f"Best: {best['workers']} workers x {best['threads']} threads, chunk {best['chunk_sec']}s "
+          f"({best['throughput']}x realtime). Wrote {path}")
+
+
+if __name__ == "__main__":
+    main()
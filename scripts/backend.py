@@ -1,4 +1,127 @@
-import os, platform
+"""Backend selection with a cached capability probe.
+
+Probing means importing torch (seconds) and initializing CUDA/HIP to read
+the device name, which every CLI run and every worker used to repeat. The
+result of one probe is stored in ``artifacts/cache/backend.json``
+(``TTS_BACKEND_CACHE`` moves it; ``TTS_BACKEND_CACHE=off`` disables it) under
+a key made from everything that can change the answer: the GPU driver
+version files, the ``*_VISIBLE_DEVICES`` variables, the installed torch /
+torch-directml packages (path, size and mtime), and the size and mtime of
+the model files in ``TTS_MODEL_DIR``. Computing the key needs no torch
+import, so a cache hit costs a few stat() calls and one small JSON read.
+"""
+import hashlib
+import json
+import os
+import platform
+import sys
+from datetime import datetime, timezone
+
+BACKENDS = ("rocm", "cuda", "dml", "cpu")
+DEFAULT_CACHE_PATH = os.path.join("artifacts", "cache", "backend.json")
+MAX_ENTRIES = 8
+_DRIVER_FILES = ("/proc/driver/nvidia/version", "/sys/module/amdgpu/version", "/opt/rocm/.info/version")
+_VISIBLE_VARS = ("CUDA_VISIBLE_DEVICES", "HIP_VISIBLE_DEVICES", "ROCR_VISIBLE_DEVICES")
+_memo = {}
+
+
+def _package_id(name):
+    """Where ``name`` is installed and that file's size/mtime, found without importing it."""
+    from importlib.util import find_spec
+
+    spec = find_spec(name)
+    if spec is None or not spec.origin or not os.path.exists(spec.origin):
+        return None
+    st = os.stat(spec.origin)
+    return [spec.origin, st.st_size, int(st.st_mtime)]
+
+
+def _model_files(model_dir):
+    files = {}
+    for name in ("xtts_v2.pth", "config.json", "xtts_v2.snapshot.pt"):
+        try:
+            st = os.stat(os.path.join(model_dir, name))
+        except (OSError, TypeError):
+            continue
+        files[name] = [st.st_size, int(st.st_mtime)]
+    return files
+
+
+def cache_key(model_dir=None):
+    """Identity of the things a probe depends on; cheap to compute."""
+    ident = {
+        "platform": platform.platform(),
+        "python": sys.version.split()[0],
+        "torch": _package_id("torch"),
+        "torch_directml": _package_id("torch_directml"),
+        "env": {v: os.environ[v] for v in _VISIBLE_VARS if v in os.environ},
+        "model": _model_files(model_dir),
+    }
+    for path in _DRIVER_FILES:
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as fh:
+                ident[path] = fh.readline().strip()
+        except OSError:
+            pass
+    return hashlib.sha256(json.dumps(ident, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def probe(model_dir=None):
+    """Query torch and the drivers directly (slow)."""
+    caps = {"torch": None, "cuda": False, "hip": None, "device_name": None, "dml": False}
+    try:
+        import torch
+
+        caps["torch"] = torch.__version__
+        caps["hip"] = getattr(torch.version, "hip", None)
+        if torch.cuda.is_available():
+            caps["cuda"] = True
+            caps["device_name"] = torch.cuda.get_device_name(0)
+    except Exception:
+        pass
+    if platform.system() == "Windows":
+        try:
+            import torch_directml as dml
+
+            dml.device(0)
+            caps["dml"] = True
+        except Exception:
+            pass
+    files = _model_files(model_dir)
+    caps["model"] = {"dir": model_dir, "files": files,
+                     "valid": "xtts_v2.pth" in files and "config.json" in files}
+    return caps
+
+
+def capabilities(model_dir=None, path=None, refresh=False):
+    """Probe results for this host, from the cache when its key still matches."""
+    model_dir = model_dir if model_dir is not None else os.environ.get("TTS_MODEL_DIR")
+    path = path or os.environ.get("TTS_BACKEND_CACHE") or DEFAULT_CACHE_PATH
+    key = cache_key(model_dir)
+    if not refresh and key in _memo:
+        return _memo[key]
+    entries = {}
+    if path != "off":
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                entries = json.load(fh)
+        except (OSError, ValueError):
+            entries = {}
+    caps = None if refresh else entries.get(key)
+    if caps is None:
+        caps = probe(model_dir)
+        caps["probed"] = datetime.now(timezone.utc).isoformat()
+        if path != "off":
+            entries[key] = caps
+            keep = sorted(entries, key=lambda k: entries[k].get("probed", ""))[-MAX_ENTRIES:]
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as fh:
+                json.dump({k: entries[k] for k in keep}, fh, indent=2)
+            os.replace(tmp, path)
+    _memo[key] = caps
+    return caps
+
 
 def pick_backend(order: str):
     """Decide which backend to use according to the user's order preference.
@@ -6,33 +129,34 @@ def pick_backend(order: str):
     Returns: "rocm" | "cuda" | "dml" | "cpu"
     """
     items = [x.strip() for x in order.split(',') if x.strip()]
+    if not any(x in items for x in ('rocm', 'cuda', 'dml')):
+        return 'cpu'  # nothing to probe
+    caps = capabilities()
 
-    # Try ROCm (HIP appears via torch.cuda with AMD devices)
-    try:
-        import torch
-        if 'rocm' in items and torch.cuda.is_available():
-            name = torch.cuda.get_device_name(0)
-            if any(k in name for k in ('AMD', 'Radeon')):
-                os.environ['HIP_VISIBLE_DEVICES'] = '0'
-                return 'rocm'
-    except Exception:
-        pass
+    # ROCm (HIP appears via torch.cuda with AMD devices)
+    if 'rocm' in items and caps["cuda"] and any(k in (caps["device_name"] or "") for k in ('AMD', 'Radeon')):
+        os.environ['HIP_VISIBLE_DEVICES'] = '0'
+        return 'rocm'
 
-    # (Optional) Try CUDA if the user explicitly requested it
-    try:
-        import torch
-        if 'cuda' in items and torch.cuda.is_available():
-            return 'cuda'
-    except Exception:
-        pass
+    # (Optional) CUDA if the user explicitly requested it
+    if 'cuda' in items and caps["cuda"]:
+        return 'cuda'
 
-    # Try DirectML (Windows)
-    try:
-        if 'dml' in items and platform.system() == 'Windows':
-            import torch_directml as dml  # noqa
-            _ = dml.device(0)
-            return 'dml'
-    except Exception:
-        pass
+    # DirectML (Windows)
+    if 'dml' in items and caps["dml"]:
+        return 'dml'
 
     return 'cpu'
+
+
+def default_device():
+    """Device for a worker started without one: TTS_BACKEND when the CLI set it, else the cached probe."""
+    forced = os.environ.get("TTS_BACKEND", "").lower()
+    if forced in BACKENDS:
+        return forced
+    caps = capabilities()
+    if caps["dml"]:
+        return "dml"
+    if caps["cuda"]:
+        return "rocm" if caps["hip"] else "cuda"
+    return "cpu"
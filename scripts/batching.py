@@ -0,0 +1,141 @@
+"""Length-bucketed batched synthesis for the workers.
+
+XTTS spends nearly all of its time in the autoregressive GPT decoder, which
+runs one sequence at a time through ``Xtts.inference``. In batched mode a
+worker claims ``batch_size`` chunks at once, splits them into sentences the
+same way ``Xtts.inference`` does, groups sentences of similar token length
+(at most ``max_pad`` tokens apart) and decodes each group in a single
+``gpt.generate`` call. Shorter rows are right-padded with the stop-text
+token, which is how XTTS pads text during training. The latents and the
+HiFi-GAN vocoder then run per sentence, and the sentences are stitched back
+into one waveform per chunk, so chunk IDs and per-chunk WAVs are unchanged.
+
+Only the direct conditioning path (see ``voice_conditioning``) can batch;
+legacy embedding files fall back to one ``model.tts()`` call per chunk.
+"""
+import os
+import time
+
+import numpy as np
+
+DEFAULT_BATCH_SIZE = 1
+DEFAULT_MAX_PAD = 8
+
+
+def batch_size_from_env():
+    return max(1, int(os.environ.get("TTS_BATCH_SIZE", DEFAULT_BATCH_SIZE)))
+
+
+def iter_windows(items, size):
+    """Group an iterator into lists of up to ``size`` items (claims stay lazy)."""
+    window = []
+    for item in items:
+        window.append(item)
+        if len(window) >= size:
+            yield window
+            window = []
+    if window:
+        yield window
+
+
+def length_buckets(lengths, batch_size, max_pad=DEFAULT_MAX_PAD):
+    """Indices grouped shortest-first into batches of similar length.
+
+    A batch never holds more than ``batch_size`` entries nor entries whose
+    lengths differ by more than ``max_pad``.
+    """
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches, current = [], []
+    for i in order:
+        if current and (len(current) >= batch_size or lengths[i] - lengths[current[0]] > max_pad):
+            batches.append(current)
+            current = []
+        current.append(i)
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _batch_stats(size, tokens, elapsed, seconds):
+    return {
+        "size": size,
+        "tokens": tokens,
+        "elapsed": round(elapsed, 3),
+        "seconds": round(seconds, 3),
+        "throughput": round(seconds / max(1e-6, elapsed), 3),
+    }
+
+
+def synthesize_batch(synth, texts, language="en", batch_size=4, max_pad=DEFAULT_MAX_PAD):
+    """Render ``texts`` with batched GPT decoding.
+
+    Returns ``(wavs, batches)``: one float32 array per text, in order, and one
+    stats dict per decoded batch (size, padded token width, elapsed, audio
+    seconds and throughput in audio seconds per wall second).
+    """
+    if synth.mode != "direct" or batch_size <= 1:
+        wavs, batches = [], []
+        for text in texts:
+            start = time.time()
+            wav = synth.tts(text, language)
+            wavs.append(wav)
+            batches.append(_batch_stats(1, None, time.time() - start, len(wav) / synth.sample_rate))
+        return wavs, batches
+
+    import torch
+    from TTS.tts.layers.xtts.tokenizer import split_sentence
+
+    xtts, gpt = synth._xtts, synth._xtts.gpt
+    device = synth._latent.device
+    language = language.split("-")[0]
+    limit = xtts.tokenizer.char_limits.get(language, 250)
+    owners, tokens = [], []
+    for i, text in enumerate(texts):
+        for sent in split_sentence(text, language, limit):
+            owners.append(i)
+            tokens.append(xtts.tokenizer.encode(sent.strip().lower(), lang=language))
+
+    parts = [None] * len(tokens)
+    batches = []
+    sampling = {k: v for k, v in synth._settings.items() if k != "enable_text_splitting"}
+    for group in length_buckets([len(t) for t in tokens], batch_size, max_pad):
+        start = time.time()
+        width = max(len(tokens[u]) for u in group)
+        text_inputs = torch.full((len(group), width), gpt.stop_text_token, dtype=torch.int32)
+        for row, u in enumerate(group):
+            text_inputs[row, :len(tokens[u])] = torch.tensor(tokens[u], dtype=torch.int32)
+        text_inputs = text_inputs.to(device)
+        with torch.inference_mode():
+            codes = gpt.generate(
+                cond_latents=synth._latent.expand(len(group), -1, -1),
+                text_inputs=text_inputs,
+                input_tokens=None,
+                do_sample=True,
+                num_return_sequences=1,
+                num_beams=1,
+                output_attentions=False,
+                **sampling,
+            )
+            seconds = 0.0
+            for row, u in enumerate(group):
+                seq = codes[row]
+                stops = (seq == gpt.stop_audio_token).nonzero()
+                n = int(stops[0]) + 1 if len(stops) else seq.shape[-1]
+                latents = gpt(
+                    text_inputs[row:row + 1, :len(tokens[u])],
+                    torch.tensor([len(tokens[u])], device=device),
+                    seq[:n].unsqueeze(0),
+                    torch.tensor([n * gpt.code_stride_len], device=device),
+                    cond_latents=synth._latent,
+                    return_attentions=False,
+                    return_latent=True,
+                )
+                wav = xtts.hifigan_decoder(latents, g=synth._speaker).cpu().squeeze().numpy()
+                parts[u] = np.asarray(wav, dtype=np.float32).reshape(-1)
+                seconds += len(parts[u]) / synth.sample_rate
+        batches.append(_batch_stats(len(group), width, time.time() - start, seconds))
+
+    wavs = [[] for _ in texts]
+    for owner, part in zip(owners, parts):
+        wavs[owner].append(part)
+    return [np.concatenate(w) if w else np.zeros(0, np.float32) for w in wavs], batches
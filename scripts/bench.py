@@ -0,0 +1,313 @@
+"""Offline pipeline benchmark with a deterministic stand-in synthesizer.
+
+Measures the pipeline around the model (chunking, the worker loop, loudness
+analysis and the join) at book scale without a GPU, torch or the XTTS
+download. ``StandInModel`` replaces ``TTS.api.TTS``: for every chunk it
+returns a tone-plus-noise signal as long as the duration model predicts,
+seeded by the chunk text so runs are repeatable.
+
+Each stage runs in its own subprocess so its peak RSS is its own:
+
+    chunk     synthetic book text -> plan_chunks -> chunks.jsonl
+    synth     the workers' chunk loop (worker_loop.run_chunks): synthesis,
+              WAV + loudness sidecar, manifest record, log line and spans per
+              chunk; no chunk cache
+    loudness  per-chunk stats -> gated integrated loudness / gain
+    join      crossfade_concat with native loudnorm to a 48 kHz render
+    startup   wall time to start the light commands (CLI --help, chunking,
+              --plan) and the backend probe with a cold and a warm
+              capability cache, median of STARTUP_REPS fresh interpreters,
+              and whether each one imported torch
+
+    python scripts/bench.py                      # 10k chunks, ~5.5 h of audio
+    python scripts/bench.py --quick              # 300 chunks, for a fast check
+    python scripts/bench.py --baseline artifacts/bench/old.json
+
+Results go to ``artifacts/bench/<timestamp>.json``; with ``--baseline`` the
+run fails if any stage got slower or bigger by more than ``--tolerance``.
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import time
+import zlib
+from datetime import datetime, timezone
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/bench.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+STAGES = ("chunk", "synth", "loudness", "join", "startup")
+STARTUP_REPS = 5
+DEFAULT_OUT_DIR = os.path.join("artifacts", "bench")
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_WORDS = (
+    "the of and a to in is was he for it with as his on be at by had not are but from or have an they which one "
+    "you were her all she there would their we him been has when who will more no if out so said what up its about "
+    "into than them can only other new some could time these two may then do first any my now such like our over "
+    "man me even most made after also did many before must through back years where much your way well down should"
+).split()
+
+
+class _StandInSynthesizer:
+    output_sample_rate = 24000
+
+
+class StandInModel:
+    """Deterministic replacement for ``TTS.api.TTS`` (``tts`` / ``save_wav``)."""
+
+    def __init__(self):
+        from scripts.duration_model import DurationModel
+
+        self.synthesizer = _StandInSynthesizer()
+        self.duration = DurationModel()
+
+    def tts(self, text, speaker=None, language="en"):
+        import numpy as np
+
+        rate = self.synthesizer.output_sample_rate
+        seed = zlib.crc32(text.encode("utf-8"))
+        n = int(self.duration.predict(text, language) * rate)
+        t = np.arange(n, dtype=np.float32) / rate
+        f0 = 100.0 + seed % 120
+        voiced = 0.3 * np.sin(2 * np.pi * f0 * t) * (0.6 + 0.4 * np.sin(2 * np.pi * 3.0 * t))
+        noise = 0.02 * np.random.default_rng(seed).standard_normal(n).astype(np.float32)
+        return (voiced + noise).astype(np.float32)
+
+    def save_wav(self, wav, path):
+        from scripts.audio_io import WavWriter
+
+        with WavWriter(path, self.synthesizer.output_sample_rate) as writer:
+            writer.write(wav)
+
+
+def synthetic_text(chunks, chunk_sec, seed=1234):
+    """Deterministic prose long enough for about ``chunks`` chunks."""
+    rng = random.Random(seed)
+    target = chunks * chunk_sec * 15
+    sentences, size = [], 0
+    while size < target:
+        words = [rng.choice(_WORDS) for _ in range(rng.randint(5, 28))]
+        if len(words) > 12:
+            words[rng.randint(3, len(words) - 4)] += ","
+        sentence = " ".join(words).capitalize() + rng.choice(".....?!")
+        sentences.append(sentence)
+        size += len(sentence) + 1
+    return " ".join(sentences)
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1 << 20) if sys.platform == "darwin" else peak / 1024.0, 1)
+
+
+def _chunk_wavs(workdir):
+    return sorted(glob.glob(os.path.join(workdir, "chunks", "*.wav")))
+
+
+def _imports_torch(cmd, env):
+    err = subprocess.run([sys.executable, "-X", "importtime"] + cmd, env=env, cwd=_ROOT,
+                         stdout=subprocess.DEVNULL, stderr=subprocess.PIPE).stderr.decode("utf-8", "replace")
+    return any(line.rsplit("|", 1)[-1].strip() == "torch" for line in err.splitlines())
+
+
+def startup_commands(workdir):
+    """The short commands ``startup_times`` measures, as interpreter argv tails, plus the backend cache path."""
+    workdir = os.path.abspath(workdir)
+    os.makedirs(workdir, exist_ok=True)
+    text, profile = os.path.join(workdir, "startup.txt"), os.path.join(workdir, "profile.json")
+    with open(text, "w", encoding="utf-8") as fh:
+        fh.write(synthetic_text(50, 10))
+    with open(profile, "w", encoding="utf-8") as fh:
+        json.dump({"cpu_workers": 2, "threads_per_worker": 1, "chunk_sec": 10, "worker_rtf": 1.0, "load_sec": 0.0}, fh)
+    probe = ["-c", "from scripts.backend import pick_backend; pick_backend('rocm,cuda,dml,cpu')"]
+    commands = {
+        "cli_help": ["scripts/tts_cli.py", "--help"],
+        "chunk": ["scripts/tts_chunk.py", "--text", text, "--out", os.path.join(workdir, "startup.jsonl")],
+        "plan": ["scripts/tts_cli.py", "--text", text, "--out", os.path.join(workdir, "x.wav"), "--plan",
+                 "--profile", profile],
+        "backend_cold": probe,
+        "backend_warm": probe,
+    }
+    return commands, os.path.join(workdir, "backend.json")
+
+
+def startup_times(workdir, reps=STARTUP_REPS):
+    """Median start-to-exit time of short commands, each in fresh interpreters."""
+    commands, backend_cache = startup_commands(workdir)
+    env = dict(os.environ, PYTHONPATH=_ROOT, TTS_BACKEND_CACHE=backend_cache)
+    out = {}
+    for name, cmd in commands.items():
+        times = []
+        for _ in range(reps):
+            if name == "backend_cold" and os.path.exists(backend_cache):
+                os.remove(backend_cache)
+            start = time.perf_counter()
+            subprocess.run([sys.executable] + cmd, env=env, cwd=_ROOT, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            times.append(time.perf_counter() - start)
+        out[name] = {"ms": round(sorted(times)[len(times) // 2] * 1000, 1), "torch": _imports_torch(cmd, env)}
+    return out
+
+
+def run_stage(stage, workdir, chunks, chunk_sec, batch_size):
+    """Run one stage in this process; returns ``{"elapsed", "items", "audio_sec"}``."""
+    chunks_jsonl = os.path.join(workdir, "chunks.jsonl")
+    if stage == "chunk":
+        from scripts.duration_model import DurationModel
+        from scripts.tts_chunk import plan_chunks
+
+        text = synthetic_text(chunks, chunk_sec)
+        start = time.perf_counter()
+        records = plan_chunks(text, chunk_sec, model=DurationModel())
+        with open(chunks_jsonl, "w", encoding="utf-8") as fh:
+            for i, rec in enumerate(records):
+                fh.write(json.dumps({"id": i, **rec}, ensure_ascii=False) + "\n")
+        return {"elapsed": time.perf_counter() - start, "items": len(records),
+                "audio_sec": sum(r["predicted"] for r in records), "chars": len(text)}
+
+    if stage == "synth":
+        from functools import partial
+
+        from scripts.chunk_queue import iter_chunks
+        from scripts.run_manifest import RunManifest
+        from scripts.tracing import span
+        from scripts.voice_conditioning import VoiceSynth
+        from scripts.worker_loop import run_chunks, worker_log
+
+        out_dir = os.path.join(workdir, "chunks")
+        os.makedirs(out_dir, exist_ok=True)
+        log_file = os.path.join(workdir, "synth.jsonl")
+        model = StandInModel()
+        manifest = RunManifest.for_out_dir(out_dir)
+        manifest.reset()
+        start = time.perf_counter()
+        totals = run_chunks(VoiceSynth(model, None), model.save_wav, iter_chunks(chunks_jsonl), out_dir,
+                            batch_size=batch_size, log=worker_log(log_file),
+                            span=partial(span, log_file, stage="worker"), manifest=manifest)
+        return {"elapsed": time.perf_counter() - start, "items": totals["rendered"], "audio_sec": totals["seconds"]}
+
+    if stage == "loudness":
+        from scripts.loudness import load_chunk_stats, plan_gain
+
+        files = _chunk_wavs(workdir)
+        start = time.perf_counter()
+        stats = [load_chunk_stats(f) for f in files]
+        _, report = plan_gain(stats)
+        return {"elapsed": time.perf_counter() - start, "items": len(files),
+                "audio_sec": sum(s["samples"] / s["rate"] for s in stats), "input_i": report["input_i"]}
+
+    if stage == "join":
+        from scripts.tts_join import crossfade_concat
+
+        files = _chunk_wavs(workdir)
+        start = time.perf_counter()
+        report = crossfade_concat(files, os.path.join(workdir, "render.wav"), 48000, 8, "native")
+        return {"elapsed": time.perf_counter() - start, "items": len(files), "audio_sec": report["seconds"],
+                "output_i": report["output_i"]}
+
+    if stage == "startup":
+        commands = startup_times(workdir)
+        return {"elapsed": sum(c["ms"] for c in commands.values()) / 1000.0, "items": len(commands),
+                "audio_sec": 0.0, "commands": commands}
+
+    raise ValueError(f"unknown stage {stage!r}")
+
+
+def compare(result, baseline, tolerance):
+    """Stages whose time or peak RSS grew by more than ``tolerance`` (fraction)."""
+    regressions = []
+    for stage, cur in result["stages"].items():
+        old = baseline.get("stages", {}).get(stage)
+        if not old:
+            continue
+        for key in ("elapsed", "peak_rss_mb"):
+            if old.get(key) and cur.get(key) and cur[key] > old[key] * (1.0 + tolerance):
+                regressions.append({"stage": stage, "metric": key, "baseline": old[key], "current": cur[key]})
+    return regressions
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Offline pipeline benchmark (no model needed).")
+    ap.add_argument("--chunks", type=int, default=10000, help="Approximate chunk count of the synthetic book")
+    ap.add_argument("--chunk-sec", type=int, default=2, help="Chunk length; 10k x 2 s is about 5.5 h of audio")
+    ap.add_argument("--batch-size", type=int, default=1)
+    ap.add_argument("--quick", action="store_true", help="Small run (300 chunks) for a fast sanity check")
+    ap.add_argument("--stages", default=",".join(STAGES))
+    ap.add_argument("--workdir", default=None, help="Scratch directory (default: a fresh one under the output dir)")
+    ap.add_argument("--keep", action="store_true", help="Keep the scratch chunk WAVs and render")
+    ap.add_argument("--out", default=None, help="Result JSON (default: artifacts/bench/<timestamp>.json)")
+    ap.add_argument("--baseline", default=None, help="Earlier result JSON to compare against")
+    ap.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown/growth vs baseline (fraction)")
+    ap.add_argument("--stage", choices=STAGES, help=argparse.SUPPRESS)
+    args = ap.parse_args()
+    if args.quick:
+        args.chunks = min(args.chunks, 300)
+
+    if args.stage:
+        # Child process: run one stage and report on stdout.
+        result = run_stage(args.stage, args.workdir, args.chunks, args.chunk_sec, args.batch_size)
+        result["peak_rss_mb"] = _peak_rss_mb()
+        print(json.dumps(result))
+        return
+
+    stamp = datetime.now(timezone.utc).strftime("%Y%m%d-%H%M%S")
+    workdir = args.workdir or os.path.join(DEFAULT_OUT_DIR, f"work-{stamp}")
+    os.makedirs(workdir, exist_ok=True)
+    result = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "host": {"platform": platform.platform(), "python": platform.python_version(), "cpus": os.cpu_count()},
+        "params": {"chunks": args.chunks, "chunk_sec": args.chunk_sec, "batch_size": args.batch_size},
+        "stages": {},
+    }
+    try:
+        for stage in [s for s in args.stages.split(",") if s]:
+            cmd = [sys.executable, os.path.abspath(__file__), "--stage", stage, "--workdir", workdir,
+                   "--chunks", str(args.chunks), "--chunk-sec", str(args.chunk_sec),
+                   "--batch-size", str(args.batch_size)]
+            out = subprocess.run(cmd, stdout=subprocess.PIPE, check=True).stdout.decode("utf-8")
+            stats = json.loads(out.strip().splitlines()[-1])
+            stats["elapsed"] = round(stats["elapsed"], 3)
+            stats["audio_sec"] = round(stats["audio_sec"], 1)
+            stats["items_per_sec"] = round(stats["items"] / max(1e-9, stats["elapsed"]), 1)
+            stats["audio_x_realtime"] = round(stats["audio_sec"] / max(1e-9, stats["elapsed"]), 1)
+            result["stages"][stage] = stats
+            if stage == "startup":
+                for name, c in stats["commands"].items():
+                    print(f"{name:>14}: {c['ms']:8.1f} ms{'  (imports torch)' if c['torch'] else ''}")
+                continue
+            print(f"{stage:>9}: {stats['elapsed']:9.2f}s  {stats['items_per_sec']:9.1f} items/s  "
+                  f"{stats['audio_x_realtime']:9.1f}x realtime  peak RSS {stats['peak_rss_mb']} MB")
+    finally:
+        if not args.keep and not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    out = args.out or os.path.join(DEFAULT_OUT_DIR, f"{stamp}.json")
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as fh:
+            result["regressions"] = compare(result, json.load(fh), args.tolerance)
+    with open(out, "w", encoding="utf-8") as fh:
+        json.dump(result, fh, indent=2)
+    print("Wrote", out)
+    if result.get("regressions"):
+        for r in result["regressions"]:
+            print(f"REGRESSION {r['stage']}.{r['metric']}: {r['baseline']} -> {r['current']}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
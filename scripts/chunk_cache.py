@@ -0,0 +1,186 @@
+"""Persistent, content-addressed cache of rendered chunk audio.
+
+A chunk's key is the SHA-256 of everything that determines its audio: the
+chunk text, a hash of the voice embedding file, the language, a checksum of
+the model checkpoint and any other synthesis parameters. Entries live under
+``<root>/<aa>/<key>.wav`` (plus the chunk's ``.loudness.json`` sidecar when
+there is one) and are evicted least-recently-used once the cache grows past
+its size budget; a hit refreshes the entry's mtime.
+
+Re-rendering a book after a one-line fix therefore only synthesizes the
+chunks whose text changed, and repeated lines within a run render once.
+"""
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+DEFAULT_CACHE_DIR = os.path.join("artifacts", "cache", "chunks")
+DEFAULT_MAX_MB = 2048
+MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+
+
+def file_sha256(path, bufsize=1 << 20):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(bufsize), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def cached_file_sha256(path, memo_path):
+    """SHA-256 of a (large) file, memoised by path + size + mtime in ``memo_path``."""
+    st = os.stat(path)
+    ident = f"{os.path.abspath(path)}|{st.st_size}|{int(st.st_mtime)}"
+    try:
+        with open(memo_path, "r", encoding="utf-8") as fh:
+            memo = json.load(fh)
+    except (OSError, ValueError):
+        memo = {}
+    if ident not in memo:
+        memo[ident] = file_sha256(path)
+        os.makedirs(os.path.dirname(memo_path) or ".", exist_ok=True)
+        tmp = f"{memo_path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(memo, fh)
+        os.replace(tmp, memo_path)
+    return memo[ident]
+
+
+def model_fingerprint(memo_path):
+    """Checksum of the local XTTS checkpoint, or the model name when downloading."""
+    mdir = os.environ.get("TTS_MODEL_DIR")
+    if mdir:
+        mp = os.path.join(mdir, "xtts_v2.pth")
+        if os.path.exists(mp) and os.path.exists(os.path.join(mdir, "config.json")):
+            return cached_file_sha256(mp, memo_path)
+    return MODEL_NAME
+
+
+class ChunkCache:
+    def __init__(self, root=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_MB << 20, voice=None, params=None):
+        self.root = root
+        self.max_bytes = max_bytes
+        os.makedirs(root, exist_ok=True)
+        memo = os.path.join(root, "checksums.json")
+        self.voice_hash = cached_file_sha256(voice, memo) if voice else None
+        self.model_hash = model_fingerprint(memo)
+        self.params = params or {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls, voice=None, params=None):
+        """Cache configured by TTS_CACHE_DIR / TTS_CACHE_MAX_MB; None if TTS_CACHE=0."""
+        if os.environ.get("TTS_CACHE", "1").lower() in ("0", "false", "no", "off"):
+            return None
+        root = os.environ.get("TTS_CACHE_DIR") or DEFAULT_CACHE_DIR
+        max_mb = int(os.environ.get("TTS_CACHE_MAX_MB", DEFAULT_MAX_MB))
+        return cls(root, max_mb << 20, voice=voice, params=params)
+
+    def key(self, text, language, **params):
+        payload = {
+            "text": text,
+            "language": language,
+            "voice": self.voice_hash,
+            "model": self.model_hash,
+            "params": {**self.params, **params},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _entry(self, key):
+        return os.path.join(self.root, key[:2], key + ".wav")
+
+    @staticmethod
+    def _sidecar(wav_path):
+        return os.path.splitext(wav_path)[0] + ".loudness.json"
+
+    def lookup(self, key):
+        """Path of the cached WAV for ``key`` (mtime refreshed), or None."""
+        entry = self._entry(key)
+        try:
+            os.utime(entry)
+        except OSError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def fetch(self, key, dest):
+        """Copy a cached chunk (and its loudness sidecar) to ``dest``; True on hit."""
+        entry = self.lookup(key)
+        if entry is None:
+            return False
+        try:
+            shutil.copyfile(entry, dest)
+            if os.path.exists(self._sidecar(entry)):
+                shutil.copyfile(self._sidecar(entry), self._sidecar(dest))
+        except OSError:
+            self._evicted()
+            return False
+        return True
+
+    def read(self, key, with_stats=False):
+        """``(samples, rate, stats)`` of a cached chunk, or None on a miss.
+
+        ``stats`` (the loudness sidecar, measured if missing) only with ``with_stats``.
+        """
+        from scripts.audio_io import read_wav
+        from scripts.loudness import load_chunk_stats
+
+        entry = self.lookup(key)
+        if entry is None:
+            return None
+        try:
+            samples, rate = read_wav(entry)
+            return samples, rate, load_chunk_stats(entry) if with_stats else None
+        except (OSError, EOFError):
+            self._evicted()
+            return None
+
+    def _evicted(self):
+        # Evicted between lookup and use: count it as a miss.
+        self.hits -= 1
+        self.misses += 1
+
+    def store(self, key, src):
+        """Add a rendered chunk WAV (and sidecar, if any) to the cache atomically."""
+        entry = self._entry(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        for source, target in ((self._sidecar(src), self._sidecar(entry)), (src, entry)):
+            if not os.path.exists(source):
+                continue
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(entry), suffix=".tmp")
+            os.close(fd)
+            shutil.copyfile(source, tmp)
+            os.replace(tmp, target)
+
+    def evict(self):
+        """Drop least-recently-used entries until the cache fits its budget."""
+        entries, total = [], 0
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for f in os.scandir(sub.path):
+                if f.name.endswith(".wav"):
+                    st = f.stat()
+                    side = self._sidecar(f.path)
+                    size = st.st_size + (os.path.getsize(side) if os.path.exists(side) else 0)
+                    entries.append((st.st_mtime, size, f.path))
+                    total += size
+        removed = 0
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            for p in (path, self._sidecar(path)):
+                try:
+                    os.remove(p)
+                except FileNotFoundError:
+                    pass
+            total -= size
+            removed += 1
+        return {"entries": len(entries) - removed, "bytes": total, "evicted": removed}
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,111 @@
+"""Shared chunk queue for running several workers over one chunks.jsonl.
+
+Every worker reads the full chunk list and claims a chunk right before it
+renders it by atomically creating ``<claim_dir>/<id>.claim``. Whoever creates
+the file owns the chunk; everyone else skips it. Fast devices therefore come
+back for more chunks sooner and end up rendering a larger share, and nobody
+idles while unclaimed work remains.
+
+The list is ordered longest-predicted first (LPT), so long chunks start
+early instead of becoming stragglers. Accelerated workers take chunks from
+the head and CPU workers take from the tail, so the fast devices get the
+long chunks, the slow ones the short chunks, and the two kinds only contend
+once they meet in the middle (the classic work-stealing deque layout).
+"""
+import json
+import os
+import shutil
+from collections import Counter
+
+
+class ChunkQueue:
+    def __init__(self, claim_dir, owner, take="head"):
+        self.claim_dir = claim_dir
+        self.owner = owner
+        self.take = take
+        os.makedirs(claim_dir, exist_ok=True)
+
+    def _claim_path(self, chunk_id):
+        return os.path.join(self.claim_dir, f"{int(chunk_id):06d}.claim")
+
+    def claim(self, chunk_id):
+        """Try to take ``chunk_id``; True if this worker now owns it."""
+        try:
+            fd = os.open(self._claim_path(chunk_id), os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(self.owner)
+        return True
+
+    def iter_claimed(self, items):
+        ordered = reversed(items) if self.take == "tail" else items
+        for item in ordered:
+            if self.claim(item["id"]):
+                yield item
+
+
+def reset_queue(claim_dir):
+    """Clear claims left over from a previous run before starting a new one."""
+    shutil.rmtree(claim_dir, ignore_errors=True)
+    os.makedirs(claim_dir, exist_ok=True)
+
+
+def _claims(claim_dir):
+    """``(chunk id, owner)`` for every claim file."""
+    if not os.path.isdir(claim_dir):
+        return
+    for name in os.listdir(claim_dir):
+        if name.endswith(".claim"):
+            with open(os.path.join(claim_dir, name), "r", encoding="utf-8") as fh:
+                yield int(name[:-len(".claim")]), fh.read().strip() or "unknown"
+
+
+def tally_claims(claim_dir):
+    """Count claimed chunks per worker owner.
+
+    A claim is taken before the chunk is rendered, so this is the split of
+    the work, not of finished chunks; see ``unfinished_claims``.
+    """
+    return dict(Counter(owner for _, owner in _claims(claim_dir)))
+
+
+def unfinished_claims(claim_dir, done_ids):
+    """``{owner: [chunk ids]}`` claimed but not in ``done_ids`` (e.g. the owner died mid-chunk)."""
+    orphans = {}
+    for chunk_id, owner in sorted(_claims(claim_dir)):
+        if chunk_id not in done_ids:
+            orphans.setdefault(owner, []).append(chunk_id)
+    return orphans
+
+
+def predicted_seconds(item):
+    """Predicted duration of a chunk record (old chunk files: ~15 chars/sec)."""
+    return float(item.get("predicted") or max(1, len(item.get("text", "")) // 15))
+
+
+def lpt_order(items):
+    """Chunk records longest-predicted first; ties keep file order."""
+    return sorted(items, key=lambda item: -predicted_seconds(item))
+
+
+def read_chunks(chunks_jsonl):
+    with open(chunks_jsonl, "r", encoding="utf-8") as fh:
+        return [json.loads(line) for line in fh if line.strip()]
+
+
+def iter_chunks(chunks_jsonl, claim_dir=None, owner=None, take=None):
+    """Yield the chunks this worker should render.
+
+    Chunks come longest-predicted first. ``claim_dir``/``take`` default to the
+    TTS_QUEUE_DIR/TTS_QUEUE_TAKE environment variables set by the scheduler;
+    without a claim directory every chunk is yielded.
+    """
+    claim_dir = claim_dir or os.environ.get("TTS_QUEUE_DIR")
+    items = lpt_order(read_chunks(chunks_jsonl))
+    if not claim_dir:
+        yield from items
+        return
+    take = take or os.environ.get("TTS_QUEUE_TAKE", "head")
+    queue = ChunkQueue(claim_dir, owner or f"pid{os.getpid()}", take)
+    yield from queue.iter_claimed(items)
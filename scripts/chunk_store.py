@@ -0,0 +1,241 @@
+"""Append-only float32 chunk store, read back zero-copy with ``np.memmap``.
+
+By default every worker writes ``chunks/NNNNNN.wav`` plus a loudness sidecar
+and the joiner decodes them all again. With ``TTS_CHUNK_STORE=1`` (or
+``--chunk-store`` on the CLIs) workers instead append the raw float32 samples
+to ``chunks/store/``, and the joiner maps that data and crossfades straight
+out of the page cache: no WAV header, int16 round trip or per-chunk file.
+
+Each writer process owns one segment, so pool and hetero workers never
+contend and no file locking is needed::
+
+    chunks/store/w<pid>.f32        samples, appended chunk after chunk
+    chunks/store/w<pid>.idx.jsonl  one line per chunk: id, byte offset, frames,
+                                   rate, SHA-256 of the bytes, chunk-text hash
+                                   and the loudness stats the joiner needs
+
+The samples are written before their index line, so a killed worker leaves at
+most some unreferenced bytes. Index lines from all segments are merged and
+the latest record for an id wins, as in the run manifest; ``--resume`` checks
+the records against the mapped data the same way it checks WAVs.
+
+For debugging, ``export`` dumps the chunks as ordinary WAVs (with loudness
+sidecars, so ``tts_join.py --chunks`` can join them)::
+
+    python scripts/chunk_store.py export runs/latest/chunks/store /tmp/chunks
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/chunk_store.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.audio_io import WavWriter
+from scripts.loudness import chunk_stats, sidecar_path
+from scripts.run_manifest import text_digest
+
+STORE_DIR = "store"
+DATA_SUFFIX = ".f32"
+INDEX_SUFFIX = ".idx.jsonl"
+DTYPE = np.dtype("<f4")
+
+
+def store_enabled():
+    return os.environ.get("TTS_CHUNK_STORE", "0").lower() in ("1", "true", "yes", "on")
+
+
+def peak_normalize(wav):
+    """Scale to full range as TTS's ``save_wav`` does, so stored chunks match the WAV path."""
+    wav = np.asarray(wav, dtype=np.float32)
+    return wav / max(0.01, float(np.max(np.abs(wav)))) if len(wav) else wav
+
+
+class ChunkStore:
+    def __init__(self, root):
+        self.root = root
+        self._maps = {}
+
+    @classmethod
+    def for_out_dir(cls, out_dir):
+        return cls(os.path.join(out_dir, STORE_DIR))
+
+    @classmethod
+    def from_env(cls, out_dir):
+        """Store under a chunks directory if TTS_CHUNK_STORE is on, else None."""
+        return cls.for_out_dir(out_dir) if store_enabled() else None
+
+    def writer(self):
+        return StoreWriter(self.root, f"w{os.getpid()}")
+
+    def _segments(self):
+        try:
+            names = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        return sorted(n[:-len(INDEX_SUFFIX)] for n in names if n.endswith(INDEX_SUFFIX))
+
+    def load(self):
+        """Merged index ``{chunk id: record}``; the latest record for an id wins."""
+        records = []
+        for seg in self._segments():
+            with open(os.path.join(self.root, seg + INDEX_SUFFIX), "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        records.append(json.loads(line))
+                    except ValueError:
+                        continue  # torn last line from a killed worker
+        records.sort(key=lambda rec: rec["ts"])
+        return {rec["id"]: rec for rec in records}
+
+    def ids(self):
+        return sorted(chunk_id for chunk_id, rec in self.load().items() if rec.get("status") == "done")
+
+    def _map(self, segment):
+        path = os.path.join(self.root, segment)
+        frames = os.path.getsize(path) // DTYPE.itemsize
+        mm = self._maps.get(segment)
+        if mm is None or len(mm) < frames:  # (re)map once the segment has grown
+            mm = self._maps[segment] = np.memmap(path, dtype=DTYPE, mode="r", shape=(frames,))
+        return mm
+
+    def samples(self, record):
+        """Zero-copy view of a record's samples (raises if the segment is short)."""
+        if not record["frames"]:
+            return np.zeros(0, dtype=DTYPE)
+        start = record["offset"] // DTYPE.itemsize
+        view = self._map(record["segment"])[start:start + record["frames"]]
+        if len(view) != record["frames"]:
+            raise ValueError(f"{record['segment']} is truncated at chunk {record['id']}")
+        return view
+
+    def read(self, chunk_id, records=None):
+        """``(samples, rate)`` for a chunk id, like ``read_wav``; samples are a memmap view."""
+        rec = (records or self.load())[chunk_id]
+        return self.samples(rec), rec["rate"]
+
+    def verify(self, record, text):
+        """True if the record's samples are intact and match the chunk text (for plan_resume)."""
+        if record.get("status") != "done" or record.get("text_sha256") != text_digest(text):
+            return False
+        try:
+            return hashlib.sha256(self.samples(record)).hexdigest() == record.get("sha256")
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def export(self, out_dir, ids=None):
+        """Write chunks as ``NNNNNN.wav`` plus loudness sidecars; returns the paths."""
+        os.makedirs(out_dir, exist_ok=True)
+        records = self.load()
+        paths = []
+        for chunk_id in ids if ids is not None else self.ids():
+            samples, rate = self.read(chunk_id, records)
+            path = os.path.join(out_dir, f"{chunk_id:06d}.wav")
+            with WavWriter(path, rate) as writer:
+                writer.write(samples)
+            with open(sidecar_path(path), "w", encoding="utf-8") as fh:
+                json.dump(records[chunk_id]["stats"], fh)
+            paths.append(path)
+        return paths
+
+    def reset(self):
+        self._maps = {}
+        for seg in self._segments():
+            for suffix in (INDEX_SUFFIX, DATA_SUFFIX):
+                try:
+                    os.remove(os.path.join(self.root, seg + suffix))
+                except FileNotFoundError:
+                    pass
+
+
+class StoreWriter:
+    """One process's segment: ``add`` appends a chunk's samples, then its index line."""
+
+    def __init__(self, root, name):
+        os.makedirs(root, exist_ok=True)
+        self.segment = name + DATA_SUFFIX
+        self.path = os.path.join(root, self.segment)
+        self.index_path = os.path.join(root, name + INDEX_SUFFIX)
+
+    def append(self, chunk_id, samples, rate, text, stats=None, status="done", **extra):
+        data = np.ascontiguousarray(samples, dtype=DTYPE)
+        with open(self.path, "ab") as fh:
+            offset = fh.seek(0, os.SEEK_END)
+            pad = -offset % DTYPE.itemsize  # realign after a write torn by a killed worker
+            fh.write(b"\0" * pad + data.tobytes())
+            offset += pad
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "id": chunk_id,
+            "status": status,
+            "segment": self.segment,
+            "offset": offset,
+            "frames": len(data),
+            "rate": rate,
+            "seconds": round(len(data) / float(rate), 3),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "text_sha256": text_digest(text),
+            "stats": stats or chunk_stats(data, rate),
+            **extra,
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(self.index_path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        return entry
+
+    def add(self, chunk_id, wav, rate, text, cache=None, key=None):
+        """Store a freshly synthesized chunk (peak-normalized) and offer it to the chunk cache."""
+        samples = peak_normalize(wav)
+        entry = self.append(chunk_id, samples, rate, text)
+        if cache:
+            from scripts.pipeline import cache_store
+
+            cache_store(cache, key, samples, rate)
+        return entry
+
+    def add_cached(self, chunk_id, text, cache, key):
+        """Copy a chunk-cache hit into the store; False on a miss."""
+        hit = cache.read(key, with_stats=True)
+        if hit is None:
+            return False
+        samples, rate, stats = hit
+        self.append(chunk_id, samples, rate, text, stats=stats, cached=True)
+        return True
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Inspect or export a chunk store (chunks/store).")
+    sub = ap.add_subparsers(dest="command", required=True)
+    ls = sub.add_parser("list", help="Show the stored chunks")
+    ls.add_argument("store")
+    ex = sub.add_parser("export", help="Write the stored chunks as NNNNNN.wav files with loudness sidecars")
+    ex.add_argument("store")
+    ex.add_argument("out_dir")
+    ex.add_argument("--ids", default=None, help="Comma-separated chunk ids (default: all)")
+    args = ap.parse_args()
+
+    store = ChunkStore(args.store)
+    if args.command == "list":
+        for chunk_id, rec in sorted(store.load().items()):
+            print(f"{chunk_id:6d} {rec['status']:6s} {rec['seconds']:8.3f}s {rec['rate']:6d} Hz  "
+                  f"{rec['segment']}@{rec['offset']}{'  (cached)' if rec.get('cached') else ''}")
+    else:
+        ids = [int(i) for i in args.ids.split(",")] if args.ids else None
+        for path in store.export(args.out_dir, ids):
+            print("Wrote", path)
+
+
+if __name__ == "__main__":
+    main()
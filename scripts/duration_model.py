@@ -0,0 +1,132 @@
+"""Calibrated chunk-duration model used by the chunker and the schedulers.
+
+Predicted seconds for a piece of text are a per-language linear function of
+a few cheap features (characters, words, pause punctuation, plus a bias),
+fitted by least squares to the chunks earlier renders actually produced.
+Both log schemas are read: ``chunk_done`` records from ``render.jsonl``
+(JsonlLogger) and ``Chunk rendered`` records from the ``write_log`` JSONL
+files, as long as they carry the chunk ``text`` and rendered ``seconds``.
+
+Coefficients live in ``artifacts/models/duration_model.json`` (override with
+``TTS_DURATION_MODEL``). Without a fitted file the model falls back to the
+old heuristic of roughly 15 characters per second.
+
+    python scripts/duration_model.py --logs runs/*/logs/render.jsonl artifacts/logs/*.jsonl
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+
+DEFAULT_MODEL_PATH = os.path.join("artifacts", "models", "duration_model.json")
+FEATURES = ("chars", "words", "pauses", "bias")
+FALLBACK = {"chars": 1.0 / 15.0, "words": 0.0, "pauses": 0.0, "bias": 0.0}
+MIN_SAMPLES = 20
+_PAUSES = re.compile(r"[,;:.!?—–]")
+
+
+def features(text):
+    return {
+        "chars": len(text),
+        "words": len(text.split()),
+        "pauses": len(_PAUSES.findall(text)),
+        "bias": 1.0,
+    }
+
+
+class DurationModel:
+    def __init__(self, coefficients=None, meta=None):
+        # language -> {feature: weight}; "default" covers unseen languages.
+        self.coefficients = coefficients or {"default": dict(FALLBACK)}
+        self.meta = meta or {}
+
+    def predict(self, text, language="en"):
+        coef = self.coefficients.get(language.split("-")[0]) or self.coefficients.get("default") or FALLBACK
+        f = features(text)
+        return max(0.1, sum(coef.get(k, 0.0) * f[k] for k in FEATURES))
+
+    @classmethod
+    def load(cls, path=None):
+        """Fitted model from ``path`` / TTS_DURATION_MODEL, or the fallback heuristic."""
+        path = path or os.environ.get("TTS_DURATION_MODEL") or DEFAULT_MODEL_PATH
+        try:
+            with open(path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            return cls()
+        return cls(data.get("coefficients"), data.get("meta"))
+
+    def save(self, path=DEFAULT_MODEL_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w", encoding="utf-8") as fh:
+            json.dump({"features": list(FEATURES), "coefficients": self.coefficients, "meta": self.meta}, fh, indent=2)
+
+
+def iter_log_samples(paths):
+    """Yield ``(text, language, seconds)`` from rendered-chunk log records."""
+    for path in paths:
+        try:
+            fh = open(path, "r", encoding="utf-8")
+        except OSError:
+            continue
+        with fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if rec.get("kind") != "chunk_done" and rec.get("message") != "Chunk rendered":
+                    continue
+                if rec.get("text") and rec.get("seconds"):
+                    yield rec["text"], rec.get("language", "en"), float(rec["seconds"])
+
+
+def _lstsq(rows, targets):
+    import numpy as np
+
+    x = np.array([[r[k] for k in FEATURES] for r in rows], dtype=np.float64)
+    y = np.array(targets, dtype=np.float64)
+    w = np.linalg.lstsq(x, y, rcond=None)[0]
+    mae = float(np.abs(x @ w - y).mean())
+    return {k: float(v) for k, v in zip(FEATURES, w)}, mae
+
+
+def fit(samples, min_samples=MIN_SAMPLES):
+    """Fit per-language coefficients (languages with enough samples) plus a default."""
+    by_lang = {}
+    for text, language, seconds in samples:
+        by_lang.setdefault(language.split("-")[0], []).append((features(text), seconds))
+    everything = [s for group in by_lang.values() for s in group]
+    coefficients, meta = {"default": dict(FALLBACK)}, {}
+    groups = dict(by_lang, default=everything)
+    for lang, group in groups.items():
+        if len(group) < min_samples:
+            continue
+        coef, mae = _lstsq([f for f, _ in group], [s for _, s in group])
+        coefficients[lang] = coef
+        meta[lang] = {"samples": len(group), "mae_sec": round(mae, 3)}
+    return DurationModel(coefficients, meta)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Fit the chunk duration model from render logs.")
+    ap.add_argument("--logs", nargs="+", required=True, help="render.jsonl / write_log JSONL files (globs allowed)")
+    ap.add_argument("--out", default=os.environ.get("TTS_DURATION_MODEL") or DEFAULT_MODEL_PATH)
+    ap.add_argument("--min-samples", type=int, default=MIN_SAMPLES)
+    args = ap.parse_args()
+
+    paths = sorted({p for pattern in args.logs for p in (glob.glob(pattern) or [pattern])})
+    model = fit(iter_log_samples(paths), args.min_samples)
+    if not model.meta:
+        print("Not enough rendered chunks with text in the logs; keeping the fallback model.", file=sys.stderr)
+        sys.exit(1)
+    model.save(args.out)
+    for lang, info in sorted(model.meta.items()):
+        print(f"{lang}: {info['samples']} chunks, MAE {info['mae_sec']}s")
+    print("Saved", args.out)
+
+
+if __name__ == "__main__":
+    main()
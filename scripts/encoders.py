@@ -0,0 +1,211 @@
+"""Streaming encode of the joined render to Opus / MP3 / FLAC, several at once.
+
+The join used to end at a 48 kHz WAV that a separate step transcoded.
+``AudioOutputs`` takes the joiner's float32 blocks as they are produced and
+writes each block to the WAV master (optional) and to one ffmpeg encoder
+per target, each reading raw PCM on its stdin. All deliverables therefore
+come out of one pass over the chunks, and no intermediate file holds the
+whole render.
+
+A target is ``FORMAT[:BITRATE][=PATH]``; without a path it lands next to
+``--out``, with the bitrate in the name when a format is requested twice::
+
+    --encode opus:48k --encode mp3:128k --encode mp3:64k
+    -> render.opus, render.128k.mp3, render.64k.mp3
+
+Chunk boundaries become chapters in every encoded file (ID3 CHAP frames in
+MP3, CHAPTERnnn comments in Opus and FLAC). They are computed from the chunk
+lengths before encoding starts and handed to ffmpeg as an FFMETADATA input.
+The Vorbis-comment tags are written here rather than by ffmpeg's muxers,
+which round the seconds field (2.6 s comes out as 00:00:03.600) and write
+nothing at all for FLAC.
+"""
+import os
+import subprocess
+import tempfile
+from collections import Counter
+
+import numpy as np
+
+from scripts.audio_io import WavWriter
+
+FORMATS = {
+    "opus": {"codec": "libopus", "ext": ".opus", "bitrate": "64k", "rates": (48000, 24000, 16000, 12000, 8000),
+             "chapters": "vorbis"},
+    "mp3": {"codec": "libmp3lame", "ext": ".mp3", "bitrate": "128k",
+            "rates": (48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000), "chapters": "ffmpeg"},
+    "flac": {"codec": "flac", "ext": ".flac", "bitrate": None, "rates": None, "chapters": "vorbis"},
+}
+
+
+def parse_target(spec):
+    """``{"format", "bitrate", "path"}`` for one ``FORMAT[:BITRATE][=PATH]`` spec (path may be None)."""
+    head, _, path = spec.partition("=")
+    fmt, _, bitrate = head.strip().lower().partition(":")
+    if fmt not in FORMATS:
+        raise ValueError(f"unknown encode format {fmt!r} (choose from {', '.join(FORMATS)})")
+    if bitrate and FORMATS[fmt]["bitrate"] is None:
+        raise ValueError(f"{fmt} is lossless and takes no bitrate")
+    return {"format": fmt, "bitrate": bitrate or FORMATS[fmt]["bitrate"], "path": path.strip() or None}
+
+
+def parse_targets(specs, out):
+    """Parse ``--encode`` specs, naming outputs after ``out`` where no path is given."""
+    targets = [parse_target(s) for s in specs or ()]
+    repeated = Counter(t["format"] for t in targets if not t["path"])
+    base = os.path.splitext(out)[0]
+    for t in targets:
+        if not t["path"]:
+            tag = f".{t['bitrate']}" if repeated[t["format"]] > 1 and t["bitrate"] else ""
+            t["path"] = base + tag + FORMATS[t["format"]]["ext"]
+    paths = [os.path.abspath(t["path"]) for t in targets]
+    if len(set(paths)) != len(paths) or os.path.abspath(out) in paths:
+        raise ValueError("two outputs would be written to the same file; give explicit paths (FORMAT:BITRATE=PATH)")
+    return targets
+
+
+def chapter_title(text, words=8):
+    parts = text.split()
+    return " ".join(parts[:words]) + (" ..." if len(parts) > words else "")
+
+
+def chapter_marks(lengths, fade, titles=None):
+    """Chapters ``{"start", "end", "title"}`` (in output frames) for chunks of ``lengths`` frames.
+
+    Each chapter starts where its chunk's crossfade begins, matching
+    StreamingCrossfader's output.
+    """
+    starts, pos = [], 0
+    for i, n in enumerate(lengths):
+        if i:
+            pos -= min(fade, lengths[i - 1], n)
+        starts.append(max(0, pos))
+        pos += n
+    ends = starts[1:] + [pos]
+    titles = titles or [f"Part {i + 1}" for i in range(len(lengths))]
+    return [{"start": s, "end": e, "title": t} for s, e, t in zip(starts, ends, titles) if e > s]
+
+
+def _escape(value):
+    for ch in ("\\", "=", ";", "#", "\n"):
+        value = value.replace(ch, "\\" + ch)
+    return value
+
+
+def _timestamp(frames, sr):
+    ms = frames * 1000 // sr
+    return f"{ms // 3600000:02d}:{ms // 60000 % 60:02d}:{ms // 1000 % 60:02d}.{ms % 1000:03d}"
+
+
+def write_ffmetadata(path, chapters, sr, style="ffmpeg"):
+    """FFMETADATA file with ``chapters`` as [CHAPTER] sections, or as Vorbis CHAPTERnnn tags."""
+    with open(path, "w", encoding="utf-8") as fh:
+        fh.write(";FFMETADATA1\n")
+        for i, ch in enumerate(chapters):
+            if style == "vorbis":
+                fh.write(f"CHAPTER{i:03d}={_timestamp(ch['start'], sr)}\nCHAPTER{i:03d}NAME={_escape(ch['title'])}\n")
+            else:
+                fh.write(f"[CHAPTER]\nTIMEBASE=1/{sr}\nSTART={ch['start']}\nEND={ch['end']}\n"
+                         f"title={_escape(ch['title'])}\n")
+
+
+def encoder_command(target, sr, metadata=None):
+    """ffmpeg command reading mono float32 PCM at ``sr`` from stdin and encoding ``target``."""
+    spec = FORMATS[target["format"]]
+    cmd = ["ffmpeg", "-y", "-hide_banner", "-loglevel", "error", "-f", "f32le", "-ar", str(sr), "-ac", "1", "-i", "-"]
+    if metadata:
+        cmd += ["-f", "ffmetadata", "-i", metadata, "-map", "0:a", "-map_metadata", "1"]
+        if spec["chapters"] == "ffmpeg":
+            cmd += ["-map_chapters", "1"]
+    cmd += ["-c:a", spec["codec"]]
+    if target.get("bitrate"):
+        cmd += ["-b:a", target["bitrate"]]
+    if spec["rates"] and sr not in spec["rates"]:
+        cmd += ["-ar", str(spec["rates"][0])]
+    return cmd + [target["path"]]
+
+
+class AudioOutputs:
+    """Write float32 blocks to a WAV master (``wav`` path, or None for none) and to ffmpeg encoders.
+
+    Used like WavWriter: ``write()`` blocks, then ``close()`` (or a ``with``
+    block), which waits for the encoders and raises if any of them failed.
+    """
+
+    def __init__(self, wav, sample_rate, targets=(), chapters=None):
+        self.sample_rate = sample_rate
+        self.frames = 0
+        self.targets = list(targets)
+        self._wav = WavWriter(wav, sample_rate) if wav else None
+        self._meta = {}
+        self._procs = []
+        try:
+            for t in self.targets:
+                style = FORMATS[t["format"]]["chapters"]
+                if chapters and style not in self._meta:
+                    fd, self._meta[style] = tempfile.mkstemp(prefix="chapters.", suffix=".txt")
+                    os.close(fd)
+                    write_ffmetadata(self._meta[style], chapters, sample_rate, style)
+                os.makedirs(os.path.dirname(t["path"]) or ".", exist_ok=True)
+                err = tempfile.TemporaryFile()
+                proc = subprocess.Popen(encoder_command(t, sample_rate, self._meta.get(style)), stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=err)
+                self._procs.append((t, proc, err))
+        except BaseException:
+            self._abort()
+            raise
+
+    def write(self, samples):
+        if not len(samples):
+            return
+        if self._wav:
+            self._wav.write(samples)
+        if self._procs:
+            data = np.clip(samples, -1.0, 1.0).astype("<f4").tobytes()
+            for _, proc, _ in self._procs:
+                try:
+                    proc.stdin.write(data)
+                except BrokenPipeError:
+                    self.close()  # raises with ffmpeg's message
+        self.frames += len(samples)
+
+    def _abort(self):
+        for _, proc, err in self._procs:
+            proc.kill()
+            proc.wait()
+            err.close()
+        self._procs = []
+        self._cleanup()
+
+    def _cleanup(self):
+        if self._wav:
+            self._wav.close()
+            self._wav = None
+        for path in self._meta.values():
+            os.remove(path)
+        self._meta = {}
+
+    def close(self):
+        failed = []
+        for t, proc, err in self._procs:
+            try:
+                proc.stdin.close()
+            except BrokenPipeError:
+                pass
+            if proc.wait():
+                err.seek(0)
+                failed.append(f"{t['path']}: {err.read().decode('utf-8', errors='ignore').strip()}")
+            err.close()
+        self._procs = []
+        self._cleanup()
+        if failed:
+            raise RuntimeError("ffmpeg encode failed for " + "; ".join(failed))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self._abort()
@@ -1,4 +1,6 @@
-import os, json, time, datetime, pathlib, threading
+import os, time, datetime, pathlib
+
+from scripts.tracing import Span, emit
 
 class JsonlLogger:
     def __init__(self, run_dir: str | None = None):
@@ -8,7 +10,6 @@ class JsonlLogger:
         self.logs_dir = self.run_dir / "logs"
         os.makedirs(self.logs_dir, exist_ok=True)
         self._path = self.logs_dir / "render.jsonl"
-        self._lock = threading.Lock()
 
     @property
     def path(self): return str(self._path)
@@ -16,9 +17,18 @@ class JsonlLogger:
     def _stamp(self): return datetime.datetime.utcnow().isoformat() + "Z"
 
     def log(self, kind: str, **fields):
-        rec = {"ts": self._stamp(), "kind": kind}
+        # Buffered, lock-protected appends shared with every other process logging to this run (see tracing.py).
+        rec = {"ts": self._stamp(), "kind": kind, "pid": os.getpid()}
         rec.update(fields)
-        line = json.dumps(rec, ensure_ascii=False)
-        with self._lock:
-            with open(self._path, "a", encoding="utf-8") as f:
-                f.write(line + "\n")
+        emit(self.path, rec, urgent=kind.endswith("_error"))
+
+    def _write_span(self, rec):
+        stamp = datetime.datetime.fromtimestamp(rec["start"], datetime.timezone.utc).replace(tzinfo=None)
+        emit(self.path, {"ts": stamp.isoformat() + "Z", "kind": "span", **rec}, urgent="error" in rec)
+
+    def span(self, name: str, **fields):
+        """Context manager timing ``name``; written as a ``kind="span"`` record."""
+        return Span(self._write_span, name, fields)
+
+    def start_span(self, name: str, **fields):
+        return self.span(name, **fields).start()
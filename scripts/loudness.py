@@ -0,0 +1,172 @@
+"""Native EBU R128 / ITU-R BS.1770-4 loudness measurement and gain planning.
+
+Chunks are measured independently as they are produced: each one is reduced
+to a list of 100 ms K-weighted mean-square values plus its true peak. The
+joiner combines those per-chunk statistics into the programme's integrated
+loudness (400 ms blocks with 75 % overlap, absolute -70 LUFS and relative
+-10 LU gates), picks one linear gain and applies it while streaming the
+join, so the render is decoded once and no ``_pre.wav`` is needed.
+
+ffmpeg's loudnorm stays available as a reference (see ``measure_with_ffmpeg``).
+"""
+import json
+import math
+import os
+import re
+import subprocess
+
+import numpy as np
+
+from scripts.audio_io import read_wav, resample
+
+TARGET_I = -16.0
+TARGET_TP = -1.0
+SUB_BLOCK_SEC = 0.1
+ABS_GATE = -70.0
+
+
+def _k_weighting(rate):
+    """Biquad coefficients of the BS.1770 pre-filter (shelf + RLB high-pass)."""
+    f0, gain_db, q = 1681.974450955533, 3.999843853973347, 0.7071752369554196
+    k = math.tan(math.pi * f0 / rate)
+    vh = 10.0 ** (gain_db / 20.0)
+    vb = vh ** 0.4996667741545416
+    a0 = 1.0 + k / q + k * k
+    shelf_b = [(vh + vb * k / q + k * k) / a0, 2.0 * (k * k - vh) / a0, (vh - vb * k / q + k * k) / a0]
+    shelf_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    f0, q = 38.13547087602444, 0.5003270373238773
+    k = math.tan(math.pi * f0 / rate)
+    a0 = 1.0 + k / q + k * k
+    hp_b = [1.0, -2.0, 1.0]
+    hp_a = [1.0, 2.0 * (k * k - 1.0) / a0, (1.0 - k / q + k * k) / a0]
+    return (shelf_b, shelf_a), (hp_b, hp_a)
+
+
+def _energy_to_lufs(energy):
+    return -0.691 + 10.0 * math.log10(energy) if energy > 0 else float("-inf")
+
+
+def true_peak(samples, rate):
+    """Inter-sample peak (linear), BS.1770-4 style: 4x oversampling."""
+    if not len(samples):
+        return 0.0
+    return float(np.max(np.abs(resample(samples, rate, rate * 4, half_taps=6))))
+
+
+def chunk_stats(samples, rate):
+    """Per-chunk statistics the joiner needs; JSON-serialisable."""
+    from scipy.signal import lfilter
+
+    samples = np.asarray(samples, dtype=np.float64)
+    (sb, sa), (hb, ha) = _k_weighting(rate)
+    weighted = lfilter(hb, ha, lfilter(sb, sa, samples))
+    step = int(round(rate * SUB_BLOCK_SEC))
+    full = len(weighted) // step
+    power = (weighted[:full * step].reshape(full, step) ** 2).mean(axis=1).tolist() if full else []
+    if len(weighted) > full * step:
+        power.append(float((weighted[full * step:] ** 2).mean()))
+    return {"rate": rate, "samples": len(samples), "power": power, "peak": true_peak(samples, rate)}
+
+
+def sidecar_path(wav_path):
+    return os.path.splitext(wav_path)[0] + ".loudness.json"
+
+
+def write_chunk_stats(wav_path):
+    """Measure a freshly written chunk WAV and store the stats next to it."""
+    samples, rate = read_wav(wav_path)
+    stats = chunk_stats(samples, rate)
+    with open(sidecar_path(wav_path), "w", encoding="utf-8") as fh:
+        json.dump(stats, fh)
+    return stats
+
+
+def load_chunk_stats(wav_path):
+    """Sidecar stats if up to date, otherwise measure the WAV now."""
+    side = sidecar_path(wav_path)
+    try:
+        if os.path.getmtime(side) >= os.path.getmtime(wav_path):
+            with open(side, "r", encoding="utf-8") as fh:
+                return json.load(fh)
+    except (OSError, ValueError):
+        pass
+    return write_chunk_stats(wav_path)
+
+
+def integrated_loudness(stats):
+    """Gated integrated loudness (LUFS) over the concatenated chunk stats."""
+    power = np.concatenate([np.asarray(s["power"], dtype=np.float64) for s in stats]) if stats else np.zeros(0)
+    if not len(power):
+        return float("-inf")
+    blocks = np.convolve(power, np.ones(4) / 4.0, mode="valid") if len(power) >= 4 else np.array([power.mean()])
+    with np.errstate(divide="ignore"):
+        lufs = -0.691 + 10.0 * np.log10(blocks)
+    gated = blocks[lufs > ABS_GATE]
+    if not len(gated):
+        return float("-inf")
+    relative = _energy_to_lufs(gated.mean()) - 10.0
+    gated = blocks[(lufs > ABS_GATE) & (lufs > relative)]
+    return _energy_to_lufs(gated.mean()) if len(gated) else float("-inf")
+
+
+def loudness_range(stats):
+    """EBU Tech 3342 LRA from 3 s short-term blocks (1 s hop)."""
+    power = np.concatenate([np.asarray(s["power"], dtype=np.float64) for s in stats]) if stats else np.zeros(0)
+    if len(power) < 30:
+        return 0.0
+    short = np.convolve(power, np.ones(30) / 30.0, mode="valid")[::10]
+    with np.errstate(divide="ignore"):
+        lufs = -0.691 + 10.0 * np.log10(short)
+    gated = short[lufs > ABS_GATE]
+    if not len(gated):
+        return 0.0
+    relative = _energy_to_lufs(gated.mean()) - 20.0
+    kept = lufs[(lufs > ABS_GATE) & (lufs > relative)]
+    if not len(kept):
+        return 0.0
+    return float(np.percentile(kept, 95) - np.percentile(kept, 10))
+
+
+def plan_gain(stats, target_i=TARGET_I, target_tp=TARGET_TP):
+    """Pick one linear gain for the programme.
+
+    Like loudnorm's linear mode: aim for ``target_i`` but never push the true
+    peak above ``target_tp``. Returns ``(gain_db, report)``.
+    """
+    measured_i = integrated_loudness(stats)
+    peak = max((s["peak"] for s in stats), default=0.0)
+    measured_tp = 20.0 * math.log10(peak) if peak > 0 else float("-inf")
+    if math.isinf(measured_i):
+        gain_db = 0.0
+    else:
+        gain_db = target_i - measured_i
+    peak_limited = measured_tp + gain_db > target_tp
+    if peak_limited:
+        gain_db = target_tp - measured_tp
+    report = {
+        "input_i": round(measured_i, 2),
+        "input_tp": round(measured_tp, 2),
+        "input_lra": round(loudness_range(stats), 2),
+        "target_i": target_i,
+        "target_tp": target_tp,
+        "gain_db": round(gain_db, 2),
+        "output_i": round(measured_i + gain_db, 2),
+        "peak_limited": bool(peak_limited),
+    }
+    return gain_db, report
+
+
+def parse_loudnorm_json(meter):
+    """Pull the measured values out of ffmpeg loudnorm's print_format=json stderr."""
+    get = lambda k: (re.search(rf'"{k}"\s*:\s*"?([-0-9.inf]+)', meter) or [None, None])[1]
+    return {k: get(k) for k in ("input_i", "input_tp", "input_lra", "input_thresh", "target_offset")}
+
+
+def measure_with_ffmpeg(path):
+    """Reference measurement of a finished file with ffmpeg loudnorm."""
+    meter = subprocess.run([
+        'ffmpeg', '-hide_banner', '-nostats', '-i', path, '-af',
+        f'loudnorm=I={TARGET_I}:TP={TARGET_TP}:LRA=11:print_format=json',
+        '-f', 'null', '-'
+    ], stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True).stdout.decode('utf-8', errors='ignore')
+    return {k: float(v) if v not in (None, "") else None for k, v in parse_loudnorm_json(meter).items()}
@@ -0,0 +1,156 @@
+"""Memory-mappable XTTS weight snapshot.
+
+``xtts_v2.pth`` is a training checkpoint: ``torch.load`` reads all of it into
+private memory, and then the weights are copied again into the model. The
+snapshot, ``xtts_v2.snapshot.pt`` next to it, holds only the inference state
+dict, already in the key layout XTTS expects. It is written once, by
+``python scripts/model_snapshot.py`` or ``make snapshot``.
+
+``load_snapshot`` loads it with ``torch.load(mmap=True)`` and assigns the
+mapped tensors straight into the model (``load_state_dict(assign=True)``).
+The weights stay file-backed pages, so every worker that maps the same file
+shares one copy through the page cache, and start-up only faults in the pages
+that are actually used. This needs torch >= 2.1. On older torch, or when the
+snapshot is missing or older than ``xtts_v2.pth``, ``load_snapshot`` returns
+None and the workers load the checkpoint as before.
+"""
+import argparse
+import functools
+import inspect
+import json
+import os
+import sys
+import time
+from datetime import datetime, timezone
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/model_snapshot.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.tracing import write_log
+
+CHECKPOINT = "xtts_v2.pth"
+SNAPSHOT = "xtts_v2.snapshot.pt"
+SNAPSHOT_META = "xtts_v2.snapshot.json"
+FORMAT = "xtts-snapshot"
+VERSION = 1
+MODEL_NAME = "tts_models/multilingual/multi-dataset/xtts_v2"
+
+
+def supports_mmap():
+    import torch
+
+    return ("mmap" in inspect.signature(torch.load).parameters
+            and "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters)
+
+
+def snapshot_status(model_dir):
+    """``(usable, reason)`` for the snapshot in ``model_dir``."""
+    path, meta_path = os.path.join(model_dir, SNAPSHOT), os.path.join(model_dir, SNAPSHOT_META)
+    if not (os.path.exists(path) and os.path.exists(meta_path)):
+        return False, "no snapshot"
+    if not os.path.exists(os.path.join(model_dir, "config.json")):
+        return False, "no config.json"
+    with open(meta_path, "r", encoding="utf-8") as fh:
+        meta = json.load(fh)
+    if meta.get("format") != FORMAT or meta.get("version", 0) > VERSION:
+        return False, "unsupported snapshot format"
+    checkpoint = os.path.join(model_dir, CHECKPOINT)
+    if os.path.exists(checkpoint):
+        st = os.stat(checkpoint)
+        if (st.st_size, int(st.st_mtime)) != (meta.get("source_size"), meta.get("source_mtime")):
+            return False, f"{CHECKPOINT} changed since the snapshot was built"
+    return True, "ok"
+
+
+def build_snapshot(model_dir):
+    """Write the inference state dict of ``model_dir/xtts_v2.pth`` as a snapshot. Returns its metadata."""
+    import torch
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+
+    checkpoint = os.path.join(model_dir, CHECKPOINT)
+    config = XttsConfig()
+    config.load_json(os.path.join(model_dir, "config.json"))
+    state = Xtts.init_from_config(config).get_compatible_checkpoint_state_dict(checkpoint)
+    state = {k: v.contiguous() for k, v in state.items()}
+    path = os.path.join(model_dir, SNAPSHOT)
+    tmp = path + ".tmp"
+    torch.save(state, tmp)
+    os.replace(tmp, path)
+    st = os.stat(checkpoint)
+    meta = {
+        "format": FORMAT,
+        "version": VERSION,
+        "source_size": st.st_size,
+        "source_mtime": int(st.st_mtime),
+        "tensors": len(state),
+        "bytes": sum(v.numel() * v.element_size() for v in state.values()),
+        "torch": torch.__version__,
+        "created": datetime.now(timezone.utc).isoformat(),
+    }
+    with open(os.path.join(model_dir, SNAPSHOT_META), "w", encoding="utf-8") as fh:
+        json.dump(meta, fh, indent=2)
+    return meta
+
+
+def load_snapshot(model_dir, gpu=False):
+    """A ``TTS.api.TTS`` whose XTTS weights are mapped from the snapshot, or None if it cannot be used."""
+    if not model_dir or not snapshot_status(model_dir)[0] or not supports_mmap():
+        return None
+    import torch
+    from TTS.api import TTS
+    from TTS.tts.configs.xtts_config import XttsConfig
+    from TTS.tts.models.xtts import Xtts
+    from TTS.utils.synthesizer import Synthesizer
+
+    path = os.path.join(model_dir, SNAPSHOT)
+    config = XttsConfig()
+    config.load_json(os.path.join(model_dir, "config.json"))
+    xtts = Xtts.init_from_config(config)
+    state = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    # Run the stock load_checkpoint (tokenizer, speakers, GPT inference setup), but hand it the mapped
+    # state dict and have it adopt those tensors instead of copying them into fresh parameters.
+    xtts.get_compatible_checkpoint_state_dict = lambda _path: state
+    xtts.load_state_dict = functools.partial(torch.nn.Module.load_state_dict, xtts, assign=True)
+    try:
+        xtts.load_checkpoint(config, checkpoint_dir=model_dir, checkpoint_path=path, eval=True)
+    finally:
+        del xtts.get_compatible_checkpoint_state_dict, xtts.load_state_dict
+    if gpu:
+        xtts.cuda()
+
+    synthesizer = Synthesizer(use_cuda=gpu)
+    synthesizer.tts_model = xtts
+    synthesizer.tts_config = config
+    synthesizer.output_sample_rate = config.audio.output_sample_rate
+    model = TTS()
+    model.model_name = MODEL_NAME
+    model.config = config
+    model.synthesizer = synthesizer
+    return model
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Build the memory-mappable XTTS weight snapshot.")
+    ap.add_argument("--model-dir", default=os.environ.get("TTS_MODEL_DIR", "artifacts/models/xtts_v2"))
+    ap.add_argument("--check", action="store_true", help="Only report whether the snapshot is usable")
+    ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    args = ap.parse_args()
+
+    if args.check:
+        usable, reason = snapshot_status(args.model_dir)
+        print(f"{os.path.join(args.model_dir, SNAPSHOT)}: {reason}")
+        sys.exit(0 if usable else 1)
+    t0 = time.time()
+    meta = build_snapshot(args.model_dir)
+    write_log(args.log_file, "snapshot", "success", "Model snapshot written", model_dir=args.model_dir,
+              elapsed=round(time.time() - t0, 3), **meta)
+    print(f"Wrote {os.path.join(args.model_dir, SNAPSHOT)} ({meta['tensors']} tensors, {meta['bytes'] / 2**20:.0f} MB)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""In-process render pipeline: chunk -> synthesize -> join in one interpreter.
+
+The CLI path runs tts_chunk.py, a worker and tts_join.py as three separate
+processes that hand data over through chunks.jsonl, per-chunk WAV files and a
+``_pre.wav`` temp file. This module does the same work with Python/NumPy
+objects passed directly between stages, which matters most for short texts
+where interpreter start-up and imports dominate wall time.
+
+    from scripts.pipeline import load_model, render
+    model = load_model("cpu")
+    render(open("book.txt").read(), "out/render.wav", model=model, voice="voice.pt")
+"""
+import os
+import time
+
+import numpy as np
+
+from scripts.audio_io import WavWriter, resample
+from scripts.encoders import AudioOutputs, chapter_marks, chapter_title
+from scripts.loudness import chunk_stats, plan_gain
+from scripts.tts_chunk import plan_chunks
+from scripts.tts_join import StreamingCrossfader, loudnorm_two_pass
+from scripts.voice_conditioning import VoiceSynth, load_voice as _load_voice_file
+from scripts.voice_registry import VoiceCache, resolve_voice
+
+
+def _noop_log(stage, status, message, **extra):
+    return None
+
+
+def load_model(device="cpu"):
+    """Load XTTS for ``device`` (same resolution rules as the workers)."""
+    from scripts.tts_worker_gpu import load_xtts
+
+    if device == "rocm":
+        os.environ.setdefault("HIP_VISIBLE_DEVICES", "0")
+    return load_xtts(device)
+
+
+def load_voice(voice):
+    """Accept a voice ID or voice file path (conditioning or legacy embedding), a loaded voice, or None."""
+    if voice is None or not isinstance(voice, (str, os.PathLike)):
+        return voice
+    return _load_voice_file(resolve_voice(voice))
+
+
+def chunk_stage(text, chunk_sec=20, language="en"):
+    """Split text into chunk records shaped like the lines of chunks.jsonl."""
+    return [{"id": i, **c} for i, c in enumerate(plan_chunks(text, chunk_sec, language=language))]
+
+
+def synthesize(model, chunks, voice=None, language="en", device="cpu", log=None, cache=None, dedupe=True,
+               voices=None):
+    """Yield ``(item, samples, sample_rate)`` per chunk, samples as float32.
+
+    Identical chunk texts are synthesized once per call (``dedupe``, which
+    keeps every distinct chunk in memory); with a ChunkCache, chunks rendered
+    by earlier runs are read back instead of synthesized.
+    ``voice`` may also be a ready VoiceSynth. A chunk record with its own
+    ``voice`` (ID or path) is rendered in that voice, taken from ``voices``
+    (a VoiceCache on ``model``, created on first use).
+    """
+    log = log or _noop_log
+    synth = voice if isinstance(voice, VoiceSynth) else VoiceSynth(model, load_voice(voice))
+    sample_rate = synth.sample_rate
+    seen = {}
+    for item in chunks:
+        text = item["text"]
+        active, extra = synth, {}
+        if item.get("voice") is not None:
+            if voices is None:
+                voices = VoiceCache(model)
+            active, extra = voices.get(item["voice"]), {"voice": voices.key(item["voice"])}
+        key = cache.key(text, language, **extra) if cache else None
+        memo = (extra.get("voice"), text)
+        entry = seen.get(memo)
+        if entry is None and cache:
+            hit = cache.read(key)
+            if hit:
+                entry = hit[0]
+                if dedupe:
+                    seen[memo] = entry
+        if entry is not None:
+            log("worker", "success", "Chunk served from cache", chunk_id=item["id"], device=device, cached=True)
+            yield item, entry, sample_rate
+            continue
+        start = time.time()
+        samples = active.tts(text, language)
+        duration = len(samples) / sample_rate
+        elapsed = time.time() - start
+        rtf = elapsed / max(1e-6, duration)
+        log("worker", "success", "Chunk rendered", chunk_id=item["id"], rtf=rtf,
+            elapsed=round(elapsed, 3), latency_ms=round(elapsed * 1000, 1), seconds=round(duration, 3),
+            synth=active.mode, device=device, text=text, language=language)
+        if dedupe:
+            seen[memo] = samples
+        if cache:
+            cache_store(cache, key, samples, sample_rate)
+        yield item, samples, sample_rate
+
+
+def cache_store(cache, key, samples, sample_rate):
+    """Add in-memory chunk audio to a ChunkCache (written as a temp WAV, then moved in)."""
+    tmp = os.path.join(cache.root, f"{key}.{os.getpid()}.wav")
+    with WavWriter(tmp, sample_rate) as writer:
+        writer.write(samples)
+    cache.store(key, tmp)
+    os.remove(tmp)
+
+
+def crossfade_arrays(arrays, sample_rate, crossfade_ms=8):
+    """Concatenate mono float arrays with a linear crossfade between neighbours."""
+    fader = StreamingCrossfader(sample_rate * crossfade_ms // 1000)
+    parts = [fader.push(a) for a in arrays]
+    parts.append(fader.flush())
+    return np.concatenate(parts)
+
+
+def join(samples, sample_rate, out, sr=48000, crossfade_ms=8, loudnorm="native", stats=None, encode=(), titles=None,
+         wav=True):
+    """Crossfade in memory and loudness-normalize straight into ``out``.
+
+    native: one gain from the per-chunk loudness ``stats`` (measured here if
+    not supplied) is applied while the resampled chunks are written, to the
+    WAV (unless ``wav=False``) and to any ``encode`` targets (encoders.py),
+    with a chapter per chunk named by ``titles``.
+    ffmpeg: the joined float32 PCM is piped to the two-pass loudnorm over
+    stdin, so no ``_pre.wav`` is written either way.
+    Returns ``(seconds, loudness report or None)``.
+    """
+    if loudnorm == "ffmpeg":
+        if encode or not wav:
+            raise ValueError("encoded outputs need loudnorm='native'")
+        audio = crossfade_arrays(samples, sample_rate, crossfade_ms)
+        raw = ['-f', 'f32le', '-ar', str(sample_rate), '-ac', '1', '-i', '-']
+        loudnorm_two_pass(raw, out, data=audio.tobytes(), sr=sr)
+        return len(audio) / sample_rate, None
+    if stats is None:
+        stats = [chunk_stats(a, sample_rate) for a in samples]
+    gain_db, report = plan_gain(stats)
+    gain = 10.0 ** (gain_db / 20.0)
+    fade = sr * crossfade_ms // 1000
+    fader = StreamingCrossfader(fade)
+    chapters = chapter_marks([-(-len(a) * sr // sample_rate) for a in samples], fade, titles) if encode else None
+    with AudioOutputs(out if wav else None, sr, encode, chapters) as writer:
+        for a in samples:
+            writer.write(fader.push(resample(a, sample_rate, sr)) * gain)
+        writer.write(fader.flush() * gain)
+    return writer.frames / sr, report
+
+
+def render(text, out, model=None, voice=None, language="en", device="cpu", chunk_sec=20, sr=48000,
+           crossfade_ms=8, loudnorm="native", log=None, cache=None, encode=(), wav=True):
+    """Render ``text`` to ``out`` in-process. Returns a small summary dict.
+
+    ``cache`` is an optional ChunkCache (built with ``params={"writer": "raw"}``
+    so its entries never mix with the workers' peak-normalized WAVs).
+    ``encode`` / ``wav`` are passed to ``join``; chapters are titled with
+    the start of each chunk's text.
+    """
+    log = log or _noop_log
+    start = time.time()
+    out_dir = os.path.dirname(out) or "."
+    os.makedirs(out_dir, exist_ok=True)
+    if model is None:
+        model = load_model(device)
+        log("pipeline", "info", "Model loaded", device=device, elapsed=round(time.time() - start, 3))
+    chunks = chunk_stage(text, chunk_sec, language)
+    log("chunk", "success", "Chunked input text", chunks=len(chunks))
+    t0 = time.time()
+    rendered, stats = [], []
+    for _, samples, rate in synthesize(model, chunks, voice, language, device, log, cache):
+        rendered.append(samples)
+        if loudnorm == "native":
+            stats.append(chunk_stats(samples, rate))
+    synth_elapsed = time.time() - t0
+    t0 = time.time()
+    seconds, loudness = join(rendered, model.synthesizer.output_sample_rate, out, sr, crossfade_ms, loudnorm,
+                             stats if loudnorm == "native" else None, encode,
+                             [chapter_title(c["text"]) for c in chunks], wav)
+    join_elapsed = time.time() - t0
+    summary = {
+        "output": out,
+        "chunks": len(chunks),
+        "seconds": round(seconds, 3),
+        "synth_elapsed": round(synth_elapsed, 3),
+        "join_elapsed": round(join_elapsed, 3),
+        "elapsed": round(time.time() - start, 3),
+        "device": device,
+        "loudness": loudness,
+    }
+    if encode:
+        summary["encoded"] = [t["path"] for t in encode]
+    if cache:
+        summary["cache"] = {**cache.stats(), **cache.evict()}
+    log("join", "success", "Chunks concatenated", output=out, chunk_count=len(chunks))
+    return summary
@@ -0,0 +1,243 @@
+"""CPU precision modes for XTTS, and an A/B check against fp32.
+
+``TTS_CPU_PRECISION`` (or ``--precision`` on the CPU workers and the CLIs)
+selects how the CPU workers run the GPT, which is where most of the time goes:
+
+    fp32  the full-precision model, as before (default)
+    int8  dynamic int8 quantization of the GPT's linear layers: weights stored
+          as int8, activations quantized per batch (``quantize_dynamic``)
+    bf16  bf16 autocast around the GPT; needs native bf16 on the CPU
+          (AVX512-BF16 or AMX), elsewhere it falls back to fp32
+
+The HiFi-GAN decoder is convolutional and stays fp32 in every mode. Rendered
+chunks are cached per precision, so switching modes never serves audio from
+another mode.
+
+    python scripts/precision.py --chunks chunks.jsonl --voice voice.pt --limit 8
+
+renders the same chunks (same seeds) in each mode and reports wall time,
+speedup over fp32, and a log-mel distance to the fp32 render after DTW
+alignment (dB; lower is closer, and identical audio is 0). ``--json``
+writes the report.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/precision.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+PRECISIONS = ("fp32", "int8", "bf16")
+
+
+def precision_from_env():
+    return os.environ.get("TTS_CPU_PRECISION", "fp32")
+
+
+def bf16_supported():
+    """True when the CPU has native bf16; emulated bf16 is slower than fp32."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8") as fh:
+            flags = set(fh.read().split())
+    except OSError:
+        return False
+    return bool(flags & {"avx512_bf16", "amx_bf16"})
+
+
+def _linearize(module):
+    """Swap HF ``Conv1D`` layers (GPT-2 attention/MLP) for equivalent ``nn.Linear`` so they can be quantized."""
+    import torch
+
+    for name, child in module.named_children():
+        if type(child).__name__ == "Conv1D" and hasattr(child, "nf"):
+            linear = torch.nn.Linear(child.weight.shape[0], child.nf)
+            linear.weight = torch.nn.Parameter(child.weight.detach().t().contiguous(), requires_grad=False)
+            linear.bias = child.bias
+            setattr(module, name, linear)
+        else:
+            _linearize(child)
+
+
+def _to_float(output):
+    import torch
+
+    if isinstance(output, torch.Tensor):
+        return output.float() if output.dtype == torch.bfloat16 else output
+    if type(output) is tuple:
+        return tuple(_to_float(o) for o in output)
+    if getattr(output, "logits", None) is not None:
+        output.logits = _to_float(output.logits)
+    return output
+
+
+def _autocast_forward(module):
+    """Run ``module.forward`` under bf16 autocast and hand fp32 results back to the caller."""
+    import torch
+
+    stack = []
+
+    def enter(_mod, _args):
+        ctx = torch.autocast("cpu", dtype=torch.bfloat16)
+        ctx.__enter__()
+        stack.append(ctx)
+
+    def leave(_mod, _args, output):
+        stack.pop().__exit__(None, None, None)
+        return _to_float(output)
+
+    module.register_forward_pre_hook(enter)
+    module.register_forward_hook(leave)
+
+
+def apply_precision(model, mode="fp32"):
+    """Prepare a loaded ``TTS.api.TTS`` for ``mode`` in place. Returns the mode actually in effect."""
+    if mode not in PRECISIONS:
+        raise ValueError(f"unknown precision {mode!r} (expected one of {', '.join(PRECISIONS)})")
+    if mode == "bf16" and not bf16_supported():
+        return "fp32"
+    if mode == "fp32" or getattr(model, "_tts_precision", None) == mode:
+        return mode  # nothing to do, or already applied (e.g. by the zygote before forking)
+    import torch
+
+    gpt = model.synthesizer.tts_model.gpt
+    if mode == "int8":
+        _linearize(gpt)
+        torch.ao.quantization.quantize_dynamic(gpt, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    else:
+        # Generation steps go through gpt_inference; the latent pass after it through gpt itself.
+        for module in (getattr(gpt, "gpt_inference", None), gpt):
+            if module is not None:
+                _autocast_forward(module)
+    model._tts_precision = mode
+    return mode
+
+
+def cache_params(mode, **params):
+    """Chunk-cache params for renders in ``mode``; fp32 keeps the keys it always had."""
+    if mode != "fp32":
+        params["precision"] = mode
+    return params
+
+
+# --- A/B check ---------------------------------------------------------------
+
+def _mel_filters(sr, n_fft, n_mels):
+    def hz_to_mel(f):
+        return 2595.0 * np.log10(1.0 + f / 700.0)
+
+    def mel_to_hz(m):
+        return 700.0 * (10.0 ** (m / 2595.0) - 1.0)
+
+    pts = mel_to_hz(np.linspace(hz_to_mel(0.0), hz_to_mel(sr / 2.0), n_mels + 2))
+    bins = np.fft.rfftfreq(n_fft, 1.0 / sr)
+    lower, center, upper = pts[:-2, None], pts[1:-1, None], pts[2:, None]
+    return np.maximum(0.0, np.minimum((bins - lower) / (center - lower), (upper - bins) / (upper - center)))
+
+
+def log_mel(wav, sr, n_fft=1024, hop=256, n_mels=80):
+    """Log-mel spectrogram in dB, one row per frame, floored 80 dB below the peak."""
+    wav = np.asarray(wav, dtype=np.float64).reshape(-1)
+    if len(wav) < n_fft:
+        wav = np.pad(wav, (0, n_fft - len(wav)))
+    frames = np.lib.stride_tricks.sliding_window_view(wav, n_fft)[::hop]
+    power = np.abs(np.fft.rfft(frames * np.hanning(n_fft), axis=1)) ** 2
+    db = 10.0 * np.log10(np.maximum(power @ _mel_filters(sr, n_fft, n_mels).T, 1e-10))
+    return np.maximum(db, db.max() - 80.0)
+
+
+def mel_distance(a, b, sr):
+    """RMS log-mel difference (dB) per frame along the DTW alignment of ``a`` and ``b``."""
+    A, B = log_mel(a, sr), log_mel(b, sr)
+    sq = (A ** 2).sum(1)[:, None] + (B ** 2).sum(1)[None, :] - 2.0 * A @ B.T
+    cost = np.sqrt(np.maximum(sq, 0.0) / A.shape[1])
+    n, m = cost.shape
+    acc = np.full((n + 1, m + 1), np.inf)
+    acc[0, 0] = 0.0
+    for k in range(2, n + m + 1):  # anti-diagonals i + j = k only depend on the previous two
+        i = np.arange(max(1, k - m), min(n, k - 1) + 1)
+        j = k - i
+        acc[i, j] = cost[i - 1, j - 1] + np.minimum(np.minimum(acc[i - 1, j - 1], acc[i - 1, j]), acc[i, j - 1])
+    return float(acc[n, m] / (n + m))
+
+
+def _render_all(mode, chunks, voice, language, seed):
+    import torch
+
+    from scripts.tts_worker_cpu import load_xtts
+    from scripts.voice_conditioning import VoiceSynth
+
+    model = load_xtts()
+    effective = apply_precision(model, mode)
+    synth = VoiceSynth(model, voice)
+    wavs, start = [], time.time()
+    for item in chunks:
+        torch.manual_seed(seed + item["id"])
+        wavs.append(synth.tts(item["text"], language))
+    return effective, wavs, time.time() - start, synth.sample_rate
+
+
+def ab_check(chunks, voice=None, modes=PRECISIONS, language="en", seed=0):
+    """Render ``chunks`` in fp32 and each of ``modes``; compare time and audio with fp32."""
+    report = {"chunks": len(chunks), "seed": seed, "modes": {}}
+    reference = None
+    for mode in ["fp32"] + [m for m in modes if m != "fp32"]:
+        effective, wavs, elapsed, sr = _render_all(mode, chunks, voice, language, seed)
+        seconds = sum(len(w) for w in wavs) / sr
+        row = {"effective": effective, "elapsed": round(elapsed, 3), "audio_sec": round(seconds, 2),
+               "rtf": round(elapsed / max(1e-6, seconds), 3)}
+        if reference is None:
+            reference = (wavs, elapsed)
+        else:
+            dists = [mel_distance(a, b, sr) for a, b in zip(reference[0], wavs)]
+            row["speedup"] = round(reference[1] / max(1e-6, elapsed), 2)
+            row["mel_dist_db"] = {"mean": round(float(np.mean(dists)), 2), "max": round(float(np.max(dists)), 2)}
+            row["duration_ratio"] = round(seconds / max(1e-6, sum(len(w) for w in reference[0]) / sr), 3)
+        report["modes"][mode] = row
+    return report
+
+
+def main():
+    from scripts.chunk_queue import read_chunks
+    from scripts.tracing import write_log
+    from scripts.worker_pool import apply_thread_budget
+
+    ap = argparse.ArgumentParser(description="A/B the CPU precision modes against fp32 on a fixed chunk set.")
+    ap.add_argument("--chunks", required=True, help="chunks.jsonl (from tts_chunk.py)")
+    ap.add_argument("--voice", default=None)
+    ap.add_argument("--language", default="en")
+    ap.add_argument("--modes", default=",".join(PRECISIONS), help="Comma-separated modes to compare with fp32")
+    ap.add_argument("--limit", type=int, default=8, help="First N chunks to render in each mode")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--json", default=None, help="Also write the report as JSON")
+    ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    args = ap.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for mode in modes:
+        if mode not in PRECISIONS:
+            ap.error(f"unknown precision {mode!r}")
+    apply_thread_budget()
+    chunks = read_chunks(args.chunks)[:args.limit]
+    rep = ab_check(chunks, args.voice, modes, args.language, args.seed)
+    write_log(args.log_file, "precision", "success", "Precision A/B check", **rep)
+    for mode, row in rep["modes"].items():
+        line = f"{mode:>5} ({row['effective']}): {row['elapsed']:8.2f}s  RTF {row['rtf']}"
+        if "speedup" in row:
+            line += (f"  speedup {row['speedup']}x  mel distance {row['mel_dist_db']['mean']} dB"
+                     f" (max {row['mel_dist_db']['max']})  duration x{row['duration_ratio']}")
+        print(line)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(rep, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+"""Render analytics over run logs (``run.jsonl`` and ``render.jsonl``).
+
+Reads any mix of ``write_log`` logs (``--log-file`` / ``TTS_LOG_FILE``, the
+Makefile's ``artifacts/logs/run.jsonl``) and ``JsonlLogger`` logs
+(``runs/<timestamp>/logs/render.jsonl``); a directory argument means every
+``*.jsonl`` below it. Logs are streamed line by line into typed columns, so
+memory grows by a few bytes per chunk, not per log line:
+
+    chunks: run, device, chunk_id, rtf, seconds, cached
+    spans:  run, name, dur
+
+A shared ``run.jsonl`` holds one run per ``XTTS CLI invoked`` record; each
+``render.jsonl`` is one run (its run directory name).
+
+    python scripts/render_report.py artifacts/logs/run.jsonl runs/
+    python scripts/render_report.py runs/ --compact artifacts/logs/summary.npz
+    python scripts/render_report.py artifacts/logs/summary.npz --diff --json report.json
+
+``--compact`` stores the columns as a compressed ``.npz``; passing that file
+back skips log parsing entirely. The report covers RTF percentiles, per-device
+throughput (audio seconds per synthesis second), time per span name, the
+slowest chunks by RTF, and with ``--diff`` the change from each run to the
+next.
+"""
+import argparse
+import json
+import os
+import sys
+from array import array
+
+import numpy as np
+
+QUANTILES = (50, 90, 95, 99)
+_CHUNK_DONE = ("Chunk rendered", "chunk_done")
+_CHUNK_CACHED = ("Chunk served from cache", "chunk_cached")
+
+
+def iter_log_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, files in sorted(os.walk(path)):
+                for name in sorted(files):
+                    if name.endswith(".jsonl") and name not in ("chunks.jsonl", "manifest.jsonl"):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+
+def _is_run_start(rec):
+    return rec.get("kind") == "pipeline_start" or (rec.get("stage") == "cli" and rec.get("status") == "start")
+
+
+def _source_name(path):
+    parent = os.path.dirname(os.path.abspath(path))
+    if os.path.basename(parent) == "logs":  # runs/<timestamp>/logs/render.jsonl
+        return os.path.basename(os.path.dirname(parent))
+    return os.path.splitext(os.path.basename(path))[0]
+
+
+class _Codes:
+    """String dictionary for a categorical column."""
+
+    def __init__(self, values=()):
+        self.values = list(values)
+        self.index = {v: i for i, v in enumerate(self.values)}
+
+    def code(self, value):
+        value = str(value)
+        if value not in self.index:
+            self.index[value] = len(self.values)
+            self.values.append(value)
+        return self.index[value]
+
+
+class RenderLog:
+    """Columnar store of chunk and span rows from one or more logs."""
+
+    def __init__(self):
+        self.runs = _Codes()
+        self.devices = _Codes()
+        self.names = _Codes()
+        self.chunk = {"run": array("i"), "device": array("i"), "chunk_id": array("i"),
+                      "rtf": array("f"), "seconds": array("f"), "cached": array("b")}
+        self.span = {"run": array("i"), "name": array("i"), "dur": array("d")}
+
+    def ingest(self, path):
+        source = _source_name(path)
+        run = self.runs.code(source)
+        started = 0
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    continue
+                if _is_run_start(rec):
+                    started += 1
+                    if started > 1:
+                        run = self.runs.code(f"{source}#{started}")
+                    continue
+                kind = rec.get("kind") or rec.get("message")
+                if "span" in rec and "dur" in rec:
+                    self.span["run"].append(run)
+                    self.span["name"].append(self.names.code(rec["span"]))
+                    self.span["dur"].append(float(rec["dur"]))
+                elif kind in _CHUNK_DONE or kind in _CHUNK_CACHED:
+                    cached = kind in _CHUNK_CACHED
+                    self.chunk["run"].append(run)
+                    self.chunk["device"].append(self.devices.code(rec.get("device") or rec.get("engine") or "?"))
+                    self.chunk["chunk_id"].append(int(rec.get("chunk_id", -1)))
+                    self.chunk["rtf"].append(float("nan") if cached else float(rec.get("rtf", "nan")))
+                    self.chunk["seconds"].append(float(rec.get("seconds", 0.0) or 0.0))
+                    self.chunk["cached"].append(1 if cached else 0)
+        return self
+
+    def columns(self):
+        chunk = {k: np.frombuffer(v, dtype=v.typecode) for k, v in self.chunk.items()}
+        span = {k: np.frombuffer(v, dtype=v.typecode) for k, v in self.span.items()}
+        return chunk, span
+
+    def save(self, path):
+        chunk, span = self.columns()
+        meta = {"runs": self.runs.values, "devices": self.devices.values, "names": self.names.values}
+        np.savez_compressed(path, meta=np.array(json.dumps(meta)),
+                            **{f"chunk_{k}": v for k, v in chunk.items()},
+                            **{f"span_{k}": v for k, v in span.items()})
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        meta = json.loads(str(data["meta"]))
+        log = cls()
+        log.runs, log.devices, log.names = _Codes(meta["runs"]), _Codes(meta["devices"]), _Codes(meta["names"])
+        for key in log.chunk:
+            log.chunk[key] = array(log.chunk[key].typecode, data[f"chunk_{key}"].tobytes())
+        for key in log.span:
+            log.span[key] = array(log.span[key].typecode, data[f"span_{key}"].tobytes())
+        return log
+
+    @classmethod
+    def from_paths(cls, paths):
+        log = cls()
+        for path in iter_log_paths(paths):
+            if path.endswith(".npz"):
+                log.merge(cls.load(path))
+            else:
+                log.ingest(path)
+        return log
+
+    def merge(self, other):
+        runs = [self.runs.code(v) for v in other.runs.values]
+        devices = [self.devices.code(v) for v in other.devices.values]
+        names = [self.names.code(v) for v in other.names.values]
+        self.chunk["run"].extend(runs[c] for c in other.chunk["run"])
+        self.chunk["device"].extend(devices[c] for c in other.chunk["device"])
+        self.span["run"].extend(runs[c] for c in other.span["run"])
+        self.span["name"].extend(names[c] for c in other.span["name"])
+        for key in ("chunk_id", "rtf", "seconds", "cached"):
+            self.chunk[key].extend(other.chunk[key])
+        self.span["dur"].extend(other.span["dur"])
+
+
+def _quantiles(values):
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return {}
+    return {f"p{q}": round(float(v), 3) for q, v in zip(QUANTILES, np.percentile(values, QUANTILES))}
+
+
+def _chunk_summary(rtf, seconds, cached):
+    rendered = cached == 0
+    compute = float(np.nansum(rtf[rendered] * seconds[rendered]))
+    return {
+        "chunks": int(len(rtf)),
+        "cached": int((~rendered).sum()),
+        "audio_sec": round(float(seconds.sum()), 1),
+        "synth_sec": round(compute, 1),
+        "throughput": round(float(seconds[rendered].sum()) / compute, 2) if compute else None,
+        "rtf": _quantiles(rtf[rendered]),
+    }
+
+
+def report(log, top=10):
+    chunk, span = log.columns()
+    out = {"overall": _chunk_summary(chunk["rtf"], chunk["seconds"], chunk["cached"]), "devices": {}, "runs": {}}
+    for code, device in enumerate(log.devices.values):
+        sel = chunk["device"] == code
+        out["devices"][device] = _chunk_summary(chunk["rtf"][sel], chunk["seconds"][sel], chunk["cached"][sel])
+    for code, run in enumerate(log.runs.values):
+        sel, spans = chunk["run"] == code, span["run"] == code
+        if not sel.any() and not spans.any():
+            continue
+        summary = _chunk_summary(chunk["rtf"][sel], chunk["seconds"][sel], chunk["cached"][sel])
+        summary["spans"] = {log.names.values[n]: round(float(span["dur"][spans & (span["name"] == n)].sum()), 3)
+                            for n in np.unique(span["name"][spans])}
+        out["runs"][run] = summary
+    out["spans"] = {}
+    for n in np.unique(span["name"]):
+        durs = span["dur"][span["name"] == n]
+        out["spans"][log.names.values[n]] = {"total_sec": round(float(durs.sum()), 3), "count": int(len(durs)),
+                                             "mean_sec": round(float(durs.mean()), 4)}
+    order = np.argsort(np.nan_to_num(chunk["rtf"], nan=-1.0))[::-1][:top]
+    out["slowest"] = [{"run": log.runs.values[chunk["run"][i]], "chunk_id": int(chunk["chunk_id"][i]),
+                       "device": log.devices.values[chunk["device"][i]], "rtf": round(float(chunk["rtf"][i]), 3),
+                       "seconds": round(float(chunk["seconds"][i]), 2)}
+                      for i in order if not np.isnan(chunk["rtf"][i])]
+    return out
+
+
+def diff_runs(before, after):
+    """Changes from one run summary to the next (after - before)."""
+    def delta(a, b):
+        return round(b - a, 3) if a is not None and b is not None else None
+
+    names = sorted(set(before.get("spans", {})) | set(after.get("spans", {})))
+    return {
+        "throughput": delta(before["throughput"], after["throughput"]),
+        "rtf": {q: delta(before["rtf"].get(q), after["rtf"].get(q)) for q in after["rtf"]},
+        "audio_sec": delta(before["audio_sec"], after["audio_sec"]),
+        "spans": {n: delta(before["spans"].get(n, 0.0), after["spans"].get(n, 0.0)) for n in names},
+    }
+
+
+def _print(rep, diffs):
+    o = rep["overall"]
+    print(f"chunks {o['chunks']} ({o['cached']} cached), audio {o['audio_sec']}s, synth {o['synth_sec']}s, "
+          f"throughput {o['throughput']}x, RTF {o['rtf']}")
+    print("\nper device:")
+    for device, d in rep["devices"].items():
+        print(f"  {device:>8}: {d['chunks']:6d} chunks  {d['throughput']}x  RTF {d['rtf']}")
+    print("\nper run:")
+    for run, r in rep["runs"].items():
+        print(f"  {run}: {r['chunks']} chunks  {r['throughput']}x  RTF {r['rtf']}")
+    if rep["spans"]:
+        print("\ntime per span:")
+        for name, s in sorted(rep["spans"].items(), key=lambda kv: -kv[1]["total_sec"]):
+            print(f"  {name:>14}: {s['total_sec']:10.3f}s  x{s['count']}  mean {s['mean_sec']}s")
+    if rep["slowest"]:
+        print("\nslowest chunks (RTF):")
+        for c in rep["slowest"]:
+            print(f"  {c['run']} chunk {c['chunk_id']} on {c['device']}: RTF {c['rtf']} ({c['seconds']}s)")
+    for label, d in diffs:
+        print(f"\n{label}: throughput {d['throughput']}x, RTF {d['rtf']}, audio {d['audio_sec']}s")
+        for name, sec in d["spans"].items():
+            print(f"  {name:>14}: {sec:+.3f}s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarize render logs: RTF, throughput, stage times, slow chunks.")
+    ap.add_argument("logs", nargs="+", help="run.jsonl / render.jsonl files, directories of them, or a .npz summary")
+    ap.add_argument("--top", type=int, default=10, help="Slowest chunks to list")
+    ap.add_argument("--diff", action="store_true", help="Show the change from each run to the next")
+    ap.add_argument("--compact", default=None, help="Write the parsed columns to this .npz for fast re-reads")
+    ap.add_argument("--json", default=None, help="Also write the report as JSON")
+    args = ap.parse_args()
+
+    log = RenderLog.from_paths(args.logs)
+    if args.compact:
+        log.save(args.compact)
+        print("Wrote", args.compact, file=sys.stderr)
+    rep = report(log, args.top)
+    diffs = []
+    if args.diff:
+        runs = [(name, r) for name, r in rep["runs"].items() if r["chunks"]]
+        diffs = [(f"{a} -> {b}", diff_runs(ra, rb)) for (a, ra), (b, rb) in zip(runs, runs[1:])]
+        rep["diffs"] = dict(diffs)
+    _print(rep, diffs)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(rep, fh, indent=2)
+
+
+if __name__ == "__main__":
+    main()
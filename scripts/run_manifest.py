@@ -0,0 +1,126 @@
+"""Per-run chunk manifest used to resume interrupted renders.
+
+Workers append one JSON line per finished chunk to ``<chunks dir>/manifest.jsonl``
+(id, status, output path, duration, SHA-256 of the WAV and of the chunk text).
+Appends are single small writes, so several pool members can share the file.
+The last record for an id wins.
+
+On ``--resume`` the CLI checks every recorded chunk against the file on disk
+and hands the workers only the chunks that are missing, corrupt, or whose
+text changed since they were rendered.
+"""
+import hashlib
+import json
+import os
+import wave
+from datetime import datetime, timezone
+
+MANIFEST_NAME = "manifest.jsonl"
+
+
+def text_digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def wav_digest(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def wav_seconds(path):
+    """Duration from the WAV header; raises on a truncated/garbled file."""
+    with wave.open(path, "rb") as w:
+        frames, rate = w.getnframes(), w.getframerate()
+        expected = frames * w.getsampwidth() * w.getnchannels()
+    if os.path.getsize(path) < expected:
+        raise wave.Error(f"{path} is truncated")
+    return frames / float(rate)
+
+
+class RunManifest:
+    def __init__(self, path):
+        self.path = path
+
+    @classmethod
+    def for_out_dir(cls, out_dir):
+        """Manifest for a chunks directory (TTS_MANIFEST overrides the location)."""
+        return cls(os.environ.get("TTS_MANIFEST") or os.path.join(out_dir, MANIFEST_NAME))
+
+    def record(self, chunk_id, path, text, status="done", **extra):
+        entry = {
+            "ts": datetime.now(timezone.utc).isoformat(),
+            "id": chunk_id,
+            "status": status,
+            "path": os.path.abspath(path),
+            "seconds": round(wav_seconds(path), 3),
+            "sha256": wav_digest(path),
+            "text_sha256": text_digest(text),
+            **extra,
+        }
+        line = (json.dumps(entry, ensure_ascii=False) + "\n").encode("utf-8")
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        return entry
+
+    def load(self):
+        records = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                for line in fh:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line from a killed worker
+                    records[rec["id"]] = rec
+        except FileNotFoundError:
+            pass
+        return records
+
+    def reset(self):
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def verify(record, text):
+    """True if the recorded chunk file is intact and matches the chunk text."""
+    if record.get("status") != "done" or record.get("text_sha256") != text_digest(text):
+        return False
+    path = record.get("path", "")
+    try:
+        wav_seconds(path)
+        return wav_digest(path) == record.get("sha256")
+    except (OSError, wave.Error, EOFError):
+        return False
+
+
+def plan_resume(chunks_jsonl, manifest, todo_path, check=verify):
+    """Write the chunks that still need rendering to ``todo_path``.
+
+    ``manifest`` is anything with ``load()``, and ``check(record, text)`` the
+    matching test (for a ChunkStore: the store and ``store.verify``).
+    Returns counts ``{"total", "done", "missing", "invalid"}``.
+    """
+    records = manifest.load()
+    counts = {"total": 0, "done": 0, "missing": 0, "invalid": 0}
+    with open(chunks_jsonl, "r", encoding="utf-8") as src, open(todo_path, "w", encoding="utf-8") as dst:
+        for line in src:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            counts["total"] += 1
+            rec = records.get(item["id"])
+            if rec is not None and check(rec, item["text"]):
+                counts["done"] += 1
+                continue
+            counts["missing" if rec is None else "invalid"] += 1
+            dst.write(line if line.endswith("\n") else line + "\n")
+    return counts
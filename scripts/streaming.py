@@ -0,0 +1,184 @@
+"""Pipelined render: chunking, synthesis and joining as concurrent stages.
+
+The regular paths write nothing to ``--out`` until every chunk has been
+synthesized, joined and normalized. Here the three stages run concurrently,
+connected by small bounded queues (a fast stage blocks instead of racing
+ahead), and the joiner appends each chunk to the output as soon as it and
+every chunk before it are ready:
+
+    chunk thread --q--> synth thread --q--> joiner (caller's thread)
+                                              |-> out.wav (header patched on every write)
+                                              '-> segments/seg_NNNNN.wav + playlist.m3u8
+
+The output WAV is valid at every point, so it can be played while it grows;
+the optional segment directory is a growing EVENT playlist for players that
+follow m3u8 files. Loudness uses the programme measured so far: each chunk's
+gain comes from the gated integrated loudness of everything up to and
+including it (true-peak capped as usual) and is ramped from the previous
+chunk's gain, so the first minute may sit slightly off target while later
+audio converges on -16 LUFS. Time-to-first-audio (``ttfa``) is logged as soon
+as the first samples land and returned in the summary.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+from scripts.audio_io import WavWriter, resample
+from scripts.loudness import chunk_stats, plan_gain
+from scripts.pipeline import _noop_log, load_model, synthesize
+from scripts.tts_chunk import plan_chunks
+from scripts.tts_join import StreamingCrossfader
+
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, exc):
+        self.exc = exc
+
+
+def _stage(produce, out_q):
+    """Run the generator function ``produce`` in a thread, feeding ``out_q``."""
+    def run():
+        try:
+            for value in produce():
+                out_q.put(value)
+        except BaseException as exc:  # re-raised in the consumer
+            out_q.put(_Failed(exc))
+        else:
+            out_q.put(_DONE)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def _drain(in_q):
+    while True:
+        value = in_q.get()
+        if value is _DONE:
+            return
+        if isinstance(value, _Failed):
+            raise value.exc
+        yield value
+
+
+class SegmentWriter:
+    """Numbered WAV segments plus an m3u8 playlist appended as they land."""
+
+    def __init__(self, seg_dir, sample_rate, target_sec=40):
+        self.seg_dir = seg_dir
+        self.sample_rate = sample_rate
+        self.count = 0
+        os.makedirs(seg_dir, exist_ok=True)
+        self.playlist = os.path.join(seg_dir, "playlist.m3u8")
+        with open(self.playlist, "w", encoding="utf-8") as fh:
+            fh.write("#EXTM3U\n#EXT-X-VERSION:3\n#EXT-X-PLAYLIST-TYPE:EVENT\n")
+            fh.write(f"#EXT-X-TARGETDURATION:{int(target_sec)}\n#EXT-X-MEDIA-SEQUENCE:0\n")
+
+    def write(self, samples):
+        if not len(samples):
+            return
+        name = f"seg_{self.count:05d}.wav"
+        with WavWriter(os.path.join(self.seg_dir, name), self.sample_rate) as writer:
+            writer.write(samples)
+        # The playlist only mentions a segment once its file is complete.
+        with open(self.playlist, "a", encoding="utf-8") as fh:
+            fh.write(f"#EXTINF:{len(samples) / self.sample_rate:.3f},\n{name}\n")
+        self.count += 1
+
+    def close(self):
+        with open(self.playlist, "a", encoding="utf-8") as fh:
+            fh.write("#EXT-X-ENDLIST\n")
+
+
+class ProgressiveGain:
+    """Loudness gain from the programme measured so far."""
+
+    def __init__(self):
+        self.stats = []
+        self.report = None
+
+    def update(self, stats):
+        self.stats.append(stats)
+        gain_db, self.report = plan_gain(self.stats)
+        return 10.0 ** (gain_db / 20.0)
+
+
+def render_streaming(text, out, model=None, voice=None, language="en", device="cpu", chunk_sec=20, sr=48000,
+                     crossfade_ms=8, segments=None, prefetch=2, log=None, cache=None):
+    """Render ``text`` to ``out`` with chunk, synth and join stages overlapped.
+
+    ``segments`` optionally names a directory that receives one WAV segment
+    per chunk plus ``playlist.m3u8``. ``prefetch`` bounds each stage queue.
+    Returns a summary dict including ``ttfa`` (seconds to first audio).
+    """
+    log = log or _noop_log
+    start = time.time()
+    os.makedirs(os.path.dirname(out) or ".", exist_ok=True)
+    if model is None:
+        model = load_model(device)
+        log("pipeline", "info", "Model loaded", device=device, elapsed=round(time.time() - start, 3))
+
+    chunk_q = queue.Queue(maxsize=max(1, prefetch))
+    audio_q = queue.Queue(maxsize=max(1, prefetch))
+
+    def chunk_stage():
+        for i, chunk in enumerate(plan_chunks(text, chunk_sec, language=language)):
+            yield {"id": i, **chunk}
+
+    def synth_stage():
+        # dedupe=False: a long book must not keep every chunk's audio alive;
+        # repeated lines still come back from the chunk cache.
+        yield from synthesize(model, _drain(chunk_q), voice, language, device, log, cache, dedupe=False)
+
+    _stage(chunk_stage, chunk_q)
+    _stage(synth_stage, audio_q)
+
+    fader = StreamingCrossfader(sr * crossfade_ms // 1000)
+    loudness = ProgressiveGain()
+    seg_writer = SegmentWriter(segments, sr, target_sec=2 * chunk_sec) if segments else None
+    pending, next_id, gain, ttfa = {}, 0, None, None
+    with WavWriter(out, sr) as writer:
+        def emit(block):
+            nonlocal ttfa
+            writer.write(block)
+            if seg_writer:
+                seg_writer.write(block)
+            if ttfa is None and len(block):
+                ttfa = time.time() - start
+                log("stream", "info", "First audio", ttfa=round(ttfa, 3), output=out)
+
+        for item, samples, rate in _drain(audio_q):
+            pending[item["id"]] = (samples, rate)
+            while next_id in pending:
+                samples, rate = pending.pop(next_id)
+                new_gain = loudness.update(chunk_stats(samples, rate))
+                block = fader.push(resample(samples, rate, sr))
+                ramp = np.linspace(new_gain if gain is None else gain, new_gain, len(block), dtype=np.float32)
+                gain = new_gain
+                emit(block * ramp)
+                log("stream", "success", "Chunk streamed", chunk_id=next_id,
+                    position=round(writer.frames / sr, 3), gain_db=loudness.report["gain_db"])
+                next_id += 1
+        emit(fader.flush() * (gain or 1.0))
+    if seg_writer:
+        seg_writer.close()
+
+    summary = {
+        "output": out,
+        "segments": segments,
+        "chunks": next_id,
+        "seconds": round(writer.frames / sr, 3),
+        "ttfa": round(ttfa, 3) if ttfa is not None else None,
+        "elapsed": round(time.time() - start, 3),
+        "device": device,
+        "loudness": loudness.report,
+    }
+    if cache:
+        summary["cache"] = {**cache.stats(), **cache.evict()}
+    log("join", "success", "Streaming render complete", **summary)
+    return summary
@@ -0,0 +1,354 @@
+"""Shared JSONL logging and span tracing for the CLIs, workers and joiner.
+
+``write_log(log_file, stage, status, message, **extra)`` is the record every
+script already wrote; records are now buffered per process and appended in
+batches (``TTS_LOG_BUFFER`` lines, or after ``TTS_LOG_FLUSH_SEC`` seconds,
+and at exit or on SIGTERM; error records go out at once). Each batch is a single append
+under an exclusive file lock, so any number of worker processes can share one
+log file without interleaving lines. ``TTS_LOG_BUFFER=0`` writes through.
+
+Spans time a block of work and nest per thread::
+
+    with span(log_file, "model-load", stage="worker", device=device):
+        model = load_xtts(device)
+
+A span is one record, written when it ends, with ``span``, ``span_id``,
+``parent_id``, ``start`` (epoch seconds), ``dur`` (seconds), ``pid`` and
+``tid``. ``start_span`` opens one without a ``with`` block; spans still open
+at exit are closed then. ``JsonlLogger`` (render.jsonl) writes through the
+same buffers and has the same ``span`` / ``start_span`` methods.
+
+    python scripts/tracing.py artifacts/logs/run.jsonl runs/*/logs/render.jsonl --out trace.json
+
+merges any number of logs into Chrome trace-event JSON (open it in
+chrome://tracing or https://ui.perfetto.dev): one track per process and
+thread, spans as slices, other records as instant markers.
+"""
+import argparse
+import atexit
+import itertools
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+BUFFER_LINES = int(os.environ.get("TTS_LOG_BUFFER", "256"))
+FLUSH_SEC = float(os.environ.get("TTS_LOG_FLUSH_SEC", "1.0"))
+_URGENT = ("error", "failed")
+_SPAN_KEYS = ("span", "span_id", "parent_id", "start", "dur", "pid", "tid")
+
+
+def timestamp():
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _lock(fd):
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_EX)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+
+
+def _unlock(fd):
+    if fcntl:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+    else:
+        os.lseek(fd, 0, os.SEEK_SET)
+        msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+
+
+class _Sink:
+    """Buffered appender for one log file in this process."""
+
+    def __init__(self, path):
+        self.path = path
+        self.lines = []
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def append(self, line, urgent=False):
+        with self.lock:
+            self.lines.append(line)
+            if urgent or len(self.lines) >= max(1, BUFFER_LINES):
+                self._flush()
+            elif self.timer is None:
+                self.timer = threading.Timer(FLUSH_SEC, self.flush)
+                self.timer.daemon = True
+                self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _flush(self):
+        if self.timer is not None:
+            if self.timer is not threading.current_thread():
+                self.timer.cancel()
+            self.timer = None
+        if not self.lines:
+            return
+        payload = "".join(self.lines).encode("utf-8")
+        self.lines = []
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _lock(fd)
+            try:
+                view = memoryview(payload)
+                while view:
+                    view = view[os.write(fd, view):]
+            finally:
+                _unlock(fd)
+        finally:
+            os.close(fd)
+
+
+_sinks = {}
+_sinks_lock = threading.Lock()
+
+
+def _sink(path):
+    path = os.path.abspath(path)
+    with _sinks_lock:
+        sink = _sinks.get(path)
+        if sink is None:
+            sink = _sinks[path] = _Sink(path)
+            _catch_sigterm()
+        return sink
+
+
+def _on_sigterm(signum, frame):
+    # atexit does not run when a pool member is terminated; exit through it instead.
+    raise SystemExit(128 + signum)
+
+
+def _catch_sigterm():
+    """Route SIGTERM through a normal exit so buffered lines are written (main thread only)."""
+    if threading.current_thread() is not threading.main_thread():
+        return
+    try:
+        if signal.getsignal(signal.SIGTERM) is signal.SIG_DFL:
+            signal.signal(signal.SIGTERM, _on_sigterm)
+    except (ValueError, OSError):
+        pass
+
+
+def emit(path, record, urgent=False):
+    """Queue one JSON record for ``path``."""
+    _sink(path).append(json.dumps(record, ensure_ascii=False) + "\n", urgent)
+
+
+def flush():
+    """Write out every buffered record of this process."""
+    for sink in list(_sinks.values()):
+        sink.flush()
+
+
+def write_log(log_file, stage, status, message, **extra):
+    if not log_file:
+        return
+    entry = {
+        "timestamp": timestamp(),
+        "stage": stage,
+        "status": status,
+        "message": message,
+        "pid": os.getpid(),
+        **extra,
+    }
+    emit(log_file, entry, urgent=status in _URGENT)
+
+
+class _Stack(threading.local):
+    def __init__(self):
+        self.ids = []
+
+
+_stack = _Stack()
+_ids = itertools.count(1)
+_open = {}
+
+
+class Span:
+    """One timed block; ``write`` receives the finished span fields."""
+
+    def __init__(self, write, name, fields):
+        self.write = write
+        self.name = name
+        self.fields = dict(fields)
+        self.id = None
+
+    def start(self):
+        self.parent = _stack.ids[-1] if _stack.ids else None
+        self.id = f"{os.getpid()}.{next(_ids)}"
+        self.stack = _stack.ids
+        self.stack.append(self.id)
+        self.started = time.time()
+        self.t0 = time.perf_counter()
+        _open[self.id] = self
+        return self
+
+    def end(self, **fields):
+        """Finish the span (idempotent); ``fields`` are added to its record."""
+        if _open.pop(self.id, None) is None:
+            return
+        dur = time.perf_counter() - self.t0
+        if self.id in self.stack:
+            self.stack.remove(self.id)
+        self.fields.update(fields)
+        self.write({
+            "span": self.name,
+            "span_id": self.id,
+            "parent_id": self.parent,
+            "start": round(self.started, 6),
+            "dur": round(dur, 6),
+            "pid": os.getpid(),
+            "tid": threading.get_native_id(),
+            **self.fields,
+        })
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None and issubclass(exc_type, Exception):
+            self.end(error=f"{exc_type.__name__}: {exc}")
+        else:
+            self.end()
+        return False
+
+
+def _log_span_writer(log_file, stage):
+    def write(rec):
+        if not log_file:
+            return
+        entry = {
+            "timestamp": datetime.fromtimestamp(rec["start"], timezone.utc).isoformat(),
+            "stage": stage or rec["span"],
+            "status": "span",
+            "message": rec["span"],
+            **rec,
+        }
+        emit(log_file, entry, urgent="error" in rec)
+    return write
+
+
+def span(log_file, name, stage=None, **fields):
+    """Context manager timing ``name``; logged as a ``status="span"`` record."""
+    return Span(_log_span_writer(log_file, stage), name, fields)
+
+
+def start_span(log_file, name, stage=None, **fields):
+    """Open a span now; call ``.end()`` on it (or let process exit close it)."""
+    return span(log_file, name, stage, **fields).start()
+
+
+def _shutdown():
+    for open_span in reversed(list(_open.values())):
+        open_span.end()
+    flush()
+
+
+def _after_fork():
+    # A forked child must not write its parent's buffered lines a second time.
+    global _sinks_lock
+    _sinks.clear()
+    _open.clear()
+    _stack.ids = []
+    _sinks_lock = threading.Lock()
+
+
+atexit.register(_shutdown)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+# --- Chrome trace export ---------------------------------------------------------------------------------------------
+
+def load_records(paths):
+    """Records from several JSONL logs, skipping lines that do not parse."""
+    records = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as fh:
+            for line in fh:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue
+    return records
+
+
+def _epoch(rec):
+    if "start" in rec and "dur" in rec:
+        return rec["start"]
+    stamp = rec.get("timestamp") or rec.get("ts")
+    if not stamp:
+        return None
+    try:
+        when = datetime.fromisoformat(stamp.replace("Z", "+00:00"))
+    except ValueError:
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.timestamp()
+
+
+def chrome_trace(records):
+    """Chrome trace-event JSON (dict) for log records from any number of processes."""
+    timed = [(t, rec) for rec in records for t in [_epoch(rec)] if t is not None]
+    origin = min((t for t, _ in timed), default=0.0)
+    events, names = [], {}
+    for t, rec in sorted(timed, key=lambda pair: pair[0]):
+        pid = rec.get("pid", 0)
+        cat = rec.get("stage") or rec.get("kind") or "log"
+        if "span" in rec and "dur" in rec:
+            args = {k: v for k, v in rec.items() if k not in _SPAN_KEYS and k not in ("timestamp", "ts", "status", "message")}
+            events.append({"name": rec["span"], "cat": cat, "ph": "X", "ts": round((t - origin) * 1e6, 1),
+                           "dur": round(rec["dur"] * 1e6, 1), "pid": pid, "tid": rec.get("tid", pid), "args": args})
+        else:
+            args = {k: v for k, v in rec.items() if k not in ("timestamp", "ts")}
+            events.append({"name": rec.get("message") or rec.get("kind") or cat, "cat": cat, "ph": "i", "s": "t",
+                           "ts": round((t - origin) * 1e6, 1), "pid": pid, "tid": rec.get("tid", pid), "args": args})
+        label = rec.get("engine") or rec.get("mode") or rec.get("device")
+        if pid not in names or (label and names[pid] == cat):
+            names[pid] = f"{cat} ({label})" if label else cat
+    for pid, name in names.items():
+        events.append({"name": "process_name", "ph": "M", "pid": pid, "args": {"name": f"{name} {pid}"}})
+    return {"traceEvents": events, "displayTimeUnit": "ms", "otherData": {"origin_epoch": origin}}
+
+
+def span_totals(records):
+    """Wall seconds and count per span name, largest first."""
+    totals = defaultdict(lambda: [0.0, 0])
+    for rec in records:
+        if "span" in rec and "dur" in rec:
+            totals[rec["span"]][0] += rec["dur"]
+            totals[rec["span"]][1] += 1
+    return sorted(((name, sec, n) for name, (sec, n) in totals.items()), key=lambda row: -row[1])
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Merge JSONL logs into a Chrome/Perfetto trace.")
+    ap.add_argument("logs", nargs="+", help="run.jsonl / render.jsonl files from one render")
+    ap.add_argument("--out", default="trace.json")
+    args = ap.parse_args()
+    records = load_records(args.logs)
+    with open(args.out, "w", encoding="utf-8") as fh:
+        json.dump(chrome_trace(records), fh)
+    for name, sec, n in span_totals(records):
+        print(f"{name:>16} {sec:10.3f}s  x{n}")
+    print("Wrote", args.out, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""Batch mode: render a manifest of short prompts, one output file each.
+
+For prompt sets (IVR menus, UI strings): thousands of one-line utterances,
+each to its own WAV. The manifest is JSONL, one item per line:
+
+    {"text": "Press one for sales.", "out": "prompts/sales.wav"}
+    {"id": "welcome", "text": "Welcome back.", "voice": "anna", "language": "de", "out": "de/welcome.wav"}
+
+``voice`` (a voice file or registered voice ID) and ``language`` default to
+``--voice`` / ``--language``, and a relative ``out`` is resolved against
+``--out-dir``. Everything runs in one process on one warm model (see
+pipeline.py), with loaded voices kept in a VoiceCache (voice_registry.py):
+
+- items are grouped by voice and language and rendered in windows, with the
+  chunk texts of a window decoded together (``--batch-size``, see batching.py)
+- an item that fits in one chunk is written straight to its file (resampled
+  to ``--sr``), with no crossfade or loudness join. Longer items are chunked
+  and joined like a normal render.
+- identical items (same normalized text, voice and language) are rendered
+  once and the file copied to the other outputs
+- with the chunk cache enabled, chunks rendered by earlier runs are reused
+
+    python scripts/tts_batch.py --manifest prompts.jsonl --voice voice.pt --out-dir artifacts/outputs/prompts
+
+Every item gets a line in the results manifest (``--results``, default
+``<manifest>.results.jsonl``), written as items finish. The line holds the
+status (``ok``, ``dedup`` or ``error``), chunk count, audio seconds, write
+time and ``synth_sec``. When several items were decoded in one batch,
+``synth_sec`` is that batch's time shared out by audio length.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from functools import partial
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_batch.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.pipeline import _noop_log
+from scripts.tracing import span, write_log
+
+WINDOW = 64
+
+
+def read_manifest(path, voice=None, language="en", out_dir=None):
+    """Items from a JSONL manifest with defaults applied; malformed lines become items with an ``error``."""
+    items = []
+    with open(path, "r", encoding="utf-8") as fh:
+        for index, line in enumerate(fh):
+            if not line.strip():
+                continue
+            item = {"index": index}
+            try:
+                rec = json.loads(line)
+                item.update(id=rec.get("id", index), text=" ".join(str(rec["text"]).split()), out=rec["out"],
+                            voice=rec.get("voice", voice), language=rec.get("language", language))
+                if not item["text"]:
+                    raise ValueError("empty text")
+                if out_dir and not os.path.isabs(item["out"]):
+                    item["out"] = os.path.join(out_dir, item["out"])
+            except (ValueError, KeyError, TypeError, AttributeError) as exc:
+                item["error"] = f"bad manifest line: {exc!r}"
+            items.append(item)
+    return items
+
+
+def _windows(items, size):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _write_item(item, samples, rate, sr, crossfade_ms, loudnorm):
+    from scripts.audio_io import WavWriter, resample
+    from scripts.pipeline import join
+
+    os.makedirs(os.path.dirname(item["out"]) or ".", exist_ok=True)
+    if len(samples) == 1:
+        with WavWriter(item["out"], sr) as writer:
+            writer.write(resample(samples[0], rate, sr))
+        return writer.frames / sr
+    return join(samples, rate, item["out"], sr, crossfade_ms, loudnorm)[0]
+
+
+def render_group(model, items, voice, language, emit, sr=48000, chunk_sec=20, crossfade_ms=8, loudnorm="native",
+                 batch_size=8, cache=None, log=None, voices=None):
+    """Render items that share one voice and language; ``emit(result)`` is called per item.
+
+    ``voices`` is a VoiceCache shared between groups, so a voice is loaded once per batch.
+    """
+    from scripts.batching import synthesize_batch
+    from scripts.pipeline import cache_store
+    from scripts.tts_chunk import plan_chunks
+    from scripts.voice_registry import VoiceCache
+
+    log = log or _noop_log
+    synth = (voices or VoiceCache(model)).get(voice)
+    rate = synth.sample_rate
+    first = {}
+    for window in _windows(items, WINDOW):
+        todo, dupes = [], []
+        for item in window:
+            if item["text"] in first:
+                dupes.append(item)
+            else:
+                first[item["text"]] = item
+                todo.append(item)
+
+        # Unique chunk texts of the window: cache hits are read back, the rest decoded together.
+        chunks = {item["index"]: [c["text"] for c in plan_chunks(item["text"], chunk_sec, language=language)]
+                  for item in todo}
+        audio, cached = {}, set()
+        for text in {t for texts in chunks.values() for t in texts}:
+            hit = cache.read(cache.key(text, language)) if cache else None
+            if hit:
+                audio[text] = hit[0]
+                cached.add(text)
+        pending = sorted({t for texts in chunks.values() for t in texts} - cached)
+        synth_sec, start = {}, time.time()
+        if pending:
+            wavs, _ = synthesize_batch(synth, pending, language, batch_size)
+            elapsed = time.time() - start
+            total = sum(len(w) for w in wavs) or 1
+            for text, wav in zip(pending, wavs):
+                audio[text] = wav
+                synth_sec[text] = elapsed * len(wav) / total
+                if cache:
+                    cache_store(cache, cache.key(text, language), wav, rate)
+            log("batch", "info", "Prompt window decoded", items=len(todo), chunks=len(pending), cached=len(cached),
+                elapsed=round(elapsed, 3), batch_size=batch_size)
+
+        for item in todo:
+            texts = chunks[item["index"]]
+            result = {"index": item["index"], "id": item["id"], "out": item["out"], "chunks": len(texts),
+                      "cached_chunks": sum(t in cached for t in texts),
+                      "synth_sec": round(sum(synth_sec.get(t, 0.0) for t in texts), 4)}
+            t0 = time.time()
+            try:
+                result["seconds"] = round(_write_item(item, [audio[t] for t in texts], rate, sr, crossfade_ms,
+                                                      loudnorm), 3)
+                result["status"] = "ok"
+            except (OSError, ValueError) as exc:
+                result.update(status="error", error=str(exc))
+            result["write_sec"] = round(time.time() - t0, 4)
+            emit(result)
+        for item in dupes:
+            src = first[item["text"]]
+            result = {"index": item["index"], "id": item["id"], "out": item["out"], "dedup_of": src["index"]}
+            t0 = time.time()
+            try:
+                os.makedirs(os.path.dirname(item["out"]) or ".", exist_ok=True)
+                shutil.copyfile(src["out"], item["out"])
+                result["status"] = "dedup"
+            except OSError as exc:
+                result.update(status="error", error=str(exc))
+            result["write_sec"] = round(time.time() - t0, 4)
+            emit(result)
+
+
+def render_manifest(model, items, emit, cache_for=None, log=None, **options):
+    """Render every item, grouped by (voice, language). ``cache_for(voice)`` returns a ChunkCache or None."""
+    from scripts.voice_registry import VoiceCache
+
+    log = log or _noop_log
+    voices = VoiceCache(model)
+    groups = {}
+    for item in items:
+        if "error" in item:
+            emit({"index": item["index"], "status": "error", "error": item["error"]})
+        else:
+            groups.setdefault((item["voice"], item["language"]), []).append(item)
+    for (voice, language), group in groups.items():
+        emitted = set()
+
+        def emit_once(result):
+            emitted.add(result["index"])
+            emit(result)
+
+        try:
+            cache = cache_for(voice) if cache_for else None
+            render_group(model, group, voice, language, emit_once, cache=cache, log=log, voices=voices, **options)
+        except Exception as exc:  # a bad voice file fails its group, not the whole batch
+            log("batch", "error", "Voice group failed", voice=voice, language=language, error=repr(exc),
+                finished=len(emitted))
+            for item in group:
+                if item["index"] in emitted:
+                    continue  # already has its result line
+                emit({"index": item["index"], "id": item["id"], "out": item["out"], "status": "error",
+                      "error": f"{type(exc).__name__}: {exc}"})
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Render a JSONL manifest of prompts, one WAV per item, on one warm model.")
+    ap.add_argument("--manifest", required=True, help="JSONL: text, out, and optionally id, voice, language")
+    ap.add_argument("--results", default=None, help="Results JSONL (default: <manifest>.results.jsonl)")
+    ap.add_argument("--out-dir", default=None, help="Base directory for relative 'out' paths")
+    ap.add_argument("--voice", default=None, help="Default voice for items without one")
+    ap.add_argument("--language", default="en", help="Default language for items without one")
+    ap.add_argument("--device-order", default=os.environ.get("TTS_DEVICE_ORDER", "rocm,dml,cpu"))
+    ap.add_argument("--cpu-only", action="store_true")
+    ap.add_argument("--sr", type=int, default=int(os.environ.get("TTS_SAMPLE_RATE", "48000")))
+    ap.add_argument("--chunk-sec", type=int, default=int(os.environ.get("TTS_CHUNK_SECONDS", "20")))
+    ap.add_argument("--crossfade-ms", type=int, default=int(os.environ.get("TTS_CROSSFADE_MS", "8")))
+    ap.add_argument("--loudnorm", choices=["native", "ffmpeg"], default="native",
+                    help="Loudness normalization for multi-chunk items (single-chunk items are written as is)")
+    ap.add_argument("--batch-size", type=int, default=int(os.environ.get("TTS_BATCH_SIZE", "8")),
+                    help="Chunks decoded together (default: TTS_BATCH_SIZE or 8)")
+    ap.add_argument("--no-cache", action="store_true", help="Ignore the chunk cache")
+    ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    args = ap.parse_args()
+
+    from scripts.backend import pick_backend
+    from scripts.chunk_cache import ChunkCache
+    from scripts.pipeline import load_model
+    from scripts.voice_registry import resolve_voice
+
+    log = partial(write_log, args.log_file)
+    items = read_manifest(args.manifest, args.voice, args.language, args.out_dir)
+    results_path = args.results or os.path.splitext(args.manifest)[0] + ".results.jsonl"
+    device = "cpu" if args.cpu_only else pick_backend(args.device_order)
+    log("batch", "start", "Batch render starting", manifest=args.manifest, items=len(items), device=device)
+    start = time.time()
+    with span(args.log_file, "model-load", stage="batch", device=device):
+        model = load_model(device)
+
+    counts = {}
+    with open(results_path, "w", encoding="utf-8") as out:
+        def emit(result):
+            counts[result["status"]] = counts.get(result["status"], 0) + 1
+            out.write(json.dumps(result, ensure_ascii=False) + "\n")
+            out.flush()
+
+        with span(args.log_file, "batch", stage="batch", items=len(items)):
+            render_manifest(model, items, emit,
+                            cache_for=None if args.no_cache else (lambda v: ChunkCache.from_env(voice=resolve_voice(v), params={"writer": "raw"})),
+                            log=log, sr=args.sr, chunk_sec=args.chunk_sec, crossfade_ms=args.crossfade_ms,
+                            loudnorm=args.loudnorm, batch_size=args.batch_size)
+    elapsed = round(time.time() - start, 3)
+    log("batch", "success" if not counts.get("error") else "failed", "Batch render finished", results=results_path,
+        elapsed=elapsed, **counts)
+    print(f"{len(items)} items in {elapsed}s: {counts}. Results: {results_path}")
+    sys.exit(1 if counts.get("error") else 0)
+
+
+if __name__ == "__main__":
+    main()
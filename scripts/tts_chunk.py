@@ -1,59 +1,107 @@
 import argparse
 import json
 import os
+import math
 import re
-from datetime import datetime, timezone
-
-
-def timestamp():
-    return datetime.now(timezone.utc).isoformat()
-
-
-def write_log(log_file, stage, status, message, **extra):
-    if not log_file:
-        return
-    entry = {
-        "timestamp": timestamp(),
-        "stage": stage,
-        "status": status,
-        "message": message,
-        **extra,
-    }
-    log_dir = os.path.dirname(log_file) or "."
-    os.makedirs(log_dir, exist_ok=True)
-    with open(log_file, "a", encoding="utf-8") as fh:
-        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
-
-
-def chunk_text(txt, max_sec=20):
-    sents = re.split(r"(?<=[.!?])\s+", txt.strip())
-    chunks, cur, cur_len = [], [], 0
-    for s in sents:
-        l = max(1, len(s) // 15)
-        if cur_len + l > max_sec and cur:
-            chunks.append(" ".join(cur))
-            cur, cur_len = [], 0
-        cur.append(s)
-        cur_len += l
+import sys
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_chunk.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.duration_model import DurationModel
+from scripts.tracing import span, write_log
+
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s+")
+_CLAUSE = re.compile(r"(?<=[,;:])\s+|\s+(?=[—–]\s)")
+
+
+def _pack(units, predict, max_sec):
+    """Group consecutive units towards equal predicted totals without passing ``max_sec``.
+
+    The group count is the fewest that keeps every group under ``max_sec``;
+    units are then packed towards ``total / count`` seconds each, so the last
+    group is not a short straggler and no group dwarfs the others.
+    """
+    total = predict(" ".join(units))
+    count = max(1, math.ceil(total / max_sec))
+    target = total / count
+    groups, cur, cur_len, done = [], [], 0.0, 0.0
+    for unit in units:
+        grown = predict(" ".join(cur + [unit]))
+        # Close at the boundary nearest the running target, so rounding does not drift.
+        balanced = len(groups) < count - 1 and done + (cur_len + grown) / 2 > (len(groups) + 1) * target
+        if cur and (grown > max_sec or balanced):
+            groups.append(cur)
+            done += cur_len
+            cur, grown = [], predict(unit)
+        cur.append(unit)
+        cur_len = grown
     if cur:
-        chunks.append(" ".join(cur))
+        groups.append(cur)
+    return groups
+
+
+def split_long_sentence(sentence, max_sec, model, language="en"):
+    """Split a sentence predicted to run past ``max_sec`` into clauses (word runs if need be).
+
+    The pieces are packed back into chunks by ``plan_chunks``.
+    """
+    predict = lambda text: model.predict(text, language)  # noqa: E731
+    if predict(sentence) <= max_sec:
+        return [sentence]
+    pieces = []
+    for clause in _CLAUSE.split(sentence):
+        if predict(clause) <= max_sec:
+            pieces.append(clause)
+        else:
+            pieces.extend(" ".join(group) for group in _pack(clause.split(), predict, max_sec))
+    return pieces
+
+
+def plan_chunks(txt, max_sec=20, model=None, language="en"):
+    """Chunk records ``{"text", "predicted"}`` of roughly equal predicted duration."""
+    model = model or DurationModel.load()
+    units = [
+        piece
+        for sentence in _SENTENCE.split(txt.strip())
+        if sentence
+        for piece in split_long_sentence(sentence, max_sec, model, language)
+    ]
+    chunks = []
+    for group in _pack(units, lambda text: model.predict(text, language), max_sec):
+        text = " ".join(group)
+        chunks.append({"text": text, "predicted": round(model.predict(text, language), 2)})
     return chunks
 
 
+def chunk_text(txt, max_sec=20, model=None, language="en"):
+    return [c["text"] for c in plan_chunks(txt, max_sec, model, language)]
+
+
 if __name__ == "__main__":
     ap = argparse.ArgumentParser()
     ap.add_argument("--text", required=True)
     ap.add_argument("--out", required=True)
     ap.add_argument("--chunk-sec", type=int, default=20)
     ap.add_argument("--log-file")
+    ap.add_argument("--language", default="en")
+    ap.add_argument("--duration-model", default=None, help="Fitted coefficients (default: TTS_DURATION_MODEL or artifacts/models/duration_model.json).")
     args = ap.parse_args()
     txt = open(args.text, "r", encoding="utf-8").read()
     out_dir = os.path.dirname(args.out) or "."
     os.makedirs(out_dir, exist_ok=True)
-    chunks = chunk_text(txt, args.chunk_sec)
+    model = DurationModel.load(args.duration_model)
+    with span(args.log_file, "split", stage="chunk", chars=len(txt)):
+        chunks = plan_chunks(txt, args.chunk_sec, model, args.language)
     with open(args.out, "w", encoding="utf-8") as f:
         for i, c in enumerate(chunks):
-            f.write(json.dumps({"id": i, "text": c}, ensure_ascii=False) + "\n")
+            f.write(json.dumps({"id": i, **c}, ensure_ascii=False) + "\n")
+    predicted = [c["predicted"] for c in chunks]
     write_log(
         args.log_file,
         "chunk",
@@ -61,5 +109,9 @@ if __name__ == "__main__":
         "Chunked input text",
         output=args.out,
         chunks=len(chunks),
+        predicted_total=round(sum(predicted), 2),
+        predicted_max=max(predicted, default=0.0),
+        predicted_min=min(predicted, default=0.0),
+        fitted=bool(model.meta),
     )
     print("Wrote", args.out, len(chunks), "chunks")
@@ -1,9 +1,7 @@
 import argparse
-import json
 import os
 import subprocess
 import sys
-from datetime import datetime, timezone
 
 # Allow absolute `scripts.*` imports even when executed as "python scripts/tts_cli.py"
 if __package__ in (None, ""):
@@ -12,33 +10,34 @@ if __package__ in (None, ""):
     if _root not in sys.path:
         sys.path.insert(0, _root)
 
+from scripts.autotune import apply_profile, load_profile, plan_render, profile_for
 from scripts.backend import pick_backend
+from scripts.chunk_queue import reset_queue, tally_claims, unfinished_claims
+from scripts.chunk_store import ChunkStore, store_enabled
+from scripts.encoders import parse_targets
+from scripts.ffmpeg_check import assert_ffmpeg_available
+from scripts.precision import precision_from_env
+from scripts.run_manifest import RunManifest, plan_resume, verify
+from scripts.tracing import flush, span, start_span, write_log
+from scripts.tts_client import DEFAULT_SERVER_URL, server_alive, submit_render
+from scripts.voice_registry import resolve_voice
+from scripts.worker_pool import (
+    count_chunks,
+    member_env,
+    plan_cpu_pool,
+    predicted_loads,
+    run_pool,
+    schedule_report,
+    shard_chunks,
+    shard_files,
+)
 
 
-def timestamp():
-    return datetime.now(timezone.utc).isoformat()
-
-
-def write_log(log_file, stage, status, message, **extra):
-    if not log_file:
-        return
-    entry = {
-        "timestamp": timestamp(),
-        "stage": stage,
-        "status": status,
-        "message": message,
-        **extra,
-    }
-    log_dir = os.path.dirname(log_file) or "."
-    os.makedirs(log_dir, exist_ok=True)
-    with open(log_file, "a", encoding="utf-8") as fh:
-        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
-
-
-def sh(args, log_file=None, env=None):
+def sh(args, log_file=None, env=None, name="process"):
     print(">", " ".join(args))
     write_log(log_file, "process", "start", "Executing command", command=args)
-    subprocess.check_call(args, env=env)
+    with span(log_file, name, stage="process"):
+        subprocess.check_call(args, env=env)
     write_log(log_file, "process", "success", "Command completed", command=args)
 
 
@@ -47,36 +46,257 @@ if __name__ == "__main__":
 
     ap = argparse.ArgumentParser()
     ap.add_argument("--text", required=True)
-    ap.add_argument("--voice", help="Path to voice embedding (.pt). Optional when using built-in speaker.")
+    ap.add_argument("--voice", help="Voice file (.pt / .safetensors) or registered voice ID. Optional when using built-in speaker.")
     ap.add_argument("--device-order", default=_os.environ.get("TTS_DEVICE_ORDER", "rocm,dml,cpu"))
     ap.add_argument("--gpu-workers", type=int, default=1)
-    ap.add_argument("--cpu-workers", type=int, default=6)
-    ap.add_argument("--chunk-sec", type=int, default=int(_os.environ.get("TTS_CHUNK_SECONDS", "20")))
+    ap.add_argument("--cpu-workers", type=int, default=None, help="CPU worker processes (default: host profile or 6).")
+    ap.add_argument(
+        "--threads-per-worker",
+        type=int,
+        default=None,
+        help="torch threads per CPU worker (default: host profile, else available cores / workers).",
+    )
+    ap.add_argument("--pin-cores", action="store_true", help="Pin each CPU worker to its own set of cores.")
+    ap.add_argument(
+        "--zygote",
+        action="store_true",
+        default=_os.environ.get("TTS_ZYGOTE") == "1",
+        help="Fork CPU workers from one process that loads the model once (POSIX only; TTS_ZYGOTE=1).",
+    )
+    ap.add_argument(
+        "--hetero",
+        action="store_true",
+        help="Run accelerated and CPU workers together on one work-stealing chunk queue.",
+    )
+    ap.add_argument(
+        "--chunk-sec",
+        type=int,
+        default=int(_os.environ["TTS_CHUNK_SECONDS"]) if _os.environ.get("TTS_CHUNK_SECONDS") else None,
+        help="Target chunk length (default: TTS_CHUNK_SECONDS, host profile, or 20).",
+    )
     ap.add_argument("--crossfade-ms", type=int, default=int(_os.environ.get("TTS_CROSSFADE_MS", "8")))
     ap.add_argument("--sr", type=int, default=int(_os.environ.get("TTS_SAMPLE_RATE", "48000")))
     ap.add_argument("--out", required=True)
+    ap.add_argument(
+        "--loudnorm",
+        choices=["native", "ffmpeg"],
+        default="native",
+        help="Loudness normalization: built-in single-pass R128 or the ffmpeg two-pass reference.",
+    )
+    ap.add_argument(
+        "--encode",
+        action="append",
+        default=[],
+        metavar="FORMAT[:BITRATE][=PATH]",
+        help="Also encode to opus/mp3/flac during the join (repeatable), e.g. --encode opus:48k --encode mp3:128k.",
+    )
+    ap.add_argument("--no-wav", action="store_true", help="Write only the --encode outputs, no WAV master.")
     ap.add_argument("--cpu-only", action="store_true")
     ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    ap.add_argument(
+        "--server",
+        default=_os.environ.get("TTS_SERVER_URL", DEFAULT_SERVER_URL),
+        help="Warm render service (scripts/tts_server.py) to submit to when it is running.",
+    )
+    ap.add_argument("--no-server", action="store_true", help="Always render locally, even if the service is up.")
+    ap.add_argument("--cache-dir", default=None, help="Rendered-chunk cache (default: TTS_CACHE_DIR or artifacts/cache/chunks).")
+    ap.add_argument("--no-cache", action="store_true", help="Synthesize every chunk, ignoring the chunk cache.")
+    ap.add_argument(
+        "--batch-size",
+        type=int,
+        default=None,
+        help="Chunks each worker decodes together, bucketed by token length (default: TTS_BATCH_SIZE or 1).",
+    )
+    ap.add_argument(
+        "--precision",
+        choices=["fp32", "int8", "bf16"],
+        default=None,
+        help="CPU worker precision: fp32, dynamic int8 or bf16 autocast (default: TTS_CPU_PRECISION or fp32).",
+    )
+    ap.add_argument(
+        "--chunk-store",
+        action="store_true",
+        default=store_enabled(),
+        help="Workers append float32 chunks to one memory-mapped store instead of WAV files (TTS_CHUNK_STORE=1). "
+        "Worker-pool renders only: the render service, --stream and --in-process keep chunks in memory.",
+    )
+    ap.add_argument(
+        "--resume",
+        action="store_true",
+        help="Keep chunks the run manifest marks done and still verify; render only missing or corrupt ones.",
+    )
+    ap.add_argument(
+        "--in-process",
+        action="store_true",
+        help="Chunk, synthesize and join in this process instead of the chunk/worker/join subprocess chain.",
+    )
+    ap.add_argument(
+        "--stream",
+        action="store_true",
+        help="In-process pipelined render: audio is appended to --out as each chunk finishes (implies --in-process).",
+    )
+    ap.add_argument("--segments", default=None, help="With --stream, also write WAV segments + playlist.m3u8 here.")
     ap.add_argument(
         "--language",
         default="en",
         help="Language token for synthesis (default: en).",
     )
+    ap.add_argument("--profile", default=None, help="Host profile from autotune.py (default: this host's).")
+    ap.add_argument("--no-profile", action="store_true", help="Ignore the host profile.")
+    ap.add_argument(
+        "--plan",
+        action="store_true",
+        help="Dry run: predict the CPU pool's wall time for --text from the host profile, then exit.",
+    )
     args = ap.parse_args()
+    try:
+        args.voice = resolve_voice(args.voice)
+    except KeyError as exc:
+        ap.error(exc.args[0])
+    try:
+        targets = parse_targets(args.encode, args.out)
+    except ValueError as exc:
+        ap.error(str(exc))
+    if (targets or args.no_wav) and (args.loudnorm != "native" or args.stream):
+        ap.error("--encode / --no-wav need --loudnorm native and cannot be combined with --stream")
+    if args.no_wav and not targets:
+        ap.error("--no-wav needs at least one --encode target")
+    if targets:
+        assert_ffmpeg_available()  # fail now rather than after synthesis
+
+    profile = None if args.no_profile else load_profile(args.profile)
+    precision = args.precision or precision_from_env()
+
+    if args.plan:
+        if profile is None:
+            sys.exit("No host profile; run scripts/autotune.py on this host first.")
+        profile, skipped = profile_for(profile, precision)
+        if skipped:
+            sys.exit(f"Host profile not used: {skipped}; re-run scripts/autotune.py at this precision.")
+        apply_profile(args, profile)
+        with open(args.text, "r", encoding="utf-8") as fh:
+            estimate = plan_render(fh.read(), profile, args.cpu_workers, args.chunk_sec, args.language)
+        write_log(args.log_file, "plan", "success", "Render plan", **estimate)
+        print(
+            f"{estimate['chunks']} chunks, {estimate['audio_sec']}s predicted audio on {estimate['workers']} CPU "
+            f"workers (chunk {estimate['chunk_sec']}s): about {estimate['predicted_wall_sec']}s wall "
+            f"(worker RTF {estimate['worker_rtf']} from {estimate['rtf_from']}, load {estimate['load_sec']}s)"
+        )
+        sys.exit(0)
+
+    use_server = not args.no_server and not args.stream and server_alive(args.server)
+    backend = None if use_server else pick_backend(args.device_order)
+    cpu_pool = not (use_server or args.stream or args.in_process) and (args.cpu_only or backend == "cpu")
+    profile, skipped = profile_for(profile, precision, cpu_pool)
+    from_profile = apply_profile(args, profile)
 
     if not args.voice:
         print("No voice embedding supplied; the base XTTS speaker will be used.")
 
     if args.log_file:
         write_log(args.log_file, "cli", "start", "XTTS CLI invoked", parameters=vars(args))
+        flush()  # marks the start of this run in a shared log, ahead of the workers' records
+    if from_profile:
+        write_log(args.log_file, "cli", "info", "Host profile applied", settings={k: getattr(args, k) for k in from_profile})
+    elif skipped:
+        write_log(args.log_file, "cli", "info", "Host profile not used", reason=skipped)
+    start_span(args.log_file, "pipeline", stage="cli", output=args.out)  # closed at exit
 
     out_dir = os.path.dirname(args.out) or "."
     os.makedirs(out_dir, exist_ok=True)
 
-    backend = pick_backend(args.device_order)
+    if use_server:
+        print("Submitting to render service:", args.server)
+        write_log(args.log_file, "server", "start", "Submitting job to render service", server=args.server)
+        if args.chunk_store:
+            write_log(args.log_file, "cli", "info", "Chunk store unused: the render service keeps chunks in memory")
+        result = submit_render(
+            args.server,
+            args.text,
+            args.out,
+            voice=args.voice,
+            language=args.language,
+            chunk_sec=args.chunk_sec,
+            sr=args.sr,
+            crossfade_ms=args.crossfade_ms,
+            loudnorm=args.loudnorm,
+            encode=targets,
+            wav=not args.no_wav,
+        )
+        write_log(args.log_file, "cli", "success", "Render complete", output=args.out, server=args.server, result=result)
+        print("All done:", args.out)
+        sys.exit(0)
+
     print("Backend selected:", backend)
     write_log(args.log_file, "backend", "success", "Backend resolved", backend=backend)
 
+    if args.stream:
+        from functools import partial
+        from scripts.chunk_cache import ChunkCache
+        from scripts.streaming import render_streaming
+
+        if args.chunk_store:
+            write_log(args.log_file, "cli", "info", "Chunk store unused: --stream keeps chunks in memory")
+
+        if args.cache_dir:
+            os.environ["TTS_CACHE_DIR"] = args.cache_dir
+        if args.no_cache:
+            os.environ["TTS_CACHE"] = "0"
+
+        with open(args.text, "r", encoding="utf-8") as fh:
+            text = fh.read()
+        summary = render_streaming(
+            text,
+            args.out,
+            voice=args.voice,
+            language=args.language,
+            device="cpu" if args.cpu_only else backend,
+            chunk_sec=args.chunk_sec,
+            sr=args.sr,
+            crossfade_ms=args.crossfade_ms,
+            segments=args.segments,
+            log=partial(write_log, args.log_file),
+            cache=ChunkCache.from_env(voice=args.voice, params={"writer": "raw"}),
+        )
+        write_log(args.log_file, "cli", "success", "Render complete", **summary)
+        print(f"First audio after {summary['ttfa']}s")
+        print("All done:", args.out)
+        sys.exit(0)
+
+    if args.in_process:
+        from functools import partial
+        from scripts.chunk_cache import ChunkCache
+        from scripts.pipeline import render
+
+        if args.chunk_store:
+            write_log(args.log_file, "cli", "info", "Chunk store unused: --in-process keeps chunks in memory")
+
+        if args.cache_dir:
+            os.environ["TTS_CACHE_DIR"] = args.cache_dir
+        if args.no_cache:
+            os.environ["TTS_CACHE"] = "0"
+
+        with open(args.text, "r", encoding="utf-8") as fh:
+            text = fh.read()
+        summary = render(
+            text,
+            args.out,
+            voice=args.voice,
+            language=args.language,
+            device="cpu" if args.cpu_only else backend,
+            chunk_sec=args.chunk_sec,
+            sr=args.sr,
+            crossfade_ms=args.crossfade_ms,
+            loudnorm=args.loudnorm,
+            log=partial(write_log, args.log_file),
+            cache=ChunkCache.from_env(voice=args.voice, params={"writer": "raw"}),
+            encode=targets,
+            wav=not args.no_wav,
+        )
+        write_log(args.log_file, "cli", "success", "Render complete", **summary)
+        print("All done:", args.out)
+        sys.exit(0)
+
     chunks_jsonl = os.path.join(out_dir, "chunks.jsonl")
     chunk_cmd = [
         sys.executable,
@@ -86,10 +306,11 @@ if __name__ == "__main__":
         "--out",
         chunks_jsonl,
         "--chunk-sec", str(args.chunk_sec),
+        "--language", args.language,
     ]
     if args.log_file:
         chunk_cmd.extend(["--log-file", args.log_file])
-    sh(chunk_cmd, log_file=args.log_file)
+    sh(chunk_cmd, log_file=args.log_file, name="stage:chunk")
 
     workdir = os.path.join(out_dir, "chunks")
     os.makedirs(workdir, exist_ok=True)
@@ -97,41 +318,156 @@ if __name__ == "__main__":
     worker_env = os.environ.copy()
     if args.log_file:
         worker_env["TTS_LOG_FILE"] = args.log_file
+    if args.cache_dir:
+        worker_env["TTS_CACHE_DIR"] = args.cache_dir
+    if args.no_cache:
+        worker_env["TTS_CACHE"] = "0"
+    if args.batch_size:
+        worker_env["TTS_BATCH_SIZE"] = str(args.batch_size)
+    if args.precision:
+        worker_env["TTS_CPU_PRECISION"] = args.precision
+    worker_env["TTS_CHUNK_STORE"] = "1" if args.chunk_store else "0"
 
-    worker_script = "scripts/tts_worker_gpu.py" if (backend != "cpu" and not args.cpu_only) else "scripts/tts_worker_cpu.py"
-    worker_args = [
-        sys.executable,
-        worker_script,
-        "--chunks",
-        chunks_jsonl,
-        "--out-dir",
-        workdir,
-        "--language",
-        args.language,
-    ]
-    if args.voice:
-        worker_args.extend(["--voice", args.voice])
-    if args.log_file:
-        worker_args.extend(["--log-file", args.log_file])
-    if backend != "cpu" and not args.cpu_only:
-        worker_args.extend(["--device", backend])
-    sh(worker_args, log_file=args.log_file, env=worker_env)
+    use_accel = backend != "cpu" and not args.cpu_only
+    if args.hetero and not use_accel:
+        print("--hetero ignored: no accelerator, running the CPU pool only")
+        write_log(args.log_file, "pool", "info", "--hetero ignored: no accelerator", backend=backend,
+                  cpu_only=args.cpu_only)
+
+    def worker_args(chunks_path, accel=use_accel):
+        cmd = [
+            sys.executable,
+            "scripts/tts_worker_gpu.py" if accel else "scripts/tts_worker_cpu.py",
+            "--chunks",
+            chunks_path,
+            "--out-dir",
+            workdir,
+            "--language",
+            args.language,
+        ]
+        if args.voice:
+            cmd.extend(["--voice", args.voice])
+        if args.log_file:
+            cmd.extend(["--log-file", args.log_file])
+        if accel:
+            cmd.extend(["--device", backend])
+        return cmd
+
+    store = ChunkStore.for_out_dir(workdir) if args.chunk_store else None
+    manifest = store or RunManifest.for_out_dir(workdir)
+    worker_chunks = chunks_jsonl
+    if args.resume:
+        worker_chunks = os.path.join(out_dir, "chunks.todo.jsonl")
+        counts = plan_resume(chunks_jsonl, manifest, worker_chunks, check=store.verify if store else verify)
+        print(f"Resume: {counts['done']}/{counts['total']} chunks already rendered")
+        write_log(args.log_file, "resume", "info", "Resume plan", manifest=store.root if store else manifest.path,
+                  **counts)
+    else:
+        manifest.reset()
+
+    workers_span = start_span(args.log_file, "stage:synth", stage="pool")
+    if count_chunks(worker_chunks) == 0:
+        write_log(args.log_file, "pool", "info", "No chunks left to render")
+    elif use_accel and args.hetero:
+        claim_dir = os.path.join(out_dir, "claims")
+        reset_queue(claim_dir)
+        accel_count = max(1, args.gpu_workers)
+        accel_cmds = [worker_args(worker_chunks, True) + ["--queue-dir", claim_dir, "--take", "head"]] * accel_count
+        plan = plan_cpu_pool(
+            worker_chunks,
+            args.cpu_workers,
+            args.threads_per_worker,
+            args.pin_cores,
+            shared_queue=True,
+            reserve_cores=accel_count,
+        )
+        cpu_cmds = [worker_args(p["chunks"], False) + ["--queue-dir", claim_dir, "--take", "tail"] for p in plan]
+        write_log(
+            args.log_file,
+            "pool",
+            "start",
+            "Launching heterogeneous worker pool",
+            device=backend,
+            accel_workers=accel_count,
+            cpu_workers=len(plan),
+            threads=[p["threads"] for p in plan],
+        )
+        loads = predicted_loads(worker_chunks, accel_count + len(plan))
+        try:
+            elapsed = run_pool(
+                accel_cmds + cpu_cmds,
+                [worker_env] * accel_count + [member_env(worker_env, p["threads"], p["cores"]) for p in plan],
+            )
+        except subprocess.CalledProcessError:
+            done = {i for i, rec in manifest.load().items() if rec.get("status") == "done"}
+            write_log(
+                args.log_file,
+                "pool",
+                "error",
+                "Worker failed; its claimed chunks were not rendered (re-run with --resume)",
+                unfinished=unfinished_claims(claim_dir, done),
+            )
+            raise
+        write_log(args.log_file, "schedule", "info", "Makespan predicted vs achieved", **schedule_report(loads, elapsed))
+        write_log(
+            args.log_file,
+            "pool",
+            "success",
+            "Heterogeneous worker pool finished",
+            claims_per_worker=tally_claims(claim_dir),
+        )
+    elif use_accel and args.gpu_workers <= 1:
+        sh(worker_args(worker_chunks), log_file=args.log_file, env=worker_env)
+    elif use_accel:
+        shards = shard_chunks(worker_chunks, min(args.gpu_workers, max(1, count_chunks(worker_chunks))))
+        write_log(args.log_file, "pool", "start", "Launching accelerated worker pool", workers=len(shards), device=backend)
+        loads = predicted_loads(worker_chunks, len(shards))
+        elapsed = run_pool([worker_args(p) for p in shards], [worker_env] * len(shards), cleanup=shards)
+        write_log(args.log_file, "schedule", "info", "Makespan predicted vs achieved", **schedule_report(loads, elapsed))
+        write_log(args.log_file, "pool", "success", "Accelerated worker pool finished", workers=len(shards))
+    else:
+        plan = plan_cpu_pool(worker_chunks, args.cpu_workers, args.threads_per_worker, args.pin_cores)
+        write_log(
+            args.log_file,
+            "pool",
+            "start",
+            "Launching CPU worker pool",
+            workers=len(plan),
+            threads=[p["threads"] for p in plan],
+            cores=[p["cores"] for p in plan],
+        )
+        loads = predicted_loads(worker_chunks, len(plan))
+        elapsed = run_pool(
+            [worker_args(p["chunks"]) for p in plan],
+            [member_env(worker_env, p["threads"], p["cores"]) for p in plan],
+            fork_server=args.zygote,
+            cleanup=shard_files(plan),
+        )
+        write_log(args.log_file, "schedule", "info", "Makespan predicted vs achieved", **schedule_report(loads, elapsed))
+        write_log(args.log_file, "pool", "success", "CPU worker pool finished", workers=len(plan))
+
+    workers_span.end()
 
     join_cmd = [
         sys.executable,
         "scripts/tts_join.py",
-        "--chunks",
-        os.path.join(workdir, "*.wav"),
+        *(["--store", store.root] if store else ["--chunks", os.path.join(workdir, "*.wav")]),
         "--out",
         args.out,
         "--sr",
         str(args.sr),
         "--crossfade-ms",
         str(args.crossfade_ms),
+        "--loudnorm",
+        args.loudnorm,
     ]
+    for spec in args.encode:
+        join_cmd.extend(["--encode", spec])
+    if args.no_wav:
+        join_cmd.append("--no-wav")
     if args.log_file:
         join_cmd.extend(["--log-file", args.log_file])
-    sh(join_cmd, log_file=args.log_file)
+    sh(join_cmd, log_file=args.log_file, name="stage:join")
 
     write_log(args.log_file, "cli", "success", "Render complete", output=args.out)
     print("All done:", args.out)
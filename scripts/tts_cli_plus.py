@@ -6,8 +6,18 @@ if __package__ in (None, ""):
     _root = str(_pathlib.Path(__file__).resolve().parents[1])
     if _root not in sys.path:
         sys.path.insert(0, _root)
+from scripts.autotune import apply_profile, load_profile, profile_for
 from scripts.backend import pick_backend
 from scripts.log_util import JsonlLogger
+from scripts.tts_client import DEFAULT_SERVER_URL, server_alive, submit_render
+from scripts.voice_registry import resolve_voice
+from scripts.chunk_queue import reset_queue, tally_claims, unfinished_claims
+from scripts.chunk_store import ChunkStore, store_enabled
+from scripts.encoders import parse_targets
+from scripts.ffmpeg_check import assert_ffmpeg_available
+from scripts.worker_pool import count_chunks, member_env, plan_cpu_pool, predicted_loads, queue_env, run_pool, schedule_report, shard_files
+from scripts.precision import precision_from_env
+from scripts.run_manifest import RunManifest, plan_resume, verify
 
 def sh(*args): print('>', ' '.join(args)); return subprocess.check_call(list(args))
 
@@ -16,48 +26,173 @@ if __name__=='__main__':
 
   ap = argparse.ArgumentParser()
   ap.add_argument('--text', required=True)
-  ap.add_argument('--voice', required=True)
+  ap.add_argument('--voice', required=True, help='Voice file (.pt / .safetensors) or registered voice ID')
   ap.add_argument('--device-order', default=_os.environ.get('TTS_DEVICE_ORDER','rocm,dml,cpu'))
   ap.add_argument('--gpu-workers', type=int, default=1)
-  ap.add_argument('--cpu-workers', type=int, default=6)
-  ap.add_argument('--chunk-sec', type=int, default=int(_os.environ.get('TTS_CHUNK_SECONDS','20')))
+  ap.add_argument('--cpu-workers', type=int, default=None, help='CPU worker processes (default: host profile or 6)')
+  ap.add_argument('--threads-per-worker', type=int, default=None, help='torch threads per CPU worker (default: host profile, else cores / workers)')
+  ap.add_argument('--pin-cores', action='store_true', help='Pin each CPU worker to its own set of cores')
+  ap.add_argument('--zygote', action='store_true', default=_os.environ.get('TTS_ZYGOTE') == '1',
+                  help='Fork CPU workers from one process that loads the model once (POSIX only; TTS_ZYGOTE=1)')
+  ap.add_argument('--hetero', action='store_true', help='Run GPU and CPU workers together on one work-stealing chunk queue')
+  ap.add_argument('--chunk-sec', type=int, default=int(_os.environ['TTS_CHUNK_SECONDS']) if _os.environ.get('TTS_CHUNK_SECONDS') else None,
+                  help='Target chunk length (default: TTS_CHUNK_SECONDS, host profile, or 20)')
   ap.add_argument('--crossfade-ms', type=int, default=int(_os.environ.get('TTS_CROSSFADE_MS','8')))
   ap.add_argument('--sr', type=int, default=int(_os.environ.get('TTS_SAMPLE_RATE','48000')))
   ap.add_argument('--out', required=True)
+  ap.add_argument('--loudnorm', choices=['native','ffmpeg'], default='native',
+                  help='Built-in single-pass R128 (native) or the ffmpeg two-pass reference')
   ap.add_argument('--cpu-only', action='store_true')
   ap.add_argument('--run-dir', default=None, help='Optional runs/<timestamp> root for logs/artifacts')
+  ap.add_argument('--server', default=_os.environ.get('TTS_SERVER_URL', DEFAULT_SERVER_URL),
+                  help='Warm render service (scripts/tts_server.py) to submit to when it is running')
+  ap.add_argument('--no-server', action='store_true', help='Always render locally, even if the service is up')
+  ap.add_argument('--cache-dir', default=None, help='Rendered-chunk cache (default: TTS_CACHE_DIR or artifacts/cache/chunks)')
+  ap.add_argument('--no-cache', action='store_true', help='Synthesize every chunk, ignoring the chunk cache')
+  ap.add_argument('--batch-size', type=int, default=None,
+                  help='Chunks each worker decodes together, bucketed by token length (default: TTS_BATCH_SIZE or 1)')
+  ap.add_argument('--precision', choices=['fp32','int8','bf16'], default=None,
+                  help='CPU worker precision: fp32, dynamic int8 or bf16 autocast (default: TTS_CPU_PRECISION or fp32)')
+  ap.add_argument('--encode', action='append', default=[], metavar='FORMAT[:BITRATE][=PATH]',
+                  help='Also encode to opus/mp3/flac during the join (repeatable), e.g. --encode opus:48k')
+  ap.add_argument('--no-wav', action='store_true', help='Write only the --encode outputs, no WAV master')
+  ap.add_argument('--chunk-store', action='store_true', default=store_enabled(),
+                  help='Workers append float32 chunks to one memory-mapped store instead of WAV files (TTS_CHUNK_STORE=1)')
+  ap.add_argument('--resume', action='store_true',
+                  help='Keep chunks the run manifest marks done and still verify; render only missing or corrupt ones')
+  ap.add_argument('--profile', default=None, help="Host profile from autotune.py (default: this host's)")
+  ap.add_argument('--no-profile', action='store_true', help='Ignore the host profile')
   args = ap.parse_args()
+  try:
+      args.voice = resolve_voice(args.voice)
+  except KeyError as exc:
+      ap.error(exc.args[0])
+  try:
+      targets = parse_targets(args.encode, args.out)
+  except ValueError as exc:
+      ap.error(str(exc))
+  if (targets or args.no_wav) and args.loudnorm != 'native':
+      ap.error('--encode / --no-wav need --loudnorm native')
+  if args.no_wav and not targets:
+      ap.error('--no-wav needs at least one --encode target')
+  if targets:
+      assert_ffmpeg_available()
+  use_server = not args.no_server and server_alive(args.server)
+  backend = None if use_server else pick_backend(args.device_order)
+  cpu_pool = not use_server and (args.cpu_only or backend == 'cpu')
+  profile, skipped = profile_for(None if args.no_profile else load_profile(args.profile),
+                                 args.precision or precision_from_env(), cpu_pool)
+  from_profile = apply_profile(args, profile)
 
   logs = JsonlLogger(args.run_dir)
   logs.log("pipeline_start", text=args.text, out=args.out, device_order=args.device_order)
+  if from_profile:
+      logs.log("profile_applied", **{k: getattr(args, k) for k in from_profile})
+  elif skipped:
+      logs.log("profile_skipped", reason=skipped)
+  logs.start_span("pipeline", out=args.out)  # closed at exit
 
   os.makedirs(os.path.dirname(args.out), exist_ok=True)
 
+  if use_server:
+      print('Submitting to render service:', args.server)
+      if args.chunk_store:
+          logs.log("chunk_store_unused", reason="the render service keeps chunks in memory")
+      t0 = time.time()
+      result = submit_render(args.server, args.text, args.out, voice=args.voice, chunk_sec=args.chunk_sec,
+                             sr=args.sr, crossfade_ms=args.crossfade_ms, loudnorm=args.loudnorm,
+                             encode=targets, wav=not args.no_wav)
+      logs.log("server_render_done", server=args.server, elapsed=round(time.time()-t0,3), result=result)
+      logs.log("pipeline_end", out=args.out)
+      print('All done:', args.out)
+      sys.exit(0)
+
   # Backend selection
-  backend = pick_backend(args.device_order)
   print('Backend selected:', backend)
   logs.log("backend_selected", backend=backend)
   # Propagate to worker so it can pick DML/ROCm/CUDA deterministically
   os.environ["TTS_BACKEND"] = backend
+  if args.cache_dir:
+      os.environ["TTS_CACHE_DIR"] = args.cache_dir
+  if args.no_cache:
+      os.environ["TTS_CACHE"] = "0"
+  if args.batch_size:
+      os.environ["TTS_BATCH_SIZE"] = str(args.batch_size)
+  if args.precision:
+      os.environ["TTS_CPU_PRECISION"] = args.precision
+  os.environ["TTS_CHUNK_STORE"] = "1" if args.chunk_store else "0"
 
   # Chunk text
   chunks_jsonl = os.path.join(os.path.dirname(args.out), 'chunks.jsonl')
   t0 = time.time()
-  sh(sys.executable, 'scripts/tts_chunk.py', '--text', args.text, '--out', chunks_jsonl, '--chunk-sec', str(args.chunk_sec))
+  with logs.span("stage:chunk"):
+      sh(sys.executable, 'scripts/tts_chunk.py', '--text', args.text, '--out', chunks_jsonl, '--chunk-sec', str(args.chunk_sec))
   logs.log("chunking_done", elapsed=round(time.time()-t0,3), chunks_jsonl=chunks_jsonl)
 
   # Worker (logged variants)
   workdir = os.path.join(os.path.dirname(args.out), 'chunks')
   os.makedirs(workdir, exist_ok=True)
-  if backend != 'cpu' and not args.cpu_only:
+  store = ChunkStore.for_out_dir(workdir) if args.chunk_store else None
+  manifest = store or RunManifest.for_out_dir(workdir)
+  if args.resume:
+      todo_jsonl = os.path.join(os.path.dirname(args.out), 'chunks.todo.jsonl')
+      counts = plan_resume(chunks_jsonl, manifest, todo_jsonl, check=store.verify if store else verify)
+      print(f"Resume: {counts['done']}/{counts['total']} chunks already rendered")
+      logs.log("resume_plan", manifest=store.root if store else manifest.path, **counts)
+      chunks_jsonl = todo_jsonl
+  else:
+      manifest.reset()
+
+  if args.hetero and (backend == 'cpu' or args.cpu_only):
+      print('--hetero ignored: no accelerator, running the CPU pool only')
+      logs.log("hetero_ignored", reason="no accelerator", backend=backend, cpu_only=args.cpu_only)
+  workers_span = logs.start_span("stage:synth")
+  if count_chunks(chunks_jsonl) == 0:
+      logs.log("workers_skipped", reason="no chunks left to render")
+  elif backend != 'cpu' and not args.cpu_only and args.hetero:
+      claim_dir = os.path.join(os.path.dirname(args.out), 'claims')
+      reset_queue(claim_dir)
+      accel_count = max(1, args.gpu_workers)
+      plan = plan_cpu_pool(chunks_jsonl, args.cpu_workers, args.threads_per_worker, args.pin_cores,
+                           shared_queue=True, reserve_cores=accel_count)
+      logs.log("hetero_pool_start", device=backend, accel_workers=accel_count, cpu_workers=len(plan),
+               threads=[p["threads"] for p in plan])
+      t0 = time.time()
+      gpu_cmd = [sys.executable, 'scripts/tts_worker_gpu_logged.py', chunks_jsonl, workdir, args.voice, logs.run_dir.as_posix()]
+      cpu_cmd = [sys.executable, 'scripts/tts_worker_cpu_logged.py', chunks_jsonl, workdir, args.voice, logs.run_dir.as_posix()]
+      loads = predicted_loads(chunks_jsonl, accel_count + len(plan))
+      try:
+          elapsed = run_pool([gpu_cmd] * accel_count + [cpu_cmd] * len(plan),
+                             [queue_env(os.environ, claim_dir, 'head')] * accel_count +
+                             [queue_env(member_env(os.environ, p["threads"], p["cores"]), claim_dir, 'tail') for p in plan])
+      except subprocess.CalledProcessError:
+          done = {i for i, rec in manifest.load().items() if rec.get("status") == "done"}
+          logs.log("hetero_pool_failed", unfinished=unfinished_claims(claim_dir, done), hint="re-run with --resume")
+          raise
+      logs.log("schedule_makespan", **schedule_report(loads, elapsed))
+      logs.log("hetero_pool_end", elapsed=round(time.time()-t0,3), claims_per_worker=tally_claims(claim_dir))
+  elif backend != 'cpu' and not args.cpu_only:
       sh(sys.executable, 'scripts/tts_worker_gpu_logged.py', chunks_jsonl, workdir, args.voice, logs.run_dir.as_posix())
   else:
-      sh(sys.executable, 'scripts/tts_worker_cpu_logged.py', chunks_jsonl, workdir, args.voice, logs.run_dir.as_posix())
+      plan = plan_cpu_pool(chunks_jsonl, args.cpu_workers, args.threads_per_worker, args.pin_cores)
+      logs.log("cpu_pool_start", workers=len(plan), threads=[p["threads"] for p in plan], cores=[p["cores"] for p in plan])
+      t0 = time.time()
+      loads = predicted_loads(chunks_jsonl, len(plan))
+      elapsed = run_pool([[sys.executable, 'scripts/tts_worker_cpu_logged.py', p["chunks"], workdir, args.voice, logs.run_dir.as_posix()] for p in plan],
+                         [member_env(os.environ, p["threads"], p["cores"]) for p in plan], fork_server=args.zygote,
+                         cleanup=shard_files(plan))
+      logs.log("schedule_makespan", **schedule_report(loads, elapsed))
+      logs.log("cpu_pool_end", workers=len(plan), elapsed=round(time.time()-t0,3))
+
+  workers_span.end()
 
   # Join + normalize with ffmpeg check
-  sh(sys.executable, 'scripts/tts_join_checked.py', '--chunks', os.path.join(workdir, '*.wav'),
-     '--out', args.out, '--sr', str(args.sr), '--crossfade-ms', str(args.crossfade_ms),
-     '--run-dir', logs.run_dir.as_posix())
+  with logs.span("stage:join"):
+      sh(sys.executable, 'scripts/tts_join_checked.py',
+         *(['--store', store.root] if store else ['--chunks', os.path.join(workdir, '*.wav')]),
+         '--out', args.out, '--sr', str(args.sr), '--crossfade-ms', str(args.crossfade_ms),
+         '--loudnorm', args.loudnorm, '--run-dir', logs.run_dir.as_posix(),
+         *[arg for spec in args.encode for arg in ('--encode', spec)], *(['--no-wav'] if args.no_wav else []))
 
   logs.log("pipeline_end", out=args.out)
   print('All done:', args.out)
@@ -0,0 +1,59 @@
+"""Thin client for the warm render service in tts_server.py (stdlib only)."""
+import json
+import os
+import socket
+from urllib.parse import urlsplit
+
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+
+
+def server_alive(url, timeout=0.5):
+    """True when a render service answers /health at ``url``."""
+    parts = urlsplit(url)
+    try:
+        # Nothing listening is the common case; a refused connect is cheaper than an HTTP round trip.
+        socket.create_connection((parts.hostname or "127.0.0.1", parts.port or 80), timeout=timeout).close()
+    except OSError:
+        return False
+    import urllib.request
+
+    try:
+        with urllib.request.urlopen(url.rstrip("/") + "/health", timeout=timeout) as resp:
+            return json.loads(resp.read() or b"{}").get("status") == "ok"
+    except (OSError, ValueError):
+        return False
+
+
+def submit_render(url, text_path, out, voice=None, language="en", chunk_sec=20, sr=48000, crossfade_ms=8,
+                  loudnorm="native", encode=(), wav=True):
+    """Send one render job and block until the service has written ``out``.
+
+    ``encode`` holds parsed targets (encoders.parse_targets); their paths are sent absolute.
+    """
+    import urllib.error
+    import urllib.request
+
+    job = {
+        "text_path": os.path.abspath(text_path),
+        "out": os.path.abspath(out),
+        "voice": os.path.abspath(voice) if voice else None,
+        "language": language,
+        "chunk_sec": chunk_sec,
+        "sr": sr,
+        "crossfade_ms": crossfade_ms,
+        "loudnorm": loudnorm,
+        "encode": [{**t, "path": os.path.abspath(t["path"])} for t in encode],
+        "wav": wav,
+    }
+    req = urllib.request.Request(
+        url.rstrip("/") + "/render",
+        data=json.dumps(job).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    try:
+        with urllib.request.urlopen(req) as resp:
+            return json.loads(resp.read())
+    except urllib.error.HTTPError as exc:
+        detail = exc.read().decode("utf-8", errors="ignore")
+        raise RuntimeError(f"render service rejected job ({exc.code}): {detail}") from exc
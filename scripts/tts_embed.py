@@ -1,11 +1,20 @@
 import argparse
-import json
 import os
-from datetime import datetime, timezone
+import sys
 
 import torch
 from TTS.api import TTS
 
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_embed.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.tracing import span, write_log
+from scripts.voice_conditioning import SAFE_SUFFIX, VERSION, compute_conditioning, save_voice
+
 
 def load_xtts_for_env():
     """Prefer local model+config if TTS_MODEL_DIR is set; otherwise use model_name."""
@@ -18,42 +27,35 @@ def load_xtts_for_env():
     return TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", gpu=False)
 
 
-def timestamp():
-    return datetime.now(timezone.utc).isoformat()
-
-
-def write_log(log_file, stage, status, message, **extra):
-    if not log_file:
-        return
-    entry = {
-        "timestamp": timestamp(),
-        "stage": stage,
-        "status": status,
-        "message": message,
-        **extra,
-    }
-    log_dir = os.path.dirname(log_file) or "."
-    os.makedirs(log_dir, exist_ok=True)
-    with open(log_file, "a", encoding="utf-8") as fh:
-        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
-
-
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--refs", nargs="+", required=True, help="List of reference WAV files")
-    ap.add_argument("--out", default="artifacts/models/voice.pt")
+    ap.add_argument("--out", default="artifacts/models/voice.pt",
+                    help="Output file; a .safetensors name writes the safe format instead of torch.save")
     ap.add_argument("--log-file")
+    ap.add_argument(
+        "--format",
+        choices=["conditioning", "embedding"],
+        default="conditioning",
+        help="conditioning: versioned GPT latents + speaker embedding (direct inference); "
+        "embedding: legacy get_speaker_embeddings output for the TTS.api path.",
+    )
     args = ap.parse_args()
 
     out_dir = os.path.dirname(args.out) or "."
     os.makedirs(out_dir, exist_ok=True)
     write_log(args.log_file, "embed", "start", "Embedding extraction started", refs=args.refs)
 
-    model = load_xtts_for_env()
-    embed = model.get_speaker_embeddings(args.refs)
-    torch.save(embed, args.out)
-
-    write_log(args.log_file, "embed", "success", "Embedding saved", output=args.out)
+    with span(args.log_file, "model-load", stage="embed"):
+        model = load_xtts_for_env()
+    save = save_voice if args.out.endswith(SAFE_SUFFIX) else torch.save
+    if args.format == "conditioning":
+        save(compute_conditioning(model, args.refs), args.out)
+        write_log(args.log_file, "embed", "success", "Conditioning saved", output=args.out, version=VERSION)
+    else:
+        embed = model.get_speaker_embeddings(args.refs)
+        save(embed, args.out)
+        write_log(args.log_file, "embed", "success", "Embedding saved", output=args.out)
     print("Saved", args.out)
 
 
@@ -1,74 +1,183 @@
 import argparse
 import glob
-import json
 import os
 import subprocess
-from datetime import datetime, timezone
-
-from pydub import AudioSegment
-
-
-def timestamp():
-    return datetime.now(timezone.utc).isoformat()
-
-
-def write_log(log_file, stage, status, message, **extra):
-    if not log_file:
-        return
-    entry = {
-        "timestamp": timestamp(),
-        "stage": stage,
-        "status": status,
-        "message": message,
-        **extra,
-    }
-    log_dir = os.path.dirname(log_file) or '.'
-    os.makedirs(log_dir, exist_ok=True)
-    with open(log_file, "a", encoding="utf-8") as fh:
-        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
-
-def crossfade_concat(files, out, sr=48000, crossfade_ms=8):
-    seg = AudioSegment.silent(duration=0, frame_rate=sr)
-    for f in files:
-        seg = seg.append(AudioSegment.from_file(f), crossfade=crossfade_ms)
-    tmp = out.replace('.wav','_pre.wav')
-    seg.export(tmp, format='wav')
-    # Two-pass EBU R128 loudness normalization
+import sys
+
+import numpy as np
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_join.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.audio_io import audio_frames, read_wav, resample
+from scripts.chunk_store import ChunkStore
+from scripts.encoders import AudioOutputs, chapter_marks, parse_targets
+from scripts.loudness import load_chunk_stats, measure_with_ffmpeg, parse_loudnorm_json, plan_gain
+from scripts.tracing import span, write_log
+
+
+def loudnorm_two_pass(input_args, out, data=None, sr=None):
+    """Two-pass EBU R128 loudness normalization with ffmpeg.
+
+    input_args: ffmpeg input spec, e.g. ['-i', path] or a raw-PCM spec
+    reading '-' when the audio is passed in memory as ``data`` bytes.
+    """
     # Pass 1
-    meter = subprocess.check_output([
-        'ffmpeg','-y','-i',tmp,'-af',
+    meter = subprocess.run([
+        'ffmpeg','-y',*input_args,'-af',
         'loudnorm=I=-16:TP=-1.0:LRA=11:print_format=json',
         '-f','null','-'
-    ], stderr=subprocess.STDOUT).decode('utf-8', errors='ignore')
-    # Very light-weight parse
-    import re
-    get = lambda k: (re.search(rf'"{k}":\s*([-0-9.]+)', meter) or [None, None])[1]
-    measured_I = get('input_i') or "-23"
-    measured_TP = get('input_tp') or "-2"
-    measured_LRA = get('input_lra') or "7"
-    measured_thresh = get('input_thresh') or "-23"
-    offset = get('target_offset') or "0"
-    # Pass 2
-    subprocess.check_call([
-        'ffmpeg','-y','-i',tmp,'-af',
+    ], input=data, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, check=True).stdout.decode('utf-8', errors='ignore')
+    measured = parse_loudnorm_json(meter)
+    measured_I = measured['input_i'] or "-23"
+    measured_TP = measured['input_tp'] or "-2"
+    measured_LRA = measured['input_lra'] or "7"
+    measured_thresh = measured['input_thresh'] or "-23"
+    offset = measured['target_offset'] or "0"
+    # Pass 2 (loudnorm resamples to 192 kHz internally; pin the output rate)
+    rate = ['-ar', str(sr)] if sr else []
+    subprocess.run([
+        'ffmpeg','-y',*input_args,'-af',
         f'loudnorm=I=-16:TP=-1.0:LRA=11:measured_I={measured_I}:'
         f'measured_LRA={measured_LRA}:measured_TP={measured_TP}:'
         f'measured_thresh={measured_thresh}:offset={offset}',
-        out
-    ])
+        *rate, out
+    ], input=data, check=True)
+
+class StreamingCrossfader:
+    """Linear crossfade over a stream of chunks, holding back only one fade tail.
+
+    push() returns the samples that are final once the next chunk's fade-in
+    is known; flush() returns the held tail after the last chunk.
+    """
+
+    def __init__(self, fade_samples):
+        self.fade = max(0, int(fade_samples))
+        self._tail = np.zeros(0, dtype=np.float32)
+
+    def push(self, samples):
+        samples = np.asarray(samples, dtype=np.float32)
+        tail = self._tail
+        n = min(self.fade, len(tail), len(samples))
+        if n:
+            ramp = np.linspace(0.0, 1.0, n, endpoint=False, dtype=np.float32)
+            blended = tail[len(tail) - n:] * (1.0 - ramp) + samples[:n] * ramp
+            head = np.concatenate([tail[:len(tail) - n], blended])
+        else:
+            head = tail
+        rest = samples[n:]
+        keep = min(self.fade, len(rest))
+        self._tail = rest[len(rest) - keep:].copy()
+        return np.concatenate([head, rest[:len(rest) - keep]])
+
+    def flush(self):
+        tail, self._tail = self._tail, np.zeros(0, dtype=np.float32)
+        return tail
+
+
+def _chunk_source(store=None):
+    """``(read, frames, stats, title)`` for chunk files, or for chunk ids in a ChunkStore."""
+    if store is None:
+        return read_wav, audio_frames, load_chunk_stats, lambda f: os.path.splitext(os.path.basename(f))[0]
+    records = store.load()
+
+    def frames(chunk_id):
+        return records[chunk_id]["frames"], records[chunk_id]["rate"]
+
+    return (lambda chunk_id: store.read(chunk_id, records), frames,
+            lambda chunk_id: records[chunk_id]["stats"], lambda chunk_id: f"{chunk_id:06d}")
+
+
+def stream_join(files, out, sr=48000, crossfade_ms=8, gain=1.0, encode=(), store=None):
+    """Decode, resample and crossfade chunk files one at a time into ``out``.
+
+    ``gain`` (linear) is applied on the way out. Memory stays bounded by a
+    single chunk and time is linear in audio length. ``encode`` targets
+    (see encoders.py) are fed the same blocks, with one chapter per chunk
+    file; ``out=None`` skips the WAV. With a ChunkStore as ``store``,
+    ``files`` are chunk ids and the samples are read from its memory map.
+    Returns the duration written, in seconds.
+    """
+    read, frames, _, title = _chunk_source(store)
+    fade = sr * crossfade_ms // 1000
+    fader = StreamingCrossfader(fade)
+    chapters = None
+    if encode:
+        lengths = [-(-n * sr // rate) for n, rate in map(frames, files)]
+        chapters = chapter_marks(lengths, fade, [title(f) for f in files])
+    with AudioOutputs(out, sr, encode, chapters) as writer:
+        for f in files:
+            samples, rate = read(f)
+            writer.write(fader.push(resample(samples, rate, sr)) * gain)
+        writer.write(fader.flush() * gain)
+    return writer.frames / sr
+
+
+def crossfade_concat(files, out, sr=48000, crossfade_ms=8, loudnorm='native', log_file=None, encode=(), wav=True,
+                     store=None):
+    """Join chunk files into a loudness-normalized ``out``.
+
+    native: single pass; per-chunk stats (sidecars written by the workers, or
+    measured here) give one gain that is applied while streaming the join.
+    The ``encode`` targets are written in that same pass; ``wav=False``
+    leaves out the WAV master.
+    ffmpeg: the reference path, a ``_pre.wav`` plus two loudnorm passes (WAV only).
+    ``store``: join chunk ids from a ChunkStore instead (stats from its index).
+    With ``log_file``, the loudness and concatenation steps are logged as spans.
+    Returns the loudness report (native) or None (ffmpeg).
+    """
+    if loudnorm == 'ffmpeg':
+        if encode or not wav:
+            raise ValueError('encoded outputs need --loudnorm native')
+        tmp = out.replace('.wav','_pre.wav')
+        with span(log_file, 'concat', stage='join', chunks=len(files)):
+            stream_join(files, tmp, sr, crossfade_ms, store=store)
+        with span(log_file, 'loudnorm', stage='join', method='ffmpeg'):
+            loudnorm_two_pass(['-i', tmp], out, sr=sr)
+        return None
+    stats = _chunk_source(store)[2]
+    with span(log_file, 'loudnorm', stage='join', method='native'):
+        gain_db, report = plan_gain([stats(f) for f in files])
+    with span(log_file, 'concat', stage='join', chunks=len(files), outputs=len(encode) + int(wav)):
+        report['seconds'] = round(stream_join(files, out if wav else None, sr, crossfade_ms,
+                                              gain=10.0 ** (gain_db / 20.0), encode=encode, store=store), 3)
+    return report
 
 if __name__ == '__main__':
     ap = argparse.ArgumentParser()
     ap.add_argument('--chunks', default='runs/latest/chunks/*.wav')
+    ap.add_argument('--store', default=None,
+                    help='Join from a chunk store (e.g. runs/latest/chunks/store) instead of --chunks WAVs')
     ap.add_argument('--out', default='runs/latest/render.wav')
     ap.add_argument('--sr', type=int, default=48000)
     ap.add_argument('--crossfade-ms', type=int, default=8)
+    ap.add_argument('--loudnorm', choices=['native', 'ffmpeg'], default='native',
+                    help='native: single-pass built-in R128; ffmpeg: two-pass loudnorm reference')
+    ap.add_argument('--validate', action='store_true', help='Re-measure the output with ffmpeg loudnorm')
+    ap.add_argument('--encode', action='append', default=[], metavar='FORMAT[:BITRATE][=PATH]',
+                    help='Also encode to opus/mp3/flac in the same pass (repeatable), e.g. opus:48k, mp3:128k')
+    ap.add_argument('--no-wav', action='store_true', help='Write only the --encode outputs, no WAV master')
     ap.add_argument('--log-file')
     a = ap.parse_args()
-    files = sorted(glob.glob(a.chunks))
+    try:
+        targets = parse_targets(a.encode, a.out)
+    except ValueError as exc:
+        ap.error(str(exc))
+    if (targets or a.no_wav) and a.loudnorm != 'native':
+        ap.error('--encode / --no-wav need --loudnorm native')
+    if a.no_wav and not targets:
+        ap.error('--no-wav needs at least one --encode target')
+    store = ChunkStore(a.store) if a.store else None
+    files = store.ids() if store else sorted(glob.glob(a.chunks))
     out_dir = os.path.dirname(a.out) or '.'
     os.makedirs(out_dir, exist_ok=True)
-    crossfade_concat(files, a.out, a.sr, a.crossfade_ms)
+    with span(a.log_file, 'join', stage='join', chunks=len(files)):
+        report = crossfade_concat(files, a.out, a.sr, a.crossfade_ms, a.loudnorm, a.log_file, targets, not a.no_wav,
+                                  store)
     write_log(
         a.log_file,
         'join',
@@ -76,5 +185,13 @@ if __name__ == '__main__':
         'Chunks concatenated',
         output=a.out,
         chunk_count=len(files),
+        loudnorm=a.loudnorm,
+        loudness=report,
+        encoded=[t['path'] for t in targets],
     )
-    print('Wrote', a.out)
+    if a.validate and not a.no_wav:
+        reference = measure_with_ffmpeg(a.out)
+        write_log(a.log_file, 'join', 'info', 'ffmpeg loudness reference', output=a.out, **reference)
+        print('ffmpeg reference:', reference)
+    for path in ([] if a.no_wav else [a.out]) + [t['path'] for t in targets]:
+        print('Wrote', path)
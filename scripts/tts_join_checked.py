@@ -12,16 +12,21 @@ from scripts.ffmpeg_check import assert_ffmpeg_available
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument('--chunks', default='runs/latest/chunks/*.wav')
+    ap.add_argument('--store', default=None, help='Join from a chunk store directory instead of --chunks')
     ap.add_argument('--out', default='runs/latest/render.wav')
     ap.add_argument('--sr', type=int, default=48000)
     ap.add_argument('--crossfade-ms', type=int, default=8)
+    ap.add_argument('--loudnorm', choices=['native', 'ffmpeg'], default='native')
+    ap.add_argument('--encode', action='append', default=[], help='FORMAT[:BITRATE][=PATH], see tts_join.py')
+    ap.add_argument('--no-wav', action='store_true')
     ap.add_argument('--run-dir', default=None)
     a = ap.parse_args()
 
     logs = JsonlLogger(a.run_dir)
-    logs.log("join_start", chunks=a.chunks, out=a.out, sr=a.sr, crossfade_ms=a.crossfade_ms)
+    logs.log("join_start", chunks=a.store or a.chunks, out=a.out, sr=a.sr, crossfade_ms=a.crossfade_ms, loudnorm=a.loudnorm)
 
-    assert_ffmpeg_available()
+    if a.loudnorm == 'ffmpeg' or a.encode:
+        assert_ffmpeg_available()
 
     # Dynamically import and call the existing joiner to avoid modifying it
     import importlib, importlib.util, sys, pathlib
@@ -48,21 +53,27 @@ def main():
                 tts_join = None
     t0 = time.time()
     # Re-implement tiny call using its function to respect your existing behavior
-    files = sorted(glob.glob(a.chunks))
     os.makedirs(os.path.dirname(a.out), exist_ok=True)
     # The original exposes crossfade_concat in top-level file; call via module attribute if present
+    report = None
     if tts_join is not None and hasattr(tts_join, "crossfade_concat"):
-        tts_join.crossfade_concat(files, a.out, a.sr, a.crossfade_ms)
+        store = tts_join.ChunkStore(a.store) if a.store else None
+        files = store.ids() if store else sorted(glob.glob(a.chunks))
+        with logs.span("join", chunks=len(files), loudnorm=a.loudnorm):
+            targets = tts_join.parse_targets(a.encode, a.out)
+            report = tts_join.crossfade_concat(files, a.out, a.sr, a.crossfade_ms, a.loudnorm, None, targets, not a.no_wav,
+                                                store)
     else:
         # Fallback: shell out to python scripts/tts_join.py if implementation changes
         import subprocess, sys
         subprocess.check_call([
             sys.executable, 'scripts/tts_join.py',
-            '--chunks', a.chunks, '--out', a.out,
-            '--sr', str(a.sr), '--crossfade-ms', str(a.crossfade_ms)
+            *(['--store', a.store] if a.store else ['--chunks', a.chunks]), '--out', a.out,
+            '--sr', str(a.sr), '--crossfade-ms', str(a.crossfade_ms), '--loudnorm', a.loudnorm,
+            *[arg for spec in a.encode for arg in ('--encode', spec)], *(['--no-wav'] if a.no_wav else [])
         ])
     elapsed = time.time() - t0
-    logs.log("join_end", out=a.out, elapsed=round(elapsed,3))
+    logs.log("join_end", out=a.out, elapsed=round(elapsed,3), loudness=report, encode=a.encode)
 
 if __name__ == '__main__':
     main()
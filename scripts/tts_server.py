@@ -0,0 +1,155 @@
+"""Long-running XTTS render service.
+
+Loads the model once and keeps it warm, then accepts render jobs over a
+small local HTTP API so short jobs skip the interpreter + torch + checkpoint
+cold start that every ``tts_cli.py`` run pays otherwise:
+
+    GET  /health   -> {"status": "ok", "device": ..., "jobs": n}
+    POST /render   -> body {"text_path" | "text", "out", "voice", "language",
+                            "chunk_sec", "sr", "crossfade_ms", "loudnorm",
+                            "encode", "wav"}
+
+``voice`` is a voice file path or a registered voice ID (voice_registry.py).
+
+Jobs run one at a time on the shared model. ``tts_cli.py`` submits to the
+service automatically when it answers on ``--server``.
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from functools import partial
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_server.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.backend import pick_backend
+from scripts.chunk_cache import ChunkCache
+from scripts.pipeline import load_model, render
+from scripts.tracing import span, write_log
+from scripts.tts_client import DEFAULT_SERVER_URL
+from scripts.voice_registry import VoiceCache, resolve_voice
+
+
+class RenderService:
+    """Owns the warm model plus an LRU of voices ready on its device (voice_registry.VoiceCache)."""
+
+    def __init__(self, device, log_file=None):
+        self.device = device
+        self.log_file = log_file
+        self.jobs = 0
+        self._lock = threading.Lock()
+        start = time.time()
+        with span(log_file, "model-load", stage="server", device=device):
+            self.model = load_model(device)
+        write_log(log_file, "server", "success", "Model loaded", device=device, elapsed=round(time.time() - start, 3))
+        self.voices = VoiceCache(self.model)
+
+    def _voice(self, ref):
+        if not ref:
+            return None
+        loads = self.voices.loads
+        synth = self.voices.get(ref)
+        if self.voices.loads != loads:
+            write_log(self.log_file, "server", "info", "Loaded speaker conditioning", voice=ref, **self.voices.stats())
+        return synth
+
+    def render(self, job):
+        if job.get("text") is None:
+            with open(job["text_path"], "r", encoding="utf-8") as fh:
+                job["text"] = fh.read()
+        out = job["out"]
+        with self._lock:
+            self.jobs += 1
+            write_log(self.log_file, "server", "start", "Render job accepted", output=out)
+            with span(self.log_file, "pipeline", stage="server", output=out):
+                summary = render(
+                    job["text"],
+                    out,
+                    model=self.model,
+                    voice=self._voice(job.get("voice")),
+                    language=job.get("language", "en"),
+                    device=self.device,
+                    chunk_sec=int(job.get("chunk_sec", 20)),
+                    sr=int(job.get("sr", 48000)),
+                    crossfade_ms=int(job.get("crossfade_ms", 8)),
+                    loudnorm=job.get("loudnorm", "native"),
+                    encode=job.get("encode") or (),
+                    wav=job.get("wav", True),
+                    log=partial(write_log, self.log_file),
+                    cache=ChunkCache.from_env(voice=resolve_voice(job.get("voice")), params={"writer": "raw"}),
+                )
+            write_log(self.log_file, "server", "success", "Render job complete", **summary)
+        return summary
+
+
+def make_handler(service):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, code, payload):
+            body = json.dumps(payload).encode("utf-8")
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._reply(200, {"status": "ok", "device": service.device, "jobs": service.jobs})
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/render":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", "0"))
+                job = json.loads(self.rfile.read(length) or b"{}")
+                if not job.get("out") or not (job.get("text") or job.get("text_path")):
+                    self._reply(400, {"error": "job needs 'out' and 'text' or 'text_path'"})
+                    return
+                self._reply(200, service.render(job))
+            except Exception as exc:  # report to the client instead of dropping the connection
+                write_log(service.log_file, "server", "error", "Render job failed", error=repr(exc))
+                self._reply(500, {"error": repr(exc)})
+
+        def log_message(self, fmt, *args):
+            print("[server]", fmt % args)
+
+    return Handler
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--server", default=os.environ.get("TTS_SERVER_URL", DEFAULT_SERVER_URL),
+                    help="Address to listen on (http://host:port).")
+    ap.add_argument("--device-order", default=os.environ.get("TTS_DEVICE_ORDER", "rocm,dml,cpu"))
+    ap.add_argument("--cpu-only", action="store_true")
+    ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    args = ap.parse_args()
+
+    host, _, port = args.server.split("://", 1)[-1].rstrip("/").partition(":")
+    device = "cpu" if args.cpu_only else pick_backend(args.device_order)
+    service = RenderService(device, args.log_file)
+    httpd = ThreadingHTTPServer((host or "127.0.0.1", int(port or 8765)), make_handler(service))
+    print(f"XTTS service ready on {args.server} (device={device})")
+    write_log(args.log_file, "server", "start", "Service listening", address=args.server, device=device)
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+        write_log(args.log_file, "server", "success", "Service stopped", jobs=service.jobs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""Real-time streaming synthesis to stdout, a FIFO or a socket.
+
+Text is chunked as usual, then each chunk is decoded with XTTS's incremental
+``inference_stream`` (needs a conditioning voice file from ``tts_embed.py``)
+and every decoded block is written and flushed as soon as it exists, either
+as raw 16-bit PCM or as a WAV stream with an open-ended header.
+
+    python scripts/tts_stream.py --text app/texts/demo.txt --voice artifacts/models/voice.pt | ffplay -nodisp -autoexit -
+    python scripts/tts_stream.py --text book.txt --format raw --out /tmp/tts.fifo
+    python scripts/tts_stream.py --text book.txt --out tcp://127.0.0.1:9000
+
+The log records first-packet latency and how often a listener playing in
+real time would have run dry (underruns) and for how long.
+"""
+import argparse
+import json
+import os
+import socket
+import struct
+import sys
+import time
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_stream.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.audio_io import to_pcm16
+from scripts.tracing import span, write_log
+
+
+def wav_stream_header(sample_rate, channels=1, width=2):
+    """RIFF/WAVE header for a stream of unknown length (sizes set to 0xFFFFFFFF)."""
+    unknown = 0xFFFFFFFF
+    fmt = struct.pack("<HHIIHH", 1, channels, sample_rate, sample_rate * channels * width, channels * width, 8 * width)
+    return b"RIFF" + struct.pack("<I", unknown) + b"WAVEfmt " + struct.pack("<I", len(fmt)) + fmt + \
+        b"data" + struct.pack("<I", unknown)
+
+
+def open_sink(spec):
+    """Binary writable for ``-`` (stdout), ``tcp://host:port`` or a file/FIFO path."""
+    if spec == "-":
+        return sys.stdout.buffer
+    if spec.startswith("tcp://"):
+        host, port = spec[len("tcp://"):].rsplit(":", 1)
+        sock = socket.create_connection((host, int(port)))
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return sock.makefile("wb")
+    return open(spec, "wb")  # blocks until a reader opens a FIFO
+
+
+class PlaybackClock:
+    """Models a listener that starts playing at the first packet, in real time.
+
+    An underrun is a packet that arrives after everything sent before it has
+    already been played; playback then resumes from that packet.
+    """
+
+    def __init__(self, sample_rate, start=None):
+        self.sample_rate = sample_rate
+        self.start = time.time() if start is None else start
+        self.first_packet = None
+        self.buffered_until = None
+        self.underruns = 0
+        self.stall_sec = 0.0
+        self.samples = 0
+        self.packets = 0
+
+    def packet(self, samples, now=None):
+        now = time.time() if now is None else now
+        if self.first_packet is None:
+            self.first_packet = now - self.start
+            self.buffered_until = now
+        elif now > self.buffered_until:
+            self.underruns += 1
+            self.stall_sec += now - self.buffered_until
+            self.buffered_until = now
+        self.buffered_until += samples / self.sample_rate
+        self.samples += samples
+        self.packets += 1
+
+    def report(self):
+        return {
+            "first_packet_sec": round(self.first_packet, 3) if self.first_packet is not None else None,
+            "packets": self.packets,
+            "seconds": round(self.samples / self.sample_rate, 3),
+            "underruns": self.underruns,
+            "stall_sec": round(self.stall_sec, 3),
+        }
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Stream XTTS audio as it is decoded.")
+    ap.add_argument("--text", required=True, help="Text file, or - for stdin")
+    ap.add_argument("--voice", help="Conditioning file from tts_embed.py or a registered voice ID (legacy embeddings stream per chunk)")
+    ap.add_argument("--language", default="en")
+    ap.add_argument("--device-order", default=os.environ.get("TTS_DEVICE_ORDER", "rocm,dml,cpu"))
+    ap.add_argument("--cpu-only", action="store_true")
+    ap.add_argument("--out", default="-", help="- (stdout), a file/FIFO path, or tcp://host:port")
+    ap.add_argument("--format", choices=["wav", "raw"], default="wav", help="WAV stream or raw s16le mono PCM")
+    ap.add_argument("--stream-chunk-size", type=int, default=20, help="GPT tokens decoded per streamed block")
+    ap.add_argument("--chunk-sec", type=int, default=int(os.environ.get("TTS_CHUNK_SECONDS", "20")))
+    ap.add_argument("--log-file", default=os.environ.get("TTS_LOG_FILE"))
+    args = ap.parse_args()
+
+    from scripts.backend import pick_backend
+    from scripts.pipeline import load_model
+    from scripts.tts_chunk import plan_chunks
+    from scripts.voice_conditioning import VoiceSynth
+    from scripts.voice_registry import resolve_voice
+
+    try:
+        voice = resolve_voice(args.voice)
+    except KeyError as exc:
+        ap.error(exc.args[0])
+    if args.text == "-":
+        text = sys.stdin.read()
+    else:
+        with open(args.text, "r", encoding="utf-8") as fh:
+            text = fh.read()
+    audio_stdout = sys.stdout.buffer
+    if args.out == "-":
+        sys.stdout = sys.stderr  # keep library chatter out of the audio stream
+    device = "cpu" if args.cpu_only else pick_backend(args.device_order)
+    t0 = time.time()
+    with span(args.log_file, "model-load", stage="stream", device=device):
+        model = load_model(device)
+        synth = VoiceSynth(model, voice)
+    write_log(args.log_file, "stream", "start", "Streaming synthesis ready", device=device, synth=synth.mode,
+              load_sec=round(time.time() - t0, 3), out=args.out, format=args.format,
+              stream_chunk_size=args.stream_chunk_size)
+    if synth.mode != "direct":
+        print("Voice file has no conditioning latents; streaming whole chunks instead of decoder blocks.",
+              file=sys.stderr)
+
+    sink = audio_stdout if args.out == "-" else open_sink(args.out)
+    clock = PlaybackClock(synth.sample_rate)
+    try:
+        if args.format == "wav":
+            sink.write(wav_stream_header(synth.sample_rate))
+        for i, chunk in enumerate(plan_chunks(text, args.chunk_sec, language=args.language)):
+            for block in synth.stream(chunk["text"], args.language, args.stream_chunk_size):
+                sink.write(to_pcm16(block).tobytes())
+                sink.flush()
+                clock.packet(len(block))
+                if clock.packets == 1:
+                    write_log(args.log_file, "stream", "info", "First packet", first_packet_sec=clock.report()["first_packet_sec"])
+            write_log(args.log_file, "stream", "success", "Chunk streamed", chunk_id=i, **clock.report())
+    except BrokenPipeError:
+        write_log(args.log_file, "stream", "info", "Listener closed the stream", **clock.report())
+        return
+    finally:
+        if sink is not audio_stdout:
+            sink.close()
+    write_log(args.log_file, "stream", "success", "Streaming synthesis finished",
+              elapsed=round(time.time() - clock.start, 3), **clock.report())
+    print(json.dumps(clock.report()), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
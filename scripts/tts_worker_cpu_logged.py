@@ -1,5 +1,5 @@
 # CPU worker with JSONL logging (keeps original worker untouched)
-import torch, json, sys, os, time
+import torch, sys, os
 from TTS.api import TTS
 # Allow absolute `scripts.*` imports even when executed directly
 if __package__ in (None, ""):
@@ -7,9 +7,24 @@ if __package__ in (None, ""):
     _root = str(_pathlib.Path(__file__).resolve().parents[1])
     if _root not in sys.path:
         sys.path.insert(0, _root)
+from scripts.batching import batch_size_from_env
+from scripts.chunk_cache import ChunkCache
+from scripts.chunk_queue import iter_chunks
+from scripts.chunk_store import ChunkStore
 from scripts.log_util import JsonlLogger
+from scripts.model_snapshot import load_snapshot
+from scripts.precision import apply_precision, cache_params, precision_from_env
+from scripts.run_manifest import RunManifest
+from scripts.voice_conditioning import VoiceSynth
+from scripts.voice_registry import resolve_voice
+from scripts.worker_loop import run_chunks
+from scripts.worker_pool import apply_thread_budget
+from scripts.zygote import preloaded_model
 
 def load_xtts():
+    model = preloaded_model() or load_snapshot(os.environ.get("TTS_MODEL_DIR"))
+    if model is not None:
+        return model
     mdir = os.environ.get("TTS_MODEL_DIR")
     if mdir and os.path.exists(os.path.join(mdir,"xtts_v2.pth")) and os.path.exists(os.path.join(mdir,"config.json")):
         return TTS(model_path=os.path.join(mdir,"xtts_v2.pth"), config_path=os.path.join(mdir,"config.json"), gpu=False)
@@ -17,28 +32,33 @@ def load_xtts():
 
 def run_worker(in_path, out_dir, voice_pt, logs: JsonlLogger):
     os.makedirs(out_dir, exist_ok=True)
-    model = load_xtts()
-    spk_embed = torch.load(voice_pt, map_location='cpu')
-    sr = getattr(getattr(model, "synthesizer", None), "output_sample_rate", 24000)
-    with open(in_path,'r',encoding='utf-8') as f:
-        for line in f:
-            item = json.loads(line)
-            t0 = time.time()
-            wav = model.tts(text=item["text"], speaker=spk_embed, language="en")
-            dur = len(wav)/sr if sr else 0.0
-            elapsed = time.time()-t0
-            rtf = elapsed/max(1e-6, dur)
-            out_wav = os.path.join(out_dir, f'{item["id"]:06d}.wav')
-            model.save_wav(wav, out_wav)
-            print(f'CPU chunk {item["id"]} -> {out_wav} RTF={rtf:.2f}')
-            logs.log("chunk_done", engine="cpu", chunk_id=item["id"], rtf=round(rtf,3),
-                     elapsed=round(elapsed,3), seconds=round(dur,3), out=out_wav)
+    with logs.span("model-load", engine="cpu"):
+        model = load_xtts()
+        precision = apply_precision(model, precision_from_env())
+        synth = VoiceSynth(model, voice_pt)
+    logs.log("voice_loaded", engine="cpu", path=voice_pt, synth=synth.mode, precision=precision)
+    cache = ChunkCache.from_env(voice=voice_pt, params=cache_params(precision, writer="save_wav"))
+    store = ChunkStore.from_env(out_dir)
+    writer = store.writer() if store else None
+    manifest = None if writer else RunManifest.for_out_dir(out_dir)
+    run_chunks(synth, model.save_wav, iter_chunks(in_path, owner=f'cpu:{os.getpid()}'), out_dir, "en",
+               batch_size_from_env(), log=logs.log, span=logs.span, device="cpu", cache=cache, writer=writer,
+               manifest=manifest, engine="cpu", precision=precision)
+    if cache:
+        logs.log("cache_summary", engine="cpu", **cache.stats(), **cache.evict())
 
 if __name__=='__main__':
     # args: jsonl input, out_dir, voice.pt, run_dir(optional)
-    in_path, out_dir, voice_pt = sys.argv[1], sys.argv[2], sys.argv[3]
+    in_path, out_dir = sys.argv[1], sys.argv[2]
+    try:
+        voice_pt = resolve_voice(sys.argv[3])
+    except KeyError as exc:
+        sys.exit(exc.args[0])
     run_dir = sys.argv[4] if len(sys.argv) > 4 else None
     logger = JsonlLogger(run_dir)
-    logger.log("worker_start", engine="cpu", in_path=in_path, out_dir=out_dir)
-    run_worker(in_path, out_dir, voice_pt, logger)
+    threads, cores = apply_thread_budget()
+    logger.log("worker_start", engine="cpu", pid=os.getpid(), in_path=in_path, out_dir=out_dir,
+               threads=threads or torch.get_num_threads(), cores=cores)
+    with logger.span("worker", engine="cpu"):
+        run_worker(in_path, out_dir, voice_pt, logger)
     logger.log("worker_end", engine="cpu")
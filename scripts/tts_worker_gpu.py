@@ -1,73 +1,72 @@
 import argparse
-import json
 import os
-import platform
-import time
-from datetime import datetime, timezone
-
-import torch
-from TTS.api import TTS
-
-
-def timestamp():
-    return datetime.now(timezone.utc).isoformat()
-
-
-def write_log(log_file, stage, status, message, **extra):
-    if not log_file:
-        return
-    entry = {
-        "timestamp": timestamp(),
-        "stage": stage,
-        "status": status,
-        "message": message,
-        **extra,
-    }
-    log_dir = os.path.dirname(log_file) or "."
-    os.makedirs(log_dir, exist_ok=True)
-    with open(log_file, "a", encoding="utf-8") as fh:
-        fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+import sys
+from functools import partial
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/tts_worker_gpu.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.backend import capabilities, default_device
+from scripts.batching import batch_size_from_env
+from scripts.chunk_cache import ChunkCache
+from scripts.chunk_queue import iter_chunks
+from scripts.chunk_store import ChunkStore
+from scripts.model_snapshot import load_snapshot
+from scripts.run_manifest import RunManifest
+from scripts.tracing import span, start_span, write_log
+from scripts.voice_conditioning import VoiceSynth
+from scripts.voice_registry import resolve_voice
+from scripts.worker_loop import run_chunks, worker_log
 
 
 def load_xtts(device):
+    from TTS.api import TTS
+
+    caps = capabilities()  # cached probe; its key covers the model files, so "valid" is current
+    mdir = os.environ.get("TTS_MODEL_DIR")
+    local = bool(mdir) and caps["model"]["valid"]
     if device == "dml":
         import torch_directml as dml  # noqa: F401
         # Prefer local files if present
-        mdir = os.environ.get("TTS_MODEL_DIR")
-        if mdir and os.path.exists(os.path.join(mdir, "xtts_v2.pth")) and os.path.exists(os.path.join(mdir, "config.json")):
+        if local:
             return TTS(model_path=os.path.join(mdir, "xtts_v2.pth"), config_path=os.path.join(mdir, "config.json"), gpu=False)
         return TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", gpu=False)
-    use_gpu = device not in {"cpu", "dml"} and torch.cuda.is_available()
-    mdir = os.environ.get("TTS_MODEL_DIR")
-    if mdir and os.path.exists(os.path.join(mdir, "xtts_v2.pth")) and os.path.exists(os.path.join(mdir, "config.json")):
+    use_gpu = device not in {"cpu", "dml"} and caps["cuda"]
+    model = load_snapshot(mdir, gpu=use_gpu)
+    if model is not None:
+        return model
+    if local:
         return TTS(model_path=os.path.join(mdir, "xtts_v2.pth"), config_path=os.path.join(mdir, "config.json"), gpu=use_gpu)
     return TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", gpu=use_gpu)
 
 
-def detect_default_device():
-    if platform.system() == "Windows":
-        try:
-            import torch_directml  # noqa: F401
-
-            return "dml"
-        except Exception:
-            pass
-    if torch.cuda.is_available():
-        return "cuda"
-    return "cpu"
-
-
 def main():
     parser = argparse.ArgumentParser()
     parser.add_argument("--chunks", required=True)
     parser.add_argument("--out-dir", required=True)
-    parser.add_argument("--voice")
+    parser.add_argument("--voice", help="Voice file or registered voice ID")
     parser.add_argument("--language", default="en")
     parser.add_argument("--log-file")
     parser.add_argument("--device", default=None)
+    parser.add_argument("--queue-dir", help="Claim directory shared with other workers (work-stealing mode).")
+    parser.add_argument("--take", choices=["head", "tail"], default=None)
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=batch_size_from_env(),
+        help="Chunks decoded together, bucketed by token length (default: TTS_BATCH_SIZE or 1).",
+    )
     args = parser.parse_args()
+    try:
+        args.voice = resolve_voice(args.voice)
+    except KeyError as exc:
+        parser.error(exc.args[0])
 
-    device = args.device or detect_default_device()
+    device = args.device or default_device()
     log_file = args.log_file or os.environ.get("TTS_LOG_FILE")
 
     os.makedirs(args.out_dir, exist_ok=True)
@@ -75,38 +74,25 @@ def main():
 
     if device == "rocm":
         os.environ.setdefault("HIP_VISIBLE_DEVICES", "0")
-    model = load_xtts(device)
-
-    spk_embed = None
+    worker_span = start_span(log_file, "worker", stage="worker", mode=device)
+    with span(log_file, "model-load", stage="worker", device=device):
+        model = load_xtts(device)
+        synth = VoiceSynth(model, args.voice)
     if args.voice:
-        spk_embed = torch.load(args.voice, map_location="cpu")
-        write_log(log_file, "worker", "info", "Loaded speaker embedding", path=args.voice)
-
-    with open(args.chunks, "r", encoding="utf-8") as handle:
-        for line in handle:
-            item = json.loads(line)
-            start = time.time()
-            if spk_embed is not None:
-                wav = model.tts(text=item["text"], speaker=spk_embed, language=args.language)
-            else:
-                wav = model.tts(text=item["text"], language=args.language)
-            duration = len(wav) / model.synthesizer.output_sample_rate
-            rtf = (time.time() - start) / max(1e-6, duration)
-            out_wav = os.path.join(args.out_dir, f"{item['id']:06d}.wav")
-            model.save_wav(wav, out_wav)
-            msg = f"{device.upper()} chunk {item['id']} -> {out_wav} RTF={rtf:.2f}"
-            write_log(
-                log_file,
-                "worker",
-                "success",
-                "Chunk rendered",
-                chunk_id=item["id"],
-                path=out_wav,
-                rtf=rtf,
-                device=device,
-            )
-            print(msg)
-
+        write_log(log_file, "worker", "info", "Loaded speaker conditioning", path=args.voice, synth=synth.mode)
+
+    cache = ChunkCache.from_env(voice=args.voice, params={"writer": "save_wav"})
+    store = ChunkStore.from_env(args.out_dir)
+    writer = store.writer() if store else None
+    manifest = None if writer else RunManifest.for_out_dir(args.out_dir)
+    claimed = iter_chunks(args.chunks, args.queue_dir, f"{device}:{os.getpid()}", args.take)
+    run_chunks(synth, model.save_wav, claimed, args.out_dir, args.language, args.batch_size, log=worker_log(log_file),
+               span=partial(span, log_file, stage="worker"), device=device, cache=cache, writer=writer,
+               manifest=manifest)
+
+    if cache:
+        write_log(log_file, "cache", "info", "Chunk cache summary", **cache.stats(), **cache.evict())
+    worker_span.end()
     write_log(log_file, "worker", "success", "Accelerated worker finished", mode=device)
 
 
@@ -1,5 +1,5 @@
 # GPU/DML worker with JSONL logging (keeps original worker untouched)
-import os, json, time, torch, sys, platform
+import functools, os, sys
 from TTS.api import TTS
 # Allow absolute `scripts.*` imports even when executed directly
 if __package__ in (None, ""):
@@ -7,29 +7,22 @@ if __package__ in (None, ""):
     _root = str(_pathlib.Path(__file__).resolve().parents[1])
     if _root not in sys.path:
         sys.path.insert(0, _root)
+from scripts.backend import default_device
+from scripts.batching import batch_size_from_env
+from scripts.chunk_cache import ChunkCache
+from scripts.chunk_queue import iter_chunks
+from scripts.chunk_store import ChunkStore
 from scripts.log_util import JsonlLogger
+from scripts.model_snapshot import load_snapshot
+from scripts.run_manifest import RunManifest
+from scripts.voice_conditioning import VoiceSynth
+from scripts.voice_registry import resolve_voice
+from scripts.worker_loop import run_chunks
 
+@functools.lru_cache(maxsize=None)
 def device_string():
-    # 1) honor explicit choice from CLI via env
-    forced = os.environ.get('TTS_BACKEND','').lower()
-    if forced in {'rocm','cuda','dml','cpu'}:
-        return forced
-    # 2) best-effort auto-detect
-    if platform.system()=='Windows':
-        try:
-            import torch_directml as _dml  # noqa: F401
-            return 'dml'
-        except Exception:
-            pass
-    if torch.cuda.is_available():
-        # Distinguish ROCm vs CUDA for accurate logging
-        try:
-            if getattr(torch.version, 'hip', None):
-                return 'rocm'
-        except Exception:
-            pass
-        return 'cuda'
-    return 'cpu'
+    # TTS_BACKEND from the CLI, else the cached capability probe; resolved once per process
+    return default_device()
 
 def load_xtts():
     dev = device_string()
@@ -47,34 +40,38 @@ def load_xtts():
             return TTS(model_path=os.path.join(mdir,"xtts_v2.pth"), config_path=os.path.join(mdir,"config.json"), gpu=False)
         return TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", gpu=False)
     mdir = os.environ.get("TTS_MODEL_DIR")
+    model = load_snapshot(mdir, gpu=(dev!='cpu'))
+    if model is not None:
+        return model
     if mdir and os.path.exists(os.path.join(mdir,"xtts_v2.pth")) and os.path.exists(os.path.join(mdir,"config.json")):
         return TTS(model_path=os.path.join(mdir,"xtts_v2.pth"), config_path=os.path.join(mdir,"config.json"), gpu=(dev!='cpu'))
     return TTS(model_name="tts_models/multilingual/multi-dataset/xtts_v2", gpu=(dev!='cpu'))
 
 def run_worker(in_path, out_dir, voice_pt, logs: JsonlLogger):
     os.makedirs(out_dir, exist_ok=True)
-    model = load_xtts()
-    spk_embed = torch.load(voice_pt, map_location='cpu')
-    sr = getattr(getattr(model, "synthesizer", None), "output_sample_rate", 24000)
-    with open(in_path,'r',encoding='utf-8') as f:
-        for line in f:
-            item = json.loads(line)
-            t0 = time.time()
-            wav = model.tts(text=item["text"], speaker=spk_embed, language="en")
-            dur = len(wav)/sr if sr else 0.0
-            elapsed = time.time()-t0
-            rtf = elapsed/max(1e-6, dur)
-            out_wav = os.path.join(out_dir, f'{item["id"]:06d}.wav')
-            model.save_wav(wav, out_wav)
-            dev = device_string().upper()
-            print(f'{dev} chunk {item["id"]} -> {out_wav} RTF={rtf:.2f}')
-            logs.log("chunk_done", engine="gpu", device=device_string(), chunk_id=item["id"],
-                     rtf=round(rtf,3), elapsed=round(elapsed,3), seconds=round(dur,3), out=out_wav)
+    with logs.span("model-load", engine="gpu"):
+        model = load_xtts()
+        synth = VoiceSynth(model, voice_pt)
+    logs.log("voice_loaded", engine="gpu", path=voice_pt, synth=synth.mode)
+    cache = ChunkCache.from_env(voice=voice_pt, params={"writer": "save_wav"})
+    store = ChunkStore.from_env(out_dir)
+    writer = store.writer() if store else None
+    manifest = None if writer else RunManifest.for_out_dir(out_dir)
+    run_chunks(synth, model.save_wav, iter_chunks(in_path, owner=f'{device_string()}:{os.getpid()}'), out_dir, "en",
+               batch_size_from_env(), log=logs.log, span=logs.span, device=device_string(), cache=cache,
+               writer=writer, manifest=manifest, engine="gpu")
+    if cache:
+        logs.log("cache_summary", engine="gpu", **cache.stats(), **cache.evict())
 
 if __name__=='__main__':
-    in_path, out_dir, voice_pt = sys.argv[1], sys.argv[2], sys.argv[3]
+    in_path, out_dir = sys.argv[1], sys.argv[2]
+    try:
+        voice_pt = resolve_voice(sys.argv[3])
+    except KeyError as exc:
+        sys.exit(exc.args[0])
     run_dir = sys.argv[4] if len(sys.argv) > 4 else None
     logger = JsonlLogger(run_dir)
     logger.log("worker_start", engine="gpu", device=device_string(), in_path=in_path, out_dir=out_dir)
-    run_worker(in_path, out_dir, voice_pt, logger)
+    with logger.span("worker", engine="gpu"):
+        run_worker(in_path, out_dir, voice_pt, logger)
     logger.log("worker_end", engine="gpu", device=device_string())
@@ -0,0 +1,170 @@
+"""Versioned XTTS speaker conditioning and the direct inference path.
+
+``tts_embed.py`` stores the complete XTTS conditioning for a voice: the GPT
+conditioning latents plus the speaker embedding, computed once from the
+reference WAVs. The file is a ``torch.save``'d dict::
+
+    {"format": "xtts-conditioning", "version": 1,
+     "gpt_cond_latent": Tensor, "speaker_embedding": Tensor,
+     "refs": [...], "created": "..."}
+
+Workers wrap the loaded model in ``VoiceSynth``. With a conditioning file it
+calls ``Xtts.inference`` directly on the cached tensors (already on the model's
+device), skipping the ``TTS.api`` wrapper and any per-chunk conditioning work.
+Older ``.pt`` files written by ``get_speaker_embeddings`` still load and go
+through ``model.tts(speaker=...)`` as before; every chunk log line records
+which path was used (``synth``) and its latency, so the two can be compared.
+
+``save_voice`` writes the same content as ``.safetensors`` (tensors plus
+string metadata). ``load_voice`` memory-maps those files and never unpickles
+them; the voice registry (voice_registry.py) stores all voices this way.
+"""
+import json
+import os
+from datetime import datetime, timezone
+
+import numpy as np
+
+FORMAT = "xtts-conditioning"
+EMBEDDING_FORMAT = "xtts-embedding"
+VERSION = 1
+SAFE_SUFFIX = ".safetensors"
+
+
+def is_conditioning(voice):
+    return isinstance(voice, dict) and voice.get("format") == FORMAT
+
+
+def compute_conditioning(model, refs):
+    """Conditioning latents + speaker embedding for ``refs`` from a loaded TTS model."""
+    xtts = model.synthesizer.tts_model
+    cfg = xtts.config
+    gpt_cond_latent, speaker_embedding = xtts.get_conditioning_latents(
+        audio_path=list(refs),
+        max_ref_length=cfg.max_ref_len,
+        gpt_cond_len=cfg.gpt_cond_len,
+        gpt_cond_chunk_len=cfg.gpt_cond_chunk_len,
+        sound_norm_refs=cfg.sound_norm_refs,
+    )
+    return {
+        "format": FORMAT,
+        "version": VERSION,
+        "gpt_cond_latent": gpt_cond_latent.detach().cpu(),
+        "speaker_embedding": speaker_embedding.detach().cpu(),
+        "refs": [os.path.basename(r) for r in refs],
+        "created": datetime.now(timezone.utc).isoformat(),
+    }
+
+
+def save_voice(voice, path):
+    """Write a loaded voice (conditioning dict or embedding tensor) as safetensors."""
+    import torch
+    from safetensors.torch import save_file
+
+    if is_conditioning(voice):
+        tensors = {k: voice[k] for k in ("gpt_cond_latent", "speaker_embedding")}
+        meta = {"format": FORMAT, "version": str(voice.get("version", VERSION)),
+                "refs": json.dumps(voice.get("refs", [])), "created": voice.get("created", "")}
+    elif isinstance(voice, torch.Tensor):
+        tensors, meta = {"embedding": voice}, {"format": EMBEDDING_FORMAT, "version": str(VERSION)}
+    else:
+        raise ValueError(f"cannot store a {type(voice).__name__} voice as safetensors")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    save_file({k: v.detach().cpu().contiguous() for k, v in tensors.items()}, tmp, metadata=meta)
+    os.replace(tmp, path)
+
+
+def _load_safetensors(path):
+    from safetensors import safe_open
+
+    with safe_open(path, framework="pt", device="cpu") as fh:
+        meta = fh.metadata() or {}
+        tensors = {k: fh.get_tensor(k) for k in fh.keys()}
+    if meta.get("format") == EMBEDDING_FORMAT:
+        return tensors["embedding"]
+    if meta.get("format") != FORMAT:
+        raise ValueError(f"{path}: not an XTTS voice file (format {meta.get('format')!r})")
+    return {"format": FORMAT, "version": int(meta.get("version", 0)), **tensors,
+            "refs": json.loads(meta.get("refs") or "[]"), "created": meta.get("created")}
+
+
+def load_voice(path):
+    """Load a voice file: a conditioning dict, or a legacy speaker embedding.
+
+    ``.safetensors`` files are memory-mapped; anything else is a pickled
+    ``torch.save`` file from before the registry.
+    """
+    if str(path).endswith(SAFE_SUFFIX):
+        voice = _load_safetensors(path)
+    else:
+        import torch
+
+        voice = torch.load(path, map_location="cpu")
+    if is_conditioning(voice) and voice.get("version", 0) > VERSION:
+        raise ValueError(f"{path}: conditioning format v{voice['version']} is newer than supported v{VERSION}")
+    return voice
+
+
+class VoiceSynth:
+    """Synthesize chunks for one voice on one loaded model.
+
+    ``voice`` may be a path, an already-loaded voice object, or None (model
+    default speaker). ``mode`` is ``"direct"`` for conditioning files and
+    ``"tts_api"`` otherwise.
+    """
+
+    def __init__(self, model, voice=None):
+        self.model = model
+        if isinstance(voice, (str, os.PathLike)):
+            voice = load_voice(voice)
+        self.voice = voice
+        self.sample_rate = model.synthesizer.output_sample_rate
+        self.mode = "direct" if is_conditioning(voice) else "tts_api"
+        if self.mode == "direct":
+            xtts = model.synthesizer.tts_model
+            device = next(xtts.parameters()).device
+            cfg = xtts.config
+            self._xtts = xtts
+            self._latent = voice["gpt_cond_latent"].to(device)
+            self._speaker = voice["speaker_embedding"].to(device)
+            # Same sampling settings the TTS.api wrapper reads from the config.
+            self._settings = {
+                "temperature": cfg.temperature,
+                "length_penalty": cfg.length_penalty,
+                "repetition_penalty": cfg.repetition_penalty,
+                "top_k": cfg.top_k,
+                "top_p": cfg.top_p,
+                "enable_text_splitting": True,
+            }
+
+    def tts(self, text, language="en"):
+        """Render one chunk; returns mono float32 samples at ``sample_rate``."""
+        if self.mode == "direct":
+            import torch
+
+            with torch.inference_mode():
+                wav = self._xtts.inference(text, language, self._latent, self._speaker, **self._settings)["wav"]
+            if hasattr(wav, "cpu"):
+                wav = wav.cpu().numpy()
+        elif self.voice is not None:
+            wav = self.model.tts(text=text, speaker=self.voice, language=language)
+        else:
+            wav = self.model.tts(text=text, language=language)
+        return np.asarray(wav, dtype=np.float32).reshape(-1)
+
+    def stream(self, text, language="en", stream_chunk_size=20):
+        """Yield float32 blocks as XTTS decodes them (``inference_stream``).
+
+        The ``tts_api`` path cannot stream and yields the whole chunk once.
+        """
+        if self.mode != "direct":
+            yield self.tts(text, language)
+            return
+        import torch
+
+        with torch.inference_mode():
+            blocks = self._xtts.inference_stream(
+                text, language, self._latent, self._speaker, stream_chunk_size=stream_chunk_size, **self._settings
+            )
+            for wav in blocks:
+                yield wav.cpu().numpy().astype(np.float32).reshape(-1)
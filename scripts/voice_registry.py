@@ -0,0 +1,233 @@
+"""Voice registry: named voices stored as safetensors, and an LRU of loaded voices.
+
+The registry is a JSON file (``artifacts/voices/registry.json``, or
+``TTS_VOICE_REGISTRY``) mapping a voice ID to a ``.safetensors`` file kept
+next to it, together with the file's SHA-256::
+
+    python scripts/voice_registry.py add anna artifacts/models/voice.pt
+    python scripts/tts_cli.py --text book.txt --voice anna --out out/book.wav
+
+``add`` loads the source voice once (a pickled ``.pt`` from ``tts_embed.py``
+is fine) and rewrites it as safetensors. From then on the voice loads with no
+unpickling and straight from the page cache. Everywhere a voice path is
+accepted, a registered ID can be given instead (``resolve_voice``).
+
+``VoiceCache`` keeps the most recently used voices ready on one loaded model,
+keyed by content hash: a ``VoiceSynth`` with its conditioning tensors already
+on the model's device. Switching speakers between chunks or jobs then costs a
+dict lookup. The render service, batch mode and per-chunk voices in
+``pipeline.synthesize`` use it.
+"""
+import argparse
+import json
+import os
+import sys
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/voice_registry.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.chunk_cache import file_sha256
+from scripts.voice_conditioning import SAFE_SUFFIX
+
+FORMAT = "xtts-voice-registry"
+VERSION = 1
+DEFAULT_REGISTRY = os.path.join("artifacts", "voices", "registry.json")
+DEFAULT_CAPACITY = 8
+_hashes = {}
+
+
+def registry_path():
+    return os.environ.get("TTS_VOICE_REGISTRY") or DEFAULT_REGISTRY
+
+
+def _file_hash(path):
+    """SHA-256 of a voice file, memoised per path + size + mtime for this process."""
+    st = os.stat(path)
+    ident = (os.path.abspath(path), st.st_size, st.st_mtime_ns)
+    if ident not in _hashes:
+        _hashes[ident] = file_sha256(path)
+    return _hashes[ident]
+
+
+class VoiceRegistry:
+    def __init__(self, path=None):
+        self.path = path or registry_path()
+        self.root = os.path.dirname(self.path) or "."
+        try:
+            with open(self.path, "r", encoding="utf-8") as fh:
+                data = json.load(fh)
+        except FileNotFoundError:
+            data = {"format": FORMAT, "version": VERSION, "voices": {}}
+        if data.get("format") != FORMAT or data.get("version", 0) > VERSION:
+            raise ValueError(f"{self.path}: unsupported voice registry format")
+        self.voices = data["voices"]
+
+    def _save(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump({"format": FORMAT, "version": VERSION, "voices": self.voices}, fh, indent=2, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def file(self, voice_id):
+        return os.path.join(self.root, self.voices[voice_id]["file"])
+
+    def add(self, voice_id, src, force=False):
+        """Register ``src`` (any voice file) as ``voice_id``, stored as safetensors. Returns the entry."""
+        from scripts.voice_conditioning import is_conditioning, load_voice, save_voice
+
+        if not voice_id or os.sep in voice_id or voice_id.startswith("."):
+            raise ValueError(f"invalid voice ID {voice_id!r}")
+        if voice_id in self.voices and not force:
+            raise ValueError(f"voice {voice_id!r} is already registered (use --force to replace it)")
+        voice = load_voice(src)
+        os.makedirs(self.root, exist_ok=True)
+        name = voice_id + SAFE_SUFFIX
+        path = os.path.join(self.root, name)
+        save_voice(voice, path)
+        self.voices[voice_id] = {
+            "file": name,
+            "sha256": file_sha256(path),
+            "bytes": os.path.getsize(path),
+            "kind": "conditioning" if is_conditioning(voice) else "embedding",
+            "refs": voice.get("refs", []) if is_conditioning(voice) else [],
+            "source": os.path.abspath(src),
+            "added": datetime.now(timezone.utc).isoformat(),
+        }
+        self._save()
+        return self.voices[voice_id]
+
+    def remove(self, voice_id):
+        entry = self.voices.pop(voice_id)
+        self._save()
+        try:
+            os.remove(os.path.join(self.root, entry["file"]))
+        except FileNotFoundError:
+            pass
+        return entry
+
+    def verify(self):
+        """``(voice_id, ok, reason)`` per entry: the file exists and still has its registered hash."""
+        report = []
+        for voice_id, entry in sorted(self.voices.items()):
+            path = self.file(voice_id)
+            if not os.path.exists(path):
+                report.append((voice_id, False, "file missing"))
+            elif file_sha256(path) != entry["sha256"]:
+                report.append((voice_id, False, "content changed since it was registered"))
+            else:
+                report.append((voice_id, True, "ok"))
+        return report
+
+    def resolve(self, ref):
+        """``(path, sha256)`` for a voice ID or a voice file path."""
+        if os.path.exists(ref):
+            return ref, _file_hash(ref)
+        if ref in self.voices:
+            return self.file(ref), self.voices[ref]["sha256"]
+        raise KeyError(f"unknown voice {ref!r}: not a file and not registered in {self.path}")
+
+
+def resolve_voice(ref, registry=None):
+    """Path for ``ref``: existing files are returned as is, anything else is looked up as a voice ID."""
+    if not ref or os.path.exists(ref):
+        return ref
+    return (registry or VoiceRegistry()).resolve(ref)[0]
+
+
+class VoiceCache:
+    """LRU of ``VoiceSynth`` objects on one model, keyed by voice content hash.
+
+    ``capacity`` defaults to ``TTS_VOICE_CACHE`` (8). The model's default
+    speaker (``None``) is always available and does not take a slot.
+    """
+
+    def __init__(self, model, capacity=None, registry=None):
+        self.model = model
+        self.capacity = max(1, capacity or int(os.environ.get("TTS_VOICE_CACHE", DEFAULT_CAPACITY)))
+        self._registry = registry
+        self._entries = OrderedDict()
+        self._default = None
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+
+    @property
+    def registry(self):
+        if self._registry is None:
+            self._registry = VoiceRegistry()
+        return self._registry
+
+    def _resolve(self, ref):
+        return (ref, _file_hash(ref)) if os.path.exists(ref) else self.registry.resolve(ref)
+
+    def key(self, ref):
+        """Content hash of the voice ``ref`` names (None for the default speaker)."""
+        return None if ref is None else self._resolve(ref)[1]
+
+    def get(self, ref):
+        """A ready ``VoiceSynth`` for a voice ID, a voice file path, or None."""
+        from scripts.voice_conditioning import VoiceSynth, load_voice
+
+        if ref is None:
+            if self._default is None:
+                self._default = VoiceSynth(self.model, None)
+            return self._default
+        path, sha = self._resolve(ref)
+        synth = self._entries.get(sha)
+        if synth is not None:
+            self._entries.move_to_end(sha)
+            self.hits += 1
+            return synth
+        synth = VoiceSynth(self.model, load_voice(path))
+        self.loads += 1
+        self._entries[sha] = synth
+        while len(self._entries) > self.capacity:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        return synth
+
+    def stats(self):
+        return {"voices": len(self._entries), "capacity": self.capacity, "hits": self.hits, "loads": self.loads,
+                "evictions": self.evictions}
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Manage the voice registry (voice ID -> safetensors voice file).")
+    ap.add_argument("--registry", default=None, help="Registry file (default: TTS_VOICE_REGISTRY or %s)" % DEFAULT_REGISTRY)
+    sub = ap.add_subparsers(dest="command", required=True)
+    add = sub.add_parser("add", help="Register a voice file (.pt or .safetensors) under an ID")
+    add.add_argument("voice_id")
+    add.add_argument("src")
+    add.add_argument("--force", action="store_true", help="Replace an existing ID")
+    sub.add_parser("list", help="Show registered voices")
+    sub.add_parser("verify", help="Check every registered file against its hash")
+    rm = sub.add_parser("remove", help="Unregister a voice and delete its file")
+    rm.add_argument("voice_id")
+    args = ap.parse_args()
+
+    registry = VoiceRegistry(args.registry)
+    if args.command == "add":
+        entry = registry.add(args.voice_id, args.src, force=args.force)
+        print(f"{args.voice_id}: {registry.file(args.voice_id)} ({entry['kind']}, sha256 {entry['sha256'][:12]})")
+    elif args.command == "list":
+        for voice_id, entry in sorted(registry.voices.items()):
+            print(f"{voice_id:20s} {entry['kind']:12s} {entry['sha256'][:12]}  {entry['file']}")
+    elif args.command == "verify":
+        report = registry.verify()
+        for voice_id, ok, reason in report:
+            print(f"{voice_id:20s} {reason}")
+        sys.exit(0 if all(ok for _, ok, _ in report) else 1)
+    else:
+        registry.remove(args.voice_id)
+        print(f"Removed {args.voice_id}")
+
+
+if __name__ == "__main__":
+    main()
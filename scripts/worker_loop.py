@@ -0,0 +1,108 @@
+"""The chunk loop shared by every synthesis worker.
+
+All four workers (``tts_worker_{cpu,gpu}.py`` and their ``_logged``
+variants) and the bench ``synth`` stage run claimed chunk records through
+``run_chunks``. Per window of ``batch_size`` chunks it:
+
+- serves chunk-cache hits (copied to the chunk WAV, or into the chunk store)
+- decodes the rest together (batching.py)
+- writes each chunk as a WAV plus loudness sidecar, or appends it to the
+  chunk store, and adds it to the chunk cache
+- records it in the run manifest and logs it
+
+Events go to ``log(kind, **fields)``, the ``JsonlLogger.log`` signature:
+``chunk_cached``, ``batch_done`` and ``chunk_done``. ``worker_log`` adapts
+them to ``tracing.write_log`` records ("Chunk served from cache", "Batch
+rendered", "Chunk rendered").
+"""
+import contextlib
+import os
+import time
+
+from scripts.batching import iter_windows, synthesize_batch
+from scripts.loudness import write_chunk_stats
+from scripts.tracing import write_log
+
+_MESSAGES = {
+    "chunk_cached": ("success", "Chunk served from cache"),
+    "batch_done": ("info", "Batch rendered"),
+    "chunk_done": ("success", "Chunk rendered"),
+}
+
+
+def _noop_log(kind, **fields):
+    return None
+
+
+def _noop_span(name, **fields):
+    return contextlib.nullcontext()
+
+
+def worker_log(log_file):
+    """``log`` for ``run_chunks`` that writes ``tracing.write_log`` records."""
+    def log(kind, **fields):
+        status, message = _MESSAGES[kind]
+        write_log(log_file, "worker", status, message, **fields)
+
+    return log
+
+
+def run_chunks(synth, save_wav, items, out_dir, language="en", batch_size=1, log=None, span=None, device="cpu",
+               cache=None, writer=None, manifest=None, **fields):
+    """Render chunk records from ``items`` (an iterator, so queue claims stay lazy).
+
+    ``save_wav(wav, path)`` writes one chunk WAV; with a chunk-store ``writer``
+    chunks are appended to the store instead. ``span(name, **fields)`` times
+    the batch, synthesis and save steps. ``fields`` (engine, precision, ...)
+    are added to every logged event. Returns ``{"rendered", "cached", "seconds"}``.
+    """
+    log = log or _noop_log
+    span = span or _noop_span
+    label = device.upper()
+    rate = synth.sample_rate
+    totals = {"rendered": 0, "cached": 0, "seconds": 0.0}
+    for window in iter_windows(items, batch_size):
+        todo = []
+        for item in window:
+            out_wav = writer.path if writer else os.path.join(out_dir, f"{item['id']:06d}.wav")
+            key = cache.key(item["text"], language) if cache else None
+            hit = cache and (writer.add_cached(item["id"], item["text"], cache, key) if writer
+                             else cache.fetch(key, out_wav))
+            if hit:
+                print(f"{label} chunk {item['id']} -> {out_wav} (cached)")
+                log("chunk_cached", chunk_id=item["id"], path=out_wav, device=device, cached=True, **fields)
+                if manifest:
+                    manifest.record(item["id"], out_wav, item["text"], cached=True)
+                totals["cached"] += 1
+                continue
+            todo.append((item, out_wav, key))
+        if not todo:
+            continue
+        with span("chunk", chunk_ids=[item["id"] for item, _, _ in todo]):
+            start = time.time()
+            with span("synth", device=device, batch=len(todo)):
+                wavs, batches = synthesize_batch(synth, [item["text"] for item, _, _ in todo], language, batch_size)
+            elapsed = time.time() - start
+            if batch_size > 1:
+                for batch in batches:
+                    log("batch_done", device=device, synth=synth.mode, **batch, **fields)
+            rtf = elapsed / max(1e-6, sum(len(w) for w in wavs) / rate)
+            for (item, out_wav, key), wav in zip(todo, wavs):
+                with span("save", chunk_id=item["id"]):
+                    if writer:
+                        writer.add(item["id"], wav, rate, item["text"], cache, key)
+                    else:
+                        save_wav(wav, out_wav)
+                        write_chunk_stats(out_wav)
+                        if cache:
+                            cache.store(key, out_wav)
+                        if manifest:
+                            manifest.record(item["id"], out_wav, item["text"])
+                seconds = len(wav) / rate
+                print(f"{label} chunk {item['id']} -> {out_wav} RTF={rtf:.2f}")
+                log("chunk_done", chunk_id=item["id"], path=out_wav, rtf=round(rtf, 3), elapsed=round(elapsed, 3),
+                    latency_ms=round(elapsed * 1000, 1), seconds=round(seconds, 3), synth=synth.mode,
+                    batch=len(todo), text=item["text"], language=language, device=device, **fields)
+                totals["rendered"] += 1
+                totals["seconds"] += seconds
+    return totals
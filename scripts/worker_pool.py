@@ -0,0 +1,258 @@
+"""Run several synthesis worker processes over one chunks.jsonl.
+
+The CLIs split the chunk list into per-worker shard files, give every worker
+its own torch thread budget (and optionally a disjoint set of CPU cores), then
+wait for the whole pool. Workers call ``apply_thread_budget()`` right after
+importing torch so the budget takes effect before the model is loaded.
+
+Chunks are scheduled longest-predicted-first (LPT): each chunk, longest
+first, goes to the least-loaded worker, and every worker renders its share
+longest first. The joiner still assembles by chunk id.
+"""
+import heapq
+import json
+import os
+import subprocess
+import time
+
+from scripts.chunk_queue import predicted_seconds
+
+
+def available_cores():
+    """CPU ids this process may run on (respects taskset/cgroup limits)."""
+    try:
+        return sorted(os.sched_getaffinity(0))
+    except AttributeError:
+        return list(range(os.cpu_count() or 1))
+
+
+def plan_workers(requested, chunk_count, cores=None):
+    """Clamp the requested worker count to the work and cores available."""
+    cores = available_cores() if cores is None else cores
+    return max(1, min(int(requested), max(1, chunk_count), max(1, len(cores))))
+
+
+def split_cores(workers, cores=None):
+    """Partition the core list into ``workers`` contiguous, near-equal slices.
+
+    When there are fewer cores than workers, cores are shared round-robin.
+    """
+    cores = available_cores() if cores is None else list(cores)
+    if workers > len(cores):
+        return [[cores[i % len(cores)]] for i in range(workers)]
+    base, extra = divmod(len(cores), workers)
+    sets, start = [], 0
+    for i in range(workers):
+        size = base + (1 if i < extra else 0)
+        sets.append(cores[start:start + size])
+        start += size
+    return sets
+
+
+def lpt_assign(durations, workers):
+    """Longest-processing-time-first assignment of jobs to ``workers``.
+
+    Returns ``(groups, loads)``: job indices per worker (longest first) and
+    each worker's predicted total. Ties go to the lower worker index.
+    """
+    order = sorted(range(len(durations)), key=lambda i: -durations[i])
+    heap = [(0.0, w) for w in range(workers)]
+    groups = [[] for _ in range(workers)]
+    loads = [0.0] * workers
+    for i in order:
+        load, w = heapq.heappop(heap)
+        groups[w].append(i)
+        loads[w] = load + durations[i]
+        heapq.heappush(heap, (loads[w], w))
+    return groups, loads
+
+
+def predicted_loads(chunks_jsonl, workers):
+    """Predicted per-worker audio seconds if ``workers`` equal workers ran LPT."""
+    with open(chunks_jsonl, "r", encoding="utf-8") as fh:
+        durations = [predicted_seconds(json.loads(line)) for line in fh if line.strip()]
+    return [round(load, 2) for load in lpt_assign(durations, workers)[1]]
+
+
+def schedule_report(loads, elapsed):
+    """Predicted vs achieved makespan for a finished pool.
+
+    ``loads`` are predicted audio seconds per worker and ``elapsed`` the wall
+    seconds each member actually ran, so the two makespans are in different
+    units (the field names say which); only the imbalance ratios (max / mean)
+    are directly comparable.
+    """
+    busy = [l for l in loads if l > 0] or [0.0]
+    return {
+        "predicted_makespan_audio_sec": max(busy),
+        "predicted_imbalance": round(max(busy) / max(1e-6, sum(busy) / len(busy)), 3),
+        "actual_makespan_wall_sec": round(max(elapsed, default=0.0), 3),
+        "actual_imbalance": round(max(elapsed, default=0.0) / max(1e-6, sum(elapsed) / max(1, len(elapsed))), 3),
+        "actual_elapsed": [round(e, 3) for e in elapsed],
+    }
+
+
+def shard_chunks(chunks_jsonl, workers, shard_dir=None):
+    """Split chunk records into ``workers`` shard files, longest-predicted first.
+
+    Each chunk goes to the shard with the least predicted audio so far, so a
+    few long chunks cannot pile up on one worker, and each shard lists its
+    chunks longest first so no long chunk is left for the end.
+    Returns the list of shard paths that received at least one chunk.
+    """
+    shard_dir = shard_dir or os.path.dirname(chunks_jsonl) or "."
+    os.makedirs(shard_dir, exist_ok=True)
+    with open(chunks_jsonl, "r", encoding="utf-8") as fh:
+        lines = [line if line.endswith("\n") else line + "\n" for line in fh if line.strip()]
+    groups, _ = lpt_assign([predicted_seconds(json.loads(line)) for line in lines], workers)
+    shards = [[lines[i] for i in group] for group in groups]
+    paths = []
+    for i, shard in enumerate(shards):
+        if not shard:
+            continue
+        path = os.path.join(shard_dir, f"chunks.shard-{i:02d}.jsonl")
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.writelines(shard)
+        paths.append(path)
+    return paths
+
+
+def count_chunks(chunks_jsonl):
+    with open(chunks_jsonl, "r", encoding="utf-8") as fh:
+        return sum(1 for line in fh if line.strip())
+
+
+def member_env(base_env, threads, cores=None):
+    """Environment for one pool member: thread caps plus optional pinning."""
+    env = dict(base_env)
+    env["TTS_TORCH_THREADS"] = str(threads)
+    # Cap the BLAS/OpenMP pools too, otherwise each process spawns one
+    # thread per core and N workers oversubscribe the box N-fold.
+    env["OMP_NUM_THREADS"] = str(threads)
+    env["MKL_NUM_THREADS"] = str(threads)
+    if cores:
+        env["TTS_CPU_AFFINITY"] = ",".join(str(c) for c in cores)
+    else:
+        env.pop("TTS_CPU_AFFINITY", None)
+    return env
+
+
+def apply_thread_budget():
+    """Apply TTS_TORCH_THREADS / TTS_CPU_AFFINITY inside a worker process.
+
+    Returns ``(threads, cores)`` as applied; either may be None when unset.
+    """
+    cores = None
+    spec = os.environ.get("TTS_CPU_AFFINITY", "").strip()
+    if spec and hasattr(os, "sched_setaffinity"):
+        try:
+            cores = sorted({int(c) for c in spec.split(",") if c.strip()})
+            os.sched_setaffinity(0, cores)
+        except (ValueError, OSError):
+            cores = None
+    threads = None
+    raw = os.environ.get("TTS_TORCH_THREADS", "").strip()
+    if raw:
+        try:
+            threads = max(1, int(raw))
+        except ValueError:
+            threads = None
+    if threads:
+        import torch
+        torch.set_num_threads(threads)
+    return threads, cores
+
+
+def run_pool(commands, envs, fork_server=False, cleanup=()):
+    """Start every command, wait for all of them, fail if any member failed.
+
+    Returns each member's wall time in seconds, in command order. With
+    ``fork_server`` (CPU workers only) the members are forked from one process
+    that has already loaded the model, see zygote.py. The ``cleanup`` files
+    (the members' shard files) are removed once the pool is done.
+    """
+    try:
+        return _run_pool(commands, envs, fork_server)
+    finally:
+        for path in cleanup:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def _run_pool(commands, envs, fork_server):
+    if fork_server:
+        from scripts.zygote import run_pool_forked, supported
+
+        if supported():
+            return run_pool_forked(commands, envs)
+    procs = []
+    start = time.time()
+    for cmd, env in zip(commands, envs):
+        print(">", " ".join(cmd))
+        procs.append(subprocess.Popen(cmd, env=env))
+    elapsed = [None] * len(procs)
+    failed = []
+    try:
+        while None in elapsed:
+            for i, (proc, cmd) in enumerate(zip(procs, commands)):
+                if elapsed[i] is None and proc.poll() is not None:
+                    elapsed[i] = time.time() - start
+                    if proc.returncode != 0:
+                        failed.append((proc.returncode, cmd))
+            if None in elapsed:
+                time.sleep(0.2)
+    except KeyboardInterrupt:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.terminate()
+        raise
+    if failed:
+        code, cmd = failed[0]
+        raise subprocess.CalledProcessError(code, cmd)
+    return elapsed
+
+
+def plan_cpu_pool(chunks_jsonl, requested_workers, threads_per_worker=None, pin_cores=False, shard_dir=None,
+                  shared_queue=False, reserve_cores=0):
+    """Split the chunk list and compute each CPU worker's thread/core budget.
+
+    With ``shared_queue`` every worker reads the full ``chunks_jsonl`` and the
+    chunks are handed out dynamically through a ChunkQueue instead of static
+    shards. ``reserve_cores`` keeps the first N cores free for the host side
+    of accelerated workers running alongside the pool.
+
+    Returns a list of ``{"chunks", "threads", "cores", "shard"}`` dicts, one
+    per worker; ``shard`` marks a per-worker file to remove after the pool
+    (see ``shard_files``).
+    """
+    cores = available_cores()
+    if 0 < reserve_cores < len(cores):
+        cores = cores[reserve_cores:]
+    workers = plan_workers(requested_workers, count_chunks(chunks_jsonl), cores)
+    if shared_queue:
+        chunk_lists = [chunks_jsonl] * workers
+    else:
+        chunk_lists = shard_chunks(chunks_jsonl, workers, shard_dir)
+    core_sets = split_cores(len(chunk_lists), cores)
+    plan = []
+    for chunks, core_set in zip(chunk_lists, core_sets):
+        threads = threads_per_worker or len(core_set)
+        plan.append({"chunks": chunks, "threads": threads, "cores": core_set if pin_cores else None,
+                     "shard": not shared_queue})
+    return plan
+
+
+def shard_files(plan):
+    """The shard files written for a ``plan_cpu_pool`` plan (to pass as ``run_pool(cleanup=...)``)."""
+    return [p["chunks"] for p in plan if p["shard"]]
+
+
+def queue_env(base_env, claim_dir, take):
+    """Environment that makes a worker pull chunks from the shared queue."""
+    env = dict(base_env)
+    env["TTS_QUEUE_DIR"] = claim_dir
+    env["TTS_QUEUE_TAKE"] = take
+    return env
+
@@ -0,0 +1,158 @@
+"""Fork-server for CPU workers: import torch and TTS and load XTTS once, then fork.
+
+Each worker normally starts its own interpreter, imports torch and TTS, and
+loads the full model into private memory, so N workers pay for N loads and N
+copies of the weights. With ``--zygote`` the CLIs instead start one zygote
+process per pool. It loads the model (from the memory-mapped snapshot when
+there is one, see model_snapshot.py), then forks one child per worker
+command. A child swaps in that worker's environment and argv and runs the
+worker script as ``__main__``. The worker's ``load_xtts()`` returns the
+preloaded model, so start-up is a fork, and the weight pages stay shared
+copy-on-write with the zygote.
+
+With ``--precision int8`` / ``bf16`` the zygote also applies the precision
+(TTS_CPU_PRECISION) before forking, so the quantized GPT is shared as well;
+the workers' own ``apply_precision`` call then finds it already applied.
+``TTS_ZYGOTE_PRELOAD=0`` forks the workers without loading a model (they
+load their own), which keeps the pool plumbing testable without torch.
+
+The zygote runs torch single-threaded until it forks, because an OpenMP
+thread pool does not survive ``fork``. Each worker then applies its own
+TTS_TORCH_THREADS / TTS_CPU_AFFINITY as usual. CUDA cannot be initialized
+before a fork, so this is for CPU workers only. It needs ``os.fork``; on
+Windows the pool is started the usual way.
+
+    python scripts/zygote.py pool.json   # [{"cmd": [...], "env": {...}}, ...]
+
+writes ``pool.json.result`` with each member's wall time and exit code.
+"""
+import atexit
+import gc
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import time
+import traceback
+
+# Allow absolute `scripts.*` imports even when executed as "python scripts/zygote.py"
+if __package__ in (None, ""):
+    import pathlib as _pathlib
+    _root = str(_pathlib.Path(__file__).resolve().parents[1])
+    if _root not in sys.path:
+        sys.path.insert(0, _root)
+
+from scripts.tracing import span, write_log
+
+_model = None
+
+
+def preloaded_model():
+    """The model loaded by the zygote this worker was forked from, or None."""
+    return _model
+
+
+def supported():
+    return hasattr(os, "fork")
+
+
+def _run_child(spec):
+    code = 1
+    try:
+        os.environ.clear()
+        os.environ.update(spec["env"])
+        sys.argv = list(spec["cmd"][1:])
+        runpy.run_path(sys.argv[0], run_name="__main__")
+        code = 0
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else (0 if exc.code is None else 1)
+    except BaseException:
+        traceback.print_exc()
+    finally:
+        atexit._run_exitfuncs()  # flush the worker's log buffers; os._exit skips atexit
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+
+def _preload(log_file, workers):
+    global _model
+    import torch
+
+    torch.set_num_threads(1)
+    from scripts.precision import apply_precision, precision_from_env
+    from scripts.tts_worker_cpu import load_xtts
+
+    with span(log_file, "model-load", stage="zygote", workers=workers):
+        _model = load_xtts()
+        # Quantize here, not in each child, so the int8 GPT stays shared copy-on-write too.
+        precision = apply_precision(_model, precision_from_env())
+    write_log(log_file, "zygote", "info", "Model preloaded", precision=precision)
+
+
+def serve(specs, log_file=None, preload=True):
+    """Load the model, fork one child per spec, wait. Returns ``(elapsed, exit_codes)``."""
+    if preload:
+        _preload(log_file, len(specs))
+    gc.collect()
+    gc.freeze()  # keep the collector from writing to (and un-sharing) the model's object pages
+
+    start = time.time()
+    children = {}
+    for i, spec in enumerate(specs):
+        print(">", " ".join(spec["cmd"]), "(forked)")
+        sys.stdout.flush()
+        pid = os.fork()
+        if pid == 0:
+            _run_child(spec)
+        children[pid] = i
+    elapsed, codes = [None] * len(specs), [None] * len(specs)
+    while children:
+        pid, status = os.wait()
+        i = children.pop(pid, None)
+        if i is not None:
+            elapsed[i] = time.time() - start
+            codes[i] = os.waitstatus_to_exitcode(status)
+    return elapsed, codes
+
+
+def run_pool_forked(commands, envs):
+    """Drop-in for ``worker_pool.run_pool`` that forks the members from one zygote."""
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as fh:
+        json.dump([{"cmd": cmd, "env": dict(env)} for cmd, env in zip(commands, envs)], fh)
+        spec_path = fh.name
+    result_path = spec_path + ".result"
+    try:
+        subprocess.check_call([sys.executable, os.path.abspath(__file__), spec_path], env=dict(envs[0]))
+        with open(result_path, "r", encoding="utf-8") as fh:
+            result = json.load(fh)
+    finally:
+        for path in (spec_path, result_path):
+            if os.path.exists(path):
+                os.remove(path)
+    for code, cmd in zip(result["codes"], commands):
+        if code != 0:
+            raise subprocess.CalledProcessError(code, cmd)
+    return result["elapsed"]
+
+
+def main():
+    spec_path = sys.argv[1]
+    with open(spec_path, "r", encoding="utf-8") as fh:
+        specs = json.load(fh)
+    log_file = os.environ.get("TTS_LOG_FILE")
+    write_log(log_file, "zygote", "start", "Zygote starting", workers=len(specs), pid=os.getpid())
+    elapsed, codes = serve(specs, log_file, preload=os.environ.get("TTS_ZYGOTE_PRELOAD", "1") != "0")
+    write_log(log_file, "zygote", "success", "Zygote pool finished", elapsed=[round(e, 3) for e in elapsed],
+              codes=codes)
+    with open(spec_path + ".result", "w", encoding="utf-8") as fh:
+        json.dump({"elapsed": elapsed, "codes": codes}, fh)
+
+
+if __name__ == "__main__":
+    # Serve from the importable module so forked workers find the model in scripts.zygote.
+    from scripts.zygote import main as _main
+
+    _main()
@@ -0,0 +1,62 @@
+from argparse import Namespace
+
+from scripts.autotune import apply_profile, calibration_chunks, pick_best, plan_render, profile_for
+
+PROFILE = {
+    "cpu_workers": 4,
+    "threads_per_worker": 2,
+    "chunk_sec": 15,
+    "worker_rtf": 2.0,
+    "load_sec": 10.0,
+    "trials": [
+        {"workers": 2, "threads": 4, "chunk_sec": 15, "worker_rtf": 1.5, "load_sec": 8.0, "throughput": 1.3,
+         "peak_rss_mb": 3000.0},
+        {"workers": 4, "threads": 2, "chunk_sec": 15, "worker_rtf": 2.0, "load_sec": 10.0, "throughput": 2.0,
+         "peak_rss_mb": 3000.0},
+    ],
+}
+
+
+def test_profile_fills_only_unset_settings():
+    args = Namespace(cpu_workers=None, threads_per_worker=None, chunk_sec=None)
+    assert apply_profile(args, PROFILE) == ["cpu_workers", "threads_per_worker", "chunk_sec"]
+    assert (args.cpu_workers, args.threads_per_worker, args.chunk_sec) == (4, 2, 15)
+
+    args = Namespace(cpu_workers=3, threads_per_worker=None, chunk_sec=None)
+    assert apply_profile(args, PROFILE) == ["chunk_sec"]
+    assert (args.cpu_workers, args.threads_per_worker, args.chunk_sec) == (3, None, 15)
+
+    args = Namespace(cpu_workers=None, threads_per_worker=None, chunk_sec=30)
+    assert apply_profile(args, None) == []
+    assert (args.cpu_workers, args.threads_per_worker, args.chunk_sec) == (6, None, 30)
+
+
+def test_pick_best_respects_memory_budget():
+    assert pick_best(PROFILE["trials"])["workers"] == 4
+    assert pick_best(PROFILE["trials"], mem_budget_mb=8000)["workers"] == 2
+
+
+def test_plan_render_uses_matching_trial(monkeypatch):
+    monkeypatch.setattr("scripts.worker_pool.available_cores", lambda: list(range(8)))
+    text = "A short sentence for planning. " * 40
+    chunks = calibration_chunks(text, 15, 60.0)
+    assert sum(c["predicted"] for c in chunks) >= 60.0 and chunks[-1]["id"] == len(chunks) - 1
+
+    plan = plan_render(text, PROFILE, 2, 15)
+    assert plan["workers"] == 2 and plan["rtf_from"] == "trial" and plan["worker_rtf"] == 1.5
+    assert plan["predicted_wall_sec"] == round(8.0 + plan["makespan_audio_sec"] * 1.5, 1)
+    assert plan_render(text, PROFILE, 3, 15)["rtf_from"] == "profile"
+
+
+def test_profile_only_fits_cpu_pool_at_its_precision():
+    profile = dict(PROFILE, precision="int8")
+    assert profile_for(profile, "int8") == (profile, None)
+    assert profile_for(PROFILE, "fp32") == (PROFILE, None)  # profiles without a precision are fp32
+    assert profile_for(None, "fp32") == (None, None)
+    assert profile_for(profile, "int8", cpu_pool=False)[0] is None
+    skipped, reason = profile_for(profile, "fp32")
+    assert skipped is None and "int8" in reason
+
+    args = Namespace(cpu_workers=None, threads_per_worker=None, chunk_sec=None)
+    assert apply_profile(args, skipped) == []
+    assert (args.cpu_workers, args.chunk_sec) == (6, 20)
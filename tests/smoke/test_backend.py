@@ -0,0 +1,24 @@
+import json
+
+from scripts.backend import cache_key, capabilities, pick_backend
+
+
+def test_capabilities_are_cached_per_model_state(tmp_path):
+    model_dir, cache = tmp_path / "model", tmp_path / "backend.json"
+    model_dir.mkdir()
+    (model_dir / "config.json").write_text("{}")
+    key = cache_key(str(model_dir))
+    caps = capabilities(str(model_dir), str(cache))
+    assert list(json.loads(cache.read_text())) == [key]
+    assert caps["model"]["valid"] is False
+
+    (model_dir / "xtts_v2.pth").write_bytes(b"weights")
+    assert cache_key(str(model_dir)) != key
+    assert capabilities(str(model_dir), str(cache))["model"]["valid"] is True
+    assert len(json.loads(cache.read_text())) == 2
+
+
+def test_cpu_only_order_skips_the_probe(tmp_path, monkeypatch):
+    monkeypatch.setenv("TTS_BACKEND_CACHE", str(tmp_path / "backend.json"))
+    assert pick_backend("cpu") == "cpu"
+    assert not (tmp_path / "backend.json").exists()
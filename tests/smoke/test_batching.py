@@ -0,0 +1,15 @@
+from scripts.batching import iter_windows, length_buckets
+
+
+def test_length_buckets_respect_size_and_padding():
+    lengths = [40, 12, 41, 10, 90, 11, 43]
+    batches = length_buckets(lengths, batch_size=2, max_pad=8)
+    assert sorted(i for b in batches for i in b) == list(range(len(lengths)))
+    for b in batches:
+        assert len(b) <= 2
+        assert max(lengths[i] for i in b) - min(lengths[i] for i in b) <= 8
+    assert [4] in batches  # the outlier is decoded on its own
+
+
+def test_iter_windows_groups_lazily():
+    assert list(iter_windows(iter(range(5)), 2)) == [[0, 1], [2, 3], [4]]
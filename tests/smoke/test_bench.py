@@ -0,0 +1,50 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from scripts.bench import StandInModel, compare, run_stage
+
+
+def test_stand_in_model_is_deterministic():
+    model = StandInModel()
+    a = model.tts("The quick brown fox.")
+    assert len(a) and (a == model.tts("The quick brown fox.")).all()
+    assert len(model.tts("A much longer sentence than the first one, with a pause.")) > len(a)
+
+
+def test_stages_and_regression_check(tmp_path):
+    work = str(tmp_path)
+    chunk = run_stage("chunk", work, 12, 2, 1)
+    synth = run_stage("synth", work, 12, 2, 1)
+    join = run_stage("join", work, 12, 2, 1)
+    assert chunk["items"] == synth["items"] == join["items"] >= 10
+    assert abs(join["audio_sec"] - synth["audio_sec"]) < 1.0
+    assert len((tmp_path / "chunks" / "manifest.jsonl").read_text().splitlines()) == synth["items"]
+
+    old = {"stages": {"synth": {"elapsed": 1.0, "peak_rss_mb": 100.0}}}
+    cur = {"stages": {"synth": {"elapsed": 1.5, "peak_rss_mb": 101.0}}}
+    assert compare(cur, old, 0.25) == [{"stage": "synth", "metric": "elapsed", "baseline": 1.0, "current": 1.5}]
+    assert json.dumps(compare(cur, old, 1.0)) == "[]"
+
+
+def test_light_commands_do_not_import_torch(tmp_path):
+    from scripts.bench import _ROOT, startup_commands, startup_times
+
+    times = startup_times(str(tmp_path), reps=1)
+    assert set(times) == {"cli_help", "chunk", "plan", "backend_cold", "backend_warm"}
+    assert (tmp_path / "backend.json").exists()
+
+    # A torch that refuses to load: the light commands must still succeed.
+    stub = tmp_path / "stub" / "torch"
+    stub.mkdir(parents=True)
+    (stub / "__init__.py").write_text("raise SystemExit('torch was imported')\n", encoding="utf-8")
+    commands, cache = startup_commands(str(tmp_path / "light"))
+    env = dict(os.environ, PYTHONPATH=os.pathsep.join([str(stub.parent), _ROOT]), TTS_BACKEND_CACHE=cache)
+    for name in ("cli_help", "chunk", "plan"):
+        proc = subprocess.run([sys.executable] + commands[name], env=env, cwd=_ROOT, capture_output=True, text=True)
+        assert proc.returncode == 0, (name, proc.stderr)
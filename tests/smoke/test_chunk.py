@@ -5,3 +5,18 @@ def test_chunk_text_basic():
     chunks = chunk_text(text, max_sec=5)
     assert chunks, "Chunking should produce at least one chunk"
     assert all(isinstance(item, str) for item in chunks)
+
+
+def test_duration_model_balances_chunks_and_splits_run_ons():
+    from scripts.duration_model import fit
+    from scripts.tts_chunk import plan_chunks
+
+    samples = [("x" * n + ".", "en", n / 10.0) for n in range(20, 80)]
+    model = fit(samples, min_samples=20)
+    assert abs(model.predict("x" * 50 + ".", "en") - 5.0) < 0.2
+
+    run_on = ", ".join(["a clause that keeps going"] * 40) + "."
+    chunks = plan_chunks(run_on + " Short tail.", max_sec=20, model=model)
+    predicted = [c["predicted"] for c in chunks]
+    assert len(chunks) > 1 and max(predicted) <= 20
+    assert min(predicted) > 0.5 * max(predicted)
@@ -0,0 +1,29 @@
+import os
+
+from scripts.chunk_cache import ChunkCache
+
+
+def test_cache_roundtrip_and_lru_eviction(tmp_path, monkeypatch):
+    monkeypatch.delenv("TTS_MODEL_DIR", raising=False)
+    voice = tmp_path / "voice.pt"
+    voice.write_bytes(b"embedding")
+    cache = ChunkCache(str(tmp_path / "cache"), max_bytes=250, voice=str(voice))
+    assert cache.key("Hello.", "en") != cache.key("Hello!", "en")
+    assert cache.key("Hello.", "en") != cache.key("Hello.", "de")
+
+    keys = []
+    for i in range(3):
+        src = tmp_path / f"{i}.wav"
+        src.write_bytes(bytes(100))
+        key = cache.key(f"line {i}", "en")
+        cache.store(key, str(src))
+        os.utime(cache.lookup(key), (i, i))
+        keys.append(key)
+    dest = tmp_path / "out.wav"
+    assert cache.fetch(keys[0], str(dest)) and dest.stat().st_size == 100
+    assert not cache.fetch(cache.key("never rendered", "en"), str(dest))
+
+    # keys[0] was just used, so keys[1] is the least recently used entry.
+    assert cache.evict()["evicted"] == 1
+    assert cache.lookup(keys[1]) is None
+    assert cache.lookup(keys[0]) and cache.lookup(keys[2])
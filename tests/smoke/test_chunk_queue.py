@@ -0,0 +1,15 @@
+from scripts.chunk_queue import ChunkQueue, tally_claims, unfinished_claims
+
+
+def test_head_and_tail_workers_split_the_queue(tmp_path):
+    items = [{"id": i} for i in range(6)]
+    gpu = ChunkQueue(str(tmp_path), "cuda:1", take="head").iter_claimed(items)
+    cpu = ChunkQueue(str(tmp_path), "cpu:2", take="tail").iter_claimed(items)
+    fast = [next(gpu)["id"] for _ in range(4)]
+    slow = [item["id"] for item in cpu]
+    assert fast == [0, 1, 2, 3]
+    assert slow == [5, 4]
+    assert list(gpu) == []
+    assert tally_claims(str(tmp_path)) == {"cuda:1": 4, "cpu:2": 2}
+    # Chunk 1 was claimed by the GPU worker but never finished (e.g. it crashed).
+    assert unfinished_claims(str(tmp_path), {0, 2, 3, 4, 5}) == {"cuda:1": [1]}
@@ -0,0 +1,71 @@
+import json
+import os
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+
+def test_store_joins_like_exported_wavs_and_resume_checks_it(tmp_path):
+    from scripts.audio_io import read_wav
+    from scripts.chunk_store import ChunkStore, StoreWriter
+    from scripts.run_manifest import plan_resume
+    from scripts.tts_join import crossfade_concat
+
+    store = ChunkStore(str(tmp_path / "store"))
+    writers = [StoreWriter(store.root, "w1"), StoreWriter(store.root, "w2")]
+    rng = np.random.default_rng(0)
+    items = [{"id": i, "text": f"line {i}"} for i in range(4)]
+    for it in items:  # interleaved across two worker segments
+        wav = 0.2 * rng.standard_normal(8000 + 1000 * it["id"])
+        writers[it["id"] % 2].add(it["id"], wav, 16000, it["text"])
+    writers[0].add(0, np.zeros(100), 16000, "line 0")  # re-rendered: the latest record wins
+
+    assert store.ids() == [0, 1, 2, 3]
+    samples, rate = store.read(0)
+    assert isinstance(samples, np.memmap) and len(samples) == 100 and rate == 16000
+
+    wavs = store.export(str(tmp_path / "wavs"))
+    a = crossfade_concat(store.ids(), str(tmp_path / "a.wav"), 48000, store=store)
+    b = crossfade_concat(wavs, str(tmp_path / "b.wav"), 48000)
+    assert a["gain_db"] == pytest.approx(b["gain_db"])
+    ja, jb = read_wav(str(tmp_path / "a.wav"))[0], read_wav(str(tmp_path / "b.wav"))[0]
+    assert len(ja) == len(jb) and np.max(np.abs(ja - jb)) < 1e-3
+
+    chunks = tmp_path / "chunks.jsonl"
+    chunks.write_text("".join(json.dumps(it) + "\n" for it in items + [{"id": 4, "text": "new"}]), encoding="utf-8")
+    rec = store.load()[3]
+    with open(tmp_path / "store" / rec["segment"], "r+b") as fh:
+        fh.seek(rec["offset"])
+        fh.write(b"\x7f" * 8)
+    store = ChunkStore(store.root)
+    counts = plan_resume(str(chunks), store, str(tmp_path / "todo.jsonl"), check=store.verify)
+    assert counts == {"total": 5, "done": 3, "missing": 1, "invalid": 1}
+
+
+def test_add_cached_counts_an_evicted_entry_as_a_miss(tmp_path, monkeypatch):
+    from scripts.chunk_cache import ChunkCache
+    from scripts.chunk_store import ChunkStore, StoreWriter
+    from scripts.pipeline import cache_store
+
+    monkeypatch.delenv("TTS_MODEL_DIR", raising=False)
+    cache = ChunkCache(str(tmp_path / "cache"))
+    keys = [cache.key(f"line {i}", "en") for i in range(2)]
+    for key in keys:
+        cache_store(cache, key, np.full(800, 0.1, dtype=np.float32), 16000)
+    writer = StoreWriter(str(tmp_path / "store"), "w1")
+    assert writer.add_cached(0, "line 0", cache, keys[0])
+    assert (cache.hits, cache.misses) == (1, 0)
+
+    lookup = cache.lookup
+
+    def evicting_lookup(key):  # another process evicts the entry right after our lookup
+        entry = lookup(key)
+        os.remove(entry)
+        return entry
+
+    monkeypatch.setattr(cache, "lookup", evicting_lookup)
+    assert not writer.add_cached(1, "line 1", cache, keys[1])
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert ChunkStore(str(tmp_path / "store")).ids() == [0]
@@ -0,0 +1,46 @@
+import shutil
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.audio_io import audio_frames, read_wav
+from scripts.encoders import AudioOutputs, chapter_marks, parse_targets
+from scripts.pipeline import crossfade_arrays, join
+
+
+def test_parse_targets_names_outputs_after_out():
+    targets = parse_targets(["opus:48k", "mp3:128k", "mp3:64k", "flac=masters/book.flac"], "out/render.wav")
+    assert [(t["format"], t["bitrate"], t["path"]) for t in targets] == [
+        ("opus", "48k", "out/render.opus"),
+        ("mp3", "128k", "out/render.128k.mp3"),
+        ("mp3", "64k", "out/render.64k.mp3"),
+        ("flac", None, "masters/book.flac"),
+    ]
+    for bad in (["aac"], ["flac:320k"], ["mp3", "mp3"]):
+        with pytest.raises(ValueError):
+            parse_targets(bad, "out/render.wav")
+
+
+def test_chapters_follow_crossfaded_chunk_boundaries():
+    lengths = [1000, 400, 2500]
+    joined = crossfade_arrays([np.ones(n) for n in lengths], sample_rate=1000, crossfade_ms=10)
+    chapters = chapter_marks(lengths, fade=10, titles=["a", "b", "c"])
+    assert [(c["start"], c["end"]) for c in chapters] == [(0, 990), (990, 1380), (1380, len(joined))]
+
+
+@pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg not installed")
+def test_join_encodes_every_target_in_one_pass(tmp_path):
+    tone = [0.1 * np.sin(np.arange(24000 * k) / 7.0).astype(np.float32) for k in (1, 2)]
+    targets = parse_targets(["opus:32k", "mp3:64k", "flac"], str(tmp_path / "render.wav"))
+    seconds, _ = join(tone, 24000, str(tmp_path / "render.wav"), sr=48000, encode=targets, titles=["one", "two"])
+    assert abs(seconds - 3.0) < 0.05
+    frames, rate = audio_frames(tmp_path / "render.wav")
+    assert (tmp_path / "render.opus").stat().st_size > 0 and (tmp_path / "render.mp3").stat().st_size > 0
+    assert len(read_wav(tmp_path / "render.flac")[0]) == frames and rate == 48000
+
+
+def test_outputs_without_wav_or_targets_only_count_frames():
+    with AudioOutputs(None, 48000) as out:
+        out.write(np.zeros(480, dtype=np.float32))
+    assert out.frames == 480
@@ -0,0 +1,43 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.audio_io import WavWriter, read_wav
+from scripts.tts_join import stream_join
+
+
+def test_stream_join_resamples_and_crossfades(tmp_path):
+    files = []
+    for i in range(3):
+        path = tmp_path / f"{i:06d}.wav"
+        with WavWriter(str(path), 24000) as w:
+            w.write(np.full(24000, 0.25, dtype=np.float32))
+        files.append(str(path))
+    seconds = stream_join(files, str(tmp_path / "joined.wav"), sr=48000, crossfade_ms=10)
+    samples, rate = read_wav(str(tmp_path / "joined.wav"))
+    assert rate == 48000
+    assert len(samples) == 3 * 48000 - 2 * 480
+    assert seconds == pytest.approx(len(samples) / 48000)
+    assert np.allclose(samples[1000:-1000], 0.25, atol=1e-3)
+
+
+def test_native_loudnorm_hits_target(tmp_path):
+    pytest.importorskip("scipy")
+    from scripts.loudness import chunk_stats, integrated_loudness, sidecar_path
+    from scripts.tts_join import crossfade_concat
+
+    t = np.arange(24000 * 2) / 24000
+    files = []
+    for i, amp in enumerate((0.05, 0.1, 0.05)):
+        path = tmp_path / f"{i:06d}.wav"
+        with WavWriter(str(path), 24000) as w:
+            w.write((amp * np.sin(2 * np.pi * 440 * t)).astype(np.float32))
+        files.append(str(path))
+    out = tmp_path / "render.wav"
+    report = crossfade_concat(files, str(out), sr=48000, crossfade_ms=8)
+    assert all((tmp_path / f"{i:06d}.loudness.json").exists() for i in range(3))
+    assert sidecar_path(files[0]).endswith("000000.loudness.json")
+    samples, rate = read_wav(str(out))
+    assert integrated_loudness([chunk_stats(samples, rate)]) == pytest.approx(report["output_i"], abs=0.3)
+    assert report["output_i"] == pytest.approx(-16.0, abs=0.05)
+    assert not (tmp_path / "render_pre.wav").exists()
@@ -0,0 +1,19 @@
+import json
+import os
+
+from scripts.model_snapshot import CHECKPOINT, FORMAT, SNAPSHOT, SNAPSHOT_META, snapshot_status
+
+
+def test_snapshot_status_tracks_checkpoint(tmp_path):
+    assert snapshot_status(str(tmp_path)) == (False, "no snapshot")
+    (tmp_path / "config.json").write_text("{}")
+    (tmp_path / CHECKPOINT).write_bytes(b"weights")
+    (tmp_path / SNAPSHOT).write_bytes(b"snapshot")
+    st = os.stat(tmp_path / CHECKPOINT)
+    meta = {"format": FORMAT, "version": 1, "source_size": st.st_size, "source_mtime": int(st.st_mtime)}
+    (tmp_path / SNAPSHOT_META).write_text(json.dumps(meta))
+    assert snapshot_status(str(tmp_path)) == (True, "ok")
+
+    (tmp_path / CHECKPOINT).write_bytes(b"new weights")
+    usable, reason = snapshot_status(str(tmp_path))
+    assert not usable and "changed" in reason
@@ -0,0 +1,18 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.pipeline import chunk_stage, crossfade_arrays
+
+
+def test_chunk_stage_matches_chunks_jsonl_records():
+    items = chunk_stage("One. Two. Three.", chunk_sec=20)
+    assert [(i["id"], i["text"]) for i in items] == [(0, "One. Two. Three.")]
+    assert items[0]["predicted"] > 0
+
+
+def test_crossfade_arrays_overlaps_neighbours():
+    out = crossfade_arrays([np.ones(100), np.full(100, 2.0)], sample_rate=1000, crossfade_ms=10)
+    assert len(out) == 190
+    assert out[0] == 1.0 and out[-1] == 2.0
+    assert np.all(np.diff(out[90:100]) > 0)
@@ -0,0 +1,20 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.precision import cache_params, mel_distance
+
+
+def test_mel_distance_orders_similarity():
+    sr = 24000
+    t = np.arange(2 * sr) / sr
+    tone = np.sin(2 * np.pi * 220 * t) * (1 + 0.5 * np.sin(2 * np.pi * 3 * t))
+    stretched = np.interp(np.arange(int(len(tone) * 1.1)) / 1.1, np.arange(len(tone)), tone)
+    noise = np.random.default_rng(0).normal(size=len(tone)) * 0.3
+    assert mel_distance(tone, tone, sr) < 1e-3
+    assert mel_distance(tone, stretched, sr) < 3.0 < mel_distance(tone, noise, sr)
+
+
+def test_cache_params_keep_fp32_keys():
+    assert cache_params("fp32", writer="save_wav") == {"writer": "save_wav"}
+    assert cache_params("int8", writer="save_wav") == {"writer": "save_wav", "precision": "int8"}
@@ -0,0 +1,39 @@
+import json
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from scripts.render_report import RenderLog, diff_runs, report
+
+
+def _write(path, records):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+
+def test_report_reads_both_schemas_and_compacts(tmp_path):
+    run_log = tmp_path / "run.jsonl"
+    records = []
+    for n, rtf in enumerate((0.5, 0.25)):
+        records.append({"stage": "cli", "status": "start", "message": "XTTS CLI invoked"})
+        records += [{"stage": "worker", "status": "success", "message": "Chunk rendered", "chunk_id": i,
+                     "rtf": rtf, "seconds": 10.0, "device": "cuda"} for i in range(4)]
+        records.append({"stage": "join", "status": "span", "message": "join", "span": "join", "dur": 2.0 - n})
+    _write(run_log, records)
+    render_log = tmp_path / "runs" / "20260101-000000" / "logs" / "render.jsonl"
+    _write(render_log, [{"kind": "pipeline_start"},
+                        {"kind": "chunk_done", "engine": "cpu", "chunk_id": 7, "rtf": 2.0, "seconds": 5.0},
+                        {"kind": "chunk_cached", "engine": "cpu", "chunk_id": 8}])
+
+    log = RenderLog.from_paths([str(run_log), str(tmp_path / "runs")])
+    rep = report(log, top=1)
+    assert list(rep["runs"]) == ["run", "run#2", "20260101-000000"]
+    assert rep["devices"]["cuda"]["throughput"] == round(80.0 / 30.0, 2)
+    assert rep["devices"]["cpu"]["cached"] == 1
+    assert rep["slowest"][0]["chunk_id"] == 7
+    assert rep["spans"]["join"]["total_sec"] == 3.0
+    assert diff_runs(rep["runs"]["run"], rep["runs"]["run#2"])["throughput"] == 2.0
+
+    log.save(str(tmp_path / "summary.npz"))
+    assert report(RenderLog.from_paths([str(tmp_path / "summary.npz")]), top=1) == rep
@@ -0,0 +1,34 @@
+import json
+import wave
+
+from scripts.run_manifest import RunManifest, plan_resume
+
+
+def _wav(path, frames):
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(8000)
+        w.writeframes(bytes(2 * frames))
+
+
+def test_plan_resume_skips_only_verified_chunks(tmp_path):
+    chunks = tmp_path / "chunks.jsonl"
+    items = [{"id": i, "text": f"line {i}"} for i in range(4)]
+    chunks.write_text("".join(json.dumps(it) + "\n" for it in items), encoding="utf-8")
+    manifest = RunManifest(str(tmp_path / "manifest.jsonl"))
+    for it in items[:3]:
+        wav = tmp_path / f"{it['id']:06d}.wav"
+        _wav(wav, 800)
+        assert manifest.record(it["id"], str(wav), it["text"])["seconds"] == 0.1
+
+    # Chunk 1 is truncated by a crash, chunk 2's text was edited since.
+    wav1 = tmp_path / "000001.wav"
+    wav1.write_bytes(wav1.read_bytes()[:500])
+    items[2]["text"] = "edited line"
+    chunks.write_text("".join(json.dumps(it) + "\n" for it in items), encoding="utf-8")
+
+    todo = tmp_path / "todo.jsonl"
+    counts = plan_resume(str(chunks), manifest, str(todo))
+    assert counts == {"total": 4, "done": 1, "missing": 1, "invalid": 2}
+    assert [json.loads(l)["id"] for l in todo.read_text().splitlines()] == [1, 2, 3]
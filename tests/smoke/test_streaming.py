@@ -0,0 +1,32 @@
+import queue
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.streaming import SegmentWriter, _drain, _stage
+
+
+def test_stage_propagates_results_and_errors():
+    q = queue.Queue(maxsize=1)
+    _stage(lambda: iter(range(5)), q)
+    assert list(_drain(q)) == [0, 1, 2, 3, 4]
+
+    def broken():
+        yield 1
+        raise RuntimeError("synth failed")
+
+    q = queue.Queue(maxsize=1)
+    _stage(broken, q)
+    with pytest.raises(RuntimeError):
+        list(_drain(q))
+
+
+def test_segment_playlist_grows_with_segments(tmp_path):
+    seg = SegmentWriter(str(tmp_path), 1000, target_sec=4)
+    seg.write(np.zeros(1500, dtype=np.float32))
+    assert "#EXTINF:1.500,\nseg_00000.wav" in (tmp_path / "playlist.m3u8").read_text()
+    seg.write(np.zeros(0, dtype=np.float32))
+    seg.close()
+    text = (tmp_path / "playlist.m3u8").read_text()
+    assert text.count("#EXTINF") == 1 and text.endswith("#EXT-X-ENDLIST\n")
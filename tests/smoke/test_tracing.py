@@ -0,0 +1,67 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from scripts import tracing
+from scripts.tracing import chrome_trace, load_records, span, write_log
+
+
+def test_spans_nest_and_export(tmp_path):
+    log = str(tmp_path / "run.jsonl")
+    with span(log, "pipeline", stage="cli"):
+        with span(log, "model-load", stage="worker", device="cpu"):
+            pass
+        write_log(log, "worker", "success", "Chunk rendered", chunk_id=0)
+    tracing.flush()
+    records = load_records([log])
+    spans = {r["span"]: r for r in records if r.get("status") == "span"}
+    assert spans["model-load"]["parent_id"] == spans["pipeline"]["span_id"]
+    assert spans["pipeline"]["dur"] >= spans["model-load"]["dur"]
+
+    events = chrome_trace(records)["traceEvents"]
+    slices = [e for e in events if e["ph"] == "X"]
+    assert {e["name"] for e in slices} == {"pipeline", "model-load"}
+    assert any(e["ph"] == "i" and e["name"] == "Chunk rendered" for e in events)
+
+
+def test_processes_share_one_log(tmp_path):
+    log = str(tmp_path / "run.jsonl")
+    code = (
+        "import sys; from scripts.tracing import write_log\n"
+        "for i in range(500): write_log(sys.argv[1], 'worker', 'info', 'x' * 200, i=i)\n"
+    )
+    env = {**os.environ, "TTS_LOG_BUFFER": "7", "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))}
+    procs = [subprocess.Popen([sys.executable, "-c", code, log], env=env)
+             for _ in range(4)]
+    assert all(p.wait() == 0 for p in procs)
+    lines = open(log, encoding="utf-8").read().splitlines()
+    assert len(lines) == 2000
+    assert all(json.loads(line)["message"] == "x" * 200 for line in lines)
+
+
+def test_sigterm_flushes_buffered_lines(tmp_path):
+    if not hasattr(signal, "SIGTERM") or os.name == "nt":
+        pytest.skip("POSIX signals only")
+    log = tmp_path / "run.jsonl"
+    ready = tmp_path / "ready"
+    code = (
+        "import sys, time; from scripts.tracing import write_log\n"
+        "write_log(sys.argv[1], 'worker', 'info', 'buffered')\n"
+        "open(sys.argv[2], 'w').close()\n"
+        "time.sleep(60)\n"
+    )
+    env = {**os.environ, "TTS_LOG_FLUSH_SEC": "600", "PYTHONPATH": os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))}
+    proc = subprocess.Popen([sys.executable, "-c", code, str(log), str(ready)], env=env)
+    deadline = time.time() + 30
+    while not ready.exists() and time.time() < deadline:
+        time.sleep(0.05)
+    proc.terminate()
+    assert proc.wait(timeout=30) != 0
+    assert [json.loads(line)["message"] for line in log.read_text().splitlines()] == ["buffered"]
@@ -0,0 +1,53 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts.audio_io import read_wav
+from scripts.bench import StandInModel, synthetic_text
+from scripts.tts_batch import read_manifest, render_manifest
+
+
+def test_render_manifest_writes_dedupes_and_joins(tmp_path):
+    rows = [
+        {"id": "a", "text": "Press one for sales.", "out": "a.wav"},
+        {"id": "b", "text": "Press  one for sales.", "out": "sub/b.wav"},
+        {"id": "long", "text": synthetic_text(3, 5), "out": "long.wav"},
+        {"text": "no output path"},
+    ]
+    manifest = tmp_path / "prompts.jsonl"
+    manifest.write_text("\n".join(json.dumps(r) for r in rows) + "\n", encoding="utf-8")
+    items = read_manifest(str(manifest), out_dir=str(tmp_path))
+    results = []
+    render_manifest(StandInModel(), items, results.append, sr=24000, chunk_sec=5, batch_size=1)
+
+    by_index = {r["index"]: r for r in results}
+    assert by_index[0]["status"] == "ok" and by_index[0]["chunks"] == 1
+    assert by_index[1]["status"] == "dedup" and by_index[1]["dedup_of"] == 0
+    assert (tmp_path / "sub" / "b.wav").read_bytes() == (tmp_path / "a.wav").read_bytes()
+    assert by_index[2]["status"] == "ok" and by_index[2]["chunks"] > 1
+    assert by_index[2]["seconds"] > 0 and by_index[2]["synth_sec"] > 0
+    assert by_index[3]["status"] == "error"
+
+    # A single-chunk item is the raw model output, resampled only.
+    samples, rate = read_wav(str(tmp_path / "a.wav"))
+    expected = StandInModel().tts("Press one for sales.")
+    assert rate == 24000 and len(samples) == len(expected)
+
+
+def test_failed_group_keeps_results_already_written(tmp_path, monkeypatch):
+    class Flaky(StandInModel):
+        def tts(self, text, speaker=None, language="en"):
+            if text.startswith("Boom"):
+                raise RuntimeError("decoder blew up")
+            return super().tts(text, speaker, language)
+
+    monkeypatch.setattr("scripts.tts_batch.WINDOW", 1)
+    items = [{"index": 0, "id": "a", "text": "Fine words.", "out": str(tmp_path / "a.wav")},
+             {"index": 1, "id": "b", "text": "Boom words.", "out": str(tmp_path / "b.wav")}]
+    for item in items:
+        item.update(voice=None, language="en")
+    results = []
+    render_manifest(Flaky(), items, results.append, sr=24000, chunk_sec=5, batch_size=1)
+    assert [(r["index"], r["status"]) for r in results] == [(0, "ok"), (1, "error")]
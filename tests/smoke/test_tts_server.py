@@ -0,0 +1,50 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from scripts import tts_server
+from scripts.audio_io import read_wav
+from scripts.bench import StandInModel
+from scripts.tts_client import server_alive, submit_render
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("TTS_CACHE", "0")
+    monkeypatch.setattr(tts_server, "load_model", lambda device: StandInModel())
+    service = tts_server.RenderService("cpu")
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), tts_server.make_handler(service))
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", service
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_submit_render_round_trip(server, tmp_path):
+    url, service = server
+    assert server_alive(url)
+    text = tmp_path / "book.txt"
+    text.write_text("Press one for sales. Press two for support.", encoding="utf-8")
+    out = tmp_path / "out" / "render.wav"
+    summary = submit_render(url, str(text), str(out), chunk_sec=5, sr=24000)
+    assert summary["chunks"] >= 1 and service.jobs == 1
+    samples, rate = read_wav(str(out))
+    assert rate == 24000 and len(samples) > 0
+
+
+def test_malformed_jobs_are_rejected(server, tmp_path):
+    url, _ = server
+    req = urllib.request.Request(url + "/render", data=json.dumps({"text": "Hello."}).encode("utf-8"), method="POST")
+    with pytest.raises(urllib.error.HTTPError) as exc:
+        urllib.request.urlopen(req)
+    assert exc.value.code == 400 and "out" in json.loads(exc.value.read())["error"]
+    with pytest.raises(RuntimeError, match="rejected job \\(500\\)"):
+        submit_render(url, str(tmp_path / "missing.txt"), str(tmp_path / "out.wav"))
+    assert not server_alive("http://127.0.0.1:9")
@@ -0,0 +1,34 @@
+import io
+import os
+import subprocess
+import sys
+import wave
+
+from scripts.tts_stream import PlaybackClock, wav_stream_header
+
+
+def test_playback_clock_counts_underruns():
+    clock = PlaybackClock(1000, start=0.0)
+    clock.packet(500, now=0.2)   # first packet: 0.5 s buffered until t=0.7
+    clock.packet(500, now=0.6)   # in time: buffered until t=1.2
+    clock.packet(500, now=1.5)   # listener ran dry for 0.3 s
+    report = clock.report()
+    assert report["first_packet_sec"] == 0.2
+    assert report["underruns"] == 1 and report["stall_sec"] == 0.3
+    assert report["seconds"] == 1.5
+
+
+def test_wav_stream_header_is_readable():
+    header = wav_stream_header(24000)
+    with wave.open(io.BytesIO(header + bytes(4800)), "rb") as w:
+        assert w.getframerate() == 24000 and w.getsampwidth() == 2 and w.getnchannels() == 1
+
+
+def test_unknown_voice_is_a_usage_error(tmp_path):
+    text = tmp_path / "line.txt"
+    text.write_text("Hello.", encoding="utf-8")
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    env = dict(os.environ, TTS_VOICE_REGISTRY=str(tmp_path / "registry.json"))
+    proc = subprocess.run([sys.executable, os.path.join(root, "scripts", "tts_stream.py"), "--text", str(text),
+                           "--voice", "nosuch"], capture_output=True, text=True, env=env)
+    assert proc.returncode == 2 and "unknown voice 'nosuch'" in proc.stderr
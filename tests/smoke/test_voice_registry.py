@@ -0,0 +1,46 @@
+import json
+
+import pytest
+
+from scripts.chunk_cache import file_sha256
+from scripts.voice_registry import FORMAT, VoiceRegistry, resolve_voice
+
+
+def test_registry_resolves_ids_and_verifies_hashes(tmp_path):
+    (tmp_path / "anna.safetensors").write_bytes(b"tensors")
+    entry = {"file": "anna.safetensors", "sha256": file_sha256(tmp_path / "anna.safetensors"), "kind": "conditioning"}
+    path = tmp_path / "registry.json"
+    path.write_text(json.dumps({"format": FORMAT, "version": 1, "voices": {"anna": entry}}))
+
+    registry = VoiceRegistry(str(path))
+    assert registry.resolve("anna") == (str(tmp_path / "anna.safetensors"), entry["sha256"])
+    assert resolve_voice(str(path), registry) == str(path)  # existing files pass through
+    assert resolve_voice(None, registry) is None
+    with pytest.raises(KeyError):
+        resolve_voice("bob", registry)
+    assert registry.verify() == [("anna", True, "ok")]
+    (tmp_path / "anna.safetensors").write_bytes(b"edited")
+    assert registry.verify()[0][1] is False
+
+
+def test_safetensors_voices_round_trip_into_the_lru(tmp_path):
+    torch = pytest.importorskip("torch")
+    pytest.importorskip("safetensors")
+    from scripts.bench import StandInModel
+    from scripts.voice_conditioning import load_voice
+    from scripts.voice_registry import VoiceCache
+
+    registry = VoiceRegistry(str(tmp_path / "voices" / "registry.json"))
+    for i, name in enumerate(("a", "b", "c")):
+        torch.save(torch.full((4,), float(i)), tmp_path / f"{name}.pt")
+        registry.add(name, str(tmp_path / f"{name}.pt"))
+    assert torch.equal(load_voice(registry.file("b")), torch.full((4,), 1.0))
+    assert [ok for _, ok, _ in registry.verify()] == [True, True, True]
+
+    voices = VoiceCache(StandInModel(), capacity=2, registry=registry)
+    first = voices.get("a")
+    assert voices.get("a") is first
+    voices.get("b")
+    voices.get("c")  # evicts "a"
+    assert voices.get("a") is not first
+    assert voices.stats() == {"voices": 2, "capacity": 2, "hits": 1, "loads": 4, "evictions": 2}
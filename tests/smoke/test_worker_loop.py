@@ -0,0 +1,46 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+from scripts.bench import StandInModel
+from scripts.chunk_cache import ChunkCache
+from scripts.chunk_store import ChunkStore
+from scripts.run_manifest import RunManifest
+from scripts.voice_conditioning import VoiceSynth
+from scripts.worker_loop import run_chunks
+
+ITEMS = [{"id": i, "text": f"Sentence number {i} of the test."} for i in range(5)]
+
+
+def _run(tmp_path, cache, store=False, batch_size=2):
+    model = StandInModel()
+    out_dir = str(tmp_path / "chunks")
+    writer = ChunkStore(str(tmp_path / "store")).writer() if store else None
+    manifest = None if writer else RunManifest.for_out_dir(out_dir)
+    events = []
+    totals = run_chunks(VoiceSynth(model, None), model.save_wav, iter(ITEMS), out_dir, batch_size=batch_size,
+                        log=lambda kind, **fields: events.append((kind, fields)), cache=cache, writer=writer,
+                        manifest=manifest, engine="test")
+    return totals, events, manifest
+
+
+def test_run_chunks_writes_records_and_serves_cache_hits(tmp_path, monkeypatch):
+    monkeypatch.delenv("TTS_MODEL_DIR", raising=False)
+    (tmp_path / "chunks").mkdir()
+    cache = ChunkCache(str(tmp_path / "cache"))
+    totals, events, manifest = _run(tmp_path, cache)
+    assert totals["rendered"] == 5 and totals["cached"] == 0 and totals["seconds"] > 0
+    done = [f for kind, f in events if kind == "chunk_done"]
+    assert [f["chunk_id"] for f in done] == [0, 1, 2, 3, 4]
+    assert all(f["engine"] == "test" and f["device"] == "cpu" for f in done)
+    assert sum(1 for kind, _ in events if kind == "batch_done") == 5  # no conditioning latents: one chunk per batch
+    assert sorted(manifest.load()) == [0, 1, 2, 3, 4]
+    assert (tmp_path / "chunks" / "000004.wav").exists()
+
+    totals, events, _ = _run(tmp_path, cache)  # second run: everything comes from the cache
+    assert totals == {"rendered": 0, "cached": 5, "seconds": 0.0}
+    assert [kind for kind, _ in events] == ["chunk_cached"] * 5
+
+    totals, _, _ = _run(tmp_path, cache, store=True)  # cache hits copied into the chunk store
+    assert totals["cached"] == 5 and ChunkStore(str(tmp_path / "store")).ids() == [0, 1, 2, 3, 4]
@@ -0,0 +1,37 @@
+import json
+import os
+import sys
+
+from scripts.worker_pool import (member_env, plan_cpu_pool, predicted_loads, run_pool, schedule_report, shard_chunks,
+                                  shard_files, split_cores)
+
+
+def test_split_cores_and_env():
+    assert split_cores(3, list(range(8))) == [[0, 1, 2], [3, 4, 5], [6, 7]]
+    env = member_env({"TTS_CPU_AFFINITY": "9"}, 2, [4, 5])
+    assert env["TTS_TORCH_THREADS"] == "2" and env["OMP_NUM_THREADS"] == "2"
+    assert env["TTS_CPU_AFFINITY"] == "4,5"
+
+
+def test_shard_chunks_longest_first(tmp_path):
+    src = tmp_path / "chunks.jsonl"
+    predicted = [2.0, 9.0, 3.0, 8.0, 1.0, 4.0]
+    src.write_text("".join(json.dumps({"id": i, "text": "x", "predicted": p}) + "\n"
+                           for i, p in enumerate(predicted)), encoding="utf-8")
+    shards = shard_chunks(str(src), 2)
+    ids = [[json.loads(line)["id"] for line in open(p, encoding="utf-8")] for p in shards]
+    # 9 -> A, 8 -> B, 4 -> B, 3 -> A, 2 -> A|B tie (A), 1 -> B: loads 14 / 13.
+    assert ids == [[1, 2, 0], [3, 5, 4]]
+    assert predicted_loads(str(src), 2) == [14.0, 13.0]
+    report = schedule_report([14.0, 13.0], [7.0, 7.0])
+    assert report["predicted_makespan_audio_sec"] == 14.0 and report["actual_imbalance"] == 1.0
+
+
+def test_run_pool_removes_shard_files(tmp_path):
+    src = tmp_path / "chunks.jsonl"
+    src.write_text("".join(json.dumps({"id": i, "text": "x"}) + "\n" for i in range(4)), encoding="utf-8")
+    plan = plan_cpu_pool(str(src), 2)
+    shards = shard_files(plan)
+    assert len(shards) == len(plan) and all(os.path.exists(p) for p in shards)
+    run_pool([[sys.executable, "-c", "pass"]] * len(plan), [dict(os.environ)] * len(plan), cleanup=shards)
+    assert not any(os.path.exists(p) for p in shards) and src.exists()
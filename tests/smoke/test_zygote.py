@@ -0,0 +1,46 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from scripts import zygote
+
+pytestmark = pytest.mark.skipif(not zygote.supported(), reason="needs os.fork")
+
+WORKER = """
+import json, os, sys
+from scripts.tracing import write_log
+write_log(os.environ["TTS_LOG_FILE"], "worker", "info", "child", mark=os.environ["MARK"])
+with open(sys.argv[1], "w") as fh:
+    json.dump({"argv": sys.argv[1:], "mark": os.environ["MARK"]}, fh)
+sys.exit(int(sys.argv[2]))
+"""
+
+
+def test_forked_pool_members_get_their_own_env_and_argv(tmp_path):
+    script = tmp_path / "worker.py"
+    script.write_text(WORKER, encoding="utf-8")
+    log = tmp_path / "run.jsonl"
+    root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    base = {"PYTHONPATH": root, "TTS_LOG_FILE": str(log), "TTS_ZYGOTE_PRELOAD": "0"}
+    outs = [tmp_path / "a.json", tmp_path / "b.json"]
+    commands = [[sys.executable, str(script), str(out), "0"] for out in outs]
+    envs = [{**base, "MARK": "a"}, {**base, "MARK": "b"}]
+
+    elapsed = zygote.run_pool_forked(commands, envs)
+    assert len(elapsed) == 2 and all(e >= 0 for e in elapsed)
+    assert [json.loads(o.read_text()) for o in outs] == [
+        {"argv": [str(outs[0]), "0"], "mark": "a"},
+        {"argv": [str(outs[1]), "0"], "mark": "b"},
+    ]
+    records = [json.loads(line) for line in log.read_text().splitlines()]
+    # The zygote's buffered start line is written once, not again by each child.
+    assert sum(r["message"] == "Zygote starting" for r in records) == 1
+    assert sorted(r["mark"] for r in records if r["message"] == "child") == ["a", "b"]
+
+    commands[1][-1] = "3"
+    with pytest.raises(subprocess.CalledProcessError) as exc:
+        zygote.run_pool_forked(commands, envs)
+    assert exc.value.returncode == 3